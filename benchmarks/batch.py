@@ -0,0 +1,88 @@
+"""Throughput of the numpy batch move generator, checked against Board.
+
+    python3 -m benchmarks.batch [-n POSITIONS] [--sample SAMPLE]
+
+The perft positions and a sample of random game positions are checked square
+by square against the scalar generator, then tiled to POSITIONS rows and
+timed.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from game.board import Board
+from game.batch import fromBoards, pseudoLegalMoves, attackMaps, inCheck, toPlanes
+from game.utils import Color
+from benchmarks.encoding import samplePositions
+from benchmarks.perft import POSITIONS
+
+
+def check(boards, moves, maps, checks) -> int:
+    """Number of positions where the batch results differ from Board."""
+    mismatches = 0
+    for i, board in enumerate(boards):
+        ok = True
+        for color in (Color.BLACK, Color.WHITE):
+            for piece in board.getPlayerPieces(color):
+                sq = piece.pos.Y * 8 + piece.pos.X
+                ok = ok and int(moves[i, sq]) == piece.moveMask(board)
+            attacked = 0
+            occ = board.occupancy()
+            for sq in range(64):
+                if board.attackedBy(sq, color, occ):
+                    attacked |= 1 << sq
+            ok = ok and int(maps[i, color.value]) == attacked
+            ok = ok and bool(checks[i, color.value]) == (board.checkers(color) != 0)
+        if not ok:
+            mismatches += 1
+            if mismatches == 1:
+                print("mismatch: " + board.toFEN(), file=sys.stderr)
+    return mismatches
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-n", "--positions", type=int, default=200000)
+    parser.add_argument("--sample", type=int, default=500)
+    args = parser.parse_args()
+
+    # the perft positions cover castling, en passant and promotions
+    boards = [Board.fromFEN(fen) for _, fen, _ in POSITIONS]
+    boards += samplePositions(args.sample)
+    bitboards, epSquares, rights = fromBoards(boards)
+    moves = pseudoLegalMoves(bitboards, epSquares, rights)
+    maps = attackMaps(bitboards)
+    mismatches = check(boards, moves, maps, inCheck(bitboards, maps))
+    print(
+        "checked %d positions against Board, %d mismatches" % (len(boards), mismatches)
+    )
+    planes = toPlanes(bitboards)
+
+    reps = -(-args.positions // len(boards))
+    bitboards = np.tile(bitboards, (reps, 1))[: args.positions]
+    epSquares = np.tile(epSquares, reps)[: args.positions]
+    rights = np.tile(rights, reps)[: args.positions]
+    planes = np.tile(planes, (reps, 1, 1, 1))[: args.positions]
+    for name, run in (
+        ("pseudoLegalMoves", lambda: pseudoLegalMoves(bitboards, epSquares, rights)),
+        ("attackMaps", lambda: attackMaps(bitboards)),
+        ("inCheck", lambda: inCheck(bitboards)),
+        (
+            "pseudoLegalMoves planes",
+            lambda: pseudoLegalMoves(planes, epSquares, rights),
+        ),
+    ):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        print(
+            "%-24s %8d positions %8.3fs %10.0f positions/s"
+            % (name, len(bitboards), elapsed, len(bitboards) / elapsed)
+        )
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
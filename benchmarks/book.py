@@ -0,0 +1,95 @@
+"""Opening book lookup speed.
+
+    python3 -m benchmarks.book [-g GAMES] [--book book.bin]
+
+Without `--book` a book is built from random games into a temporary file.
+Lookups of positions in the book and of random keys are timed separately,
+then whole `Book.choose` calls, which also check the move is legal, on
+one board and on new boards of book positions.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from game.board import Board
+from game.book import Book, BookBuilder
+
+
+def randomBook(
+    path: str, games: int, maxPlies: int, seed: int
+) -> "tuple[list[int], list[str]]":
+    """Write a book of random openings, returns the keys and FENs of its positions."""
+    rng = random.Random(seed)
+    builder = BookBuilder(maxPlies)
+    fens = set()
+    for _ in range(games):
+        board = Board()
+        board.resetBoard()
+        builder.games += 1
+        for _ in range(maxPlies):
+            legal = board.generateMoves()
+            if not legal:
+                break
+            move = rng.choice(legal)
+            fens.add(board.toFEN())
+            builder.count(board.zobristKey, move)
+            board.pushMove(move)
+    builder.write(path)
+    return sorted({key for key, _ in builder.counts}), sorted(fens)
+
+
+def timeCalls(name: str, calls: "list", run) -> None:
+    start = time.perf_counter()
+    for call in calls:
+        run(call)
+    elapsed = time.perf_counter() - start
+    print(
+        "%-16s %8d calls %8.3fs %8.2fus per call"
+        % (name, len(calls), elapsed, elapsed / len(calls) * 1e6)
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-g", "--games", type=int, default=2000)
+    parser.add_argument("--max-plies", type=int, default=16)
+    parser.add_argument("-n", "--lookups", type=int, default=100000)
+    parser.add_argument("--book", help="time an existing book file instead")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    tmp = None
+    if args.book:
+        path, keys, fens = args.book, [], []
+    else:
+        tmp = tempfile.NamedTemporaryFile(suffix=".bin", delete=False)
+        tmp.close()
+        path = tmp.name
+        keys, fens = randomBook(path, args.games, args.max_plies, args.seed)
+    try:
+        with Book(path) as book:
+            print("%d entries, %d bytes" % (len(book), os.path.getsize(path)))
+            if keys:
+                hits = [rng.choice(keys) for _ in range(args.lookups)]
+                timeCalls("lookup hit", hits, book.lookup)
+            misses = [rng.getrandbits(64) for _ in range(args.lookups)]
+            timeCalls("lookup miss", misses, book.lookup)
+            start = Board()
+            start.resetBoard()
+            timeCalls("choose start", [start] * (args.lookups // 10), book.choose)
+            if fens:
+                # new boards, whose moves were never generated
+                boards = [
+                    Board.fromFEN(rng.choice(fens)) for _ in range(args.lookups // 10)
+                ]
+                timeCalls("choose new board", boards, book.choose)
+    finally:
+        if tmp != None:
+            os.unlink(tmp.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Round trip and throughput of the FEN and binary position encodings.
+
+    python3 -m benchmarks.encoding [-n POSITIONS]
+
+Positions come from seeded random games so every run measures the same set.
+A halfmove clock or fullmove number too large for its field must be refused
+rather than cut.
+"""
+import argparse
+import random
+import sys
+import time
+
+from game.board import Board
+from game.encoding import (
+    POSITION_BYTES,
+    encodePosition,
+    encodePositions,
+    decodePositions,
+)
+
+# positions whose clocks don't fit the binary fields
+OUT_OF_RANGE = [
+    "4k3/8/8/8/8/8/8/R3K3 w - - 256 200",
+    "4k3/8/8/8/8/8/8/R3K3 w - - 0 65536",
+]
+
+
+def samplePositions(count: int, seed: int = 1) -> "list[Board]":
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < count:
+        board = Board()
+        board.resetBoard()
+        for _ in range(rng.randrange(1, 120)):
+            moves = board.generateMoves()
+            if not moves:
+                break
+            board.pushMove(rng.choice(moves))
+        boards.append(Board.fromFEN(board.toFEN()))
+    return boards
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-n", "--positions", type=int, default=2000)
+    args = parser.parse_args()
+
+    boards = samplePositions(args.positions)
+    fens = [board.toFEN() for board in boards]
+
+    start = time.perf_counter()
+    data = encodePositions(boards)
+    encodeTime = time.perf_counter() - start
+    start = time.perf_counter()
+    decoded = list(decodePositions(data))
+    decodeTime = time.perf_counter() - start
+    start = time.perf_counter()
+    fromFens = [Board.fromFEN(fen) for fen in fens]
+    fenTime = time.perf_counter() - start
+
+    failures = 0
+    for board, fen, fenBoard in zip(decoded, fens, fromFens):
+        if board.toFEN() != fen or fenBoard.toFEN() != fen:
+            failures += 1
+        if encodePosition(board) != encodePosition(fenBoard):
+            failures += 1
+    for fen in OUT_OF_RANGE:
+        try:
+            encodePosition(Board.fromFEN(fen))
+            failures += 1
+        except ValueError:
+            pass
+
+    n = len(boards)
+    print(
+        "%d positions, %d bytes each, %d bytes total" % (n, POSITION_BYTES, len(data))
+    )
+    print("binary encode %9.0f positions/s" % (n / encodeTime))
+    print("binary decode %9.0f positions/s" % (n / decodeTime))
+    print("FEN decode    %9.0f positions/s" % (n / fenTime))
+    print("round trip failures: %d" % failures)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
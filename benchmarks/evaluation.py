@@ -0,0 +1,42 @@
+"""Evaluations per second of Board.evaluate.
+
+    python3 -m benchmarks.evaluation [-n EVALUATIONS] [--sample SAMPLE]
+
+Times the full evaluation, its material and piece-square part read off the
+running totals kept by setPiece/removePiece, and for comparison the same
+totals recomputed from the bitboards, which is the work they save per leaf.
+"""
+import argparse
+import time
+
+from game.evaluation import runningTerms, computeTotals
+from benchmarks.encoding import samplePositions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-n", "--evaluations", type=int, default=100000)
+    parser.add_argument("--sample", type=int, default=200)
+    args = parser.parse_args()
+
+    boards = samplePositions(args.sample)
+    for board in boards:
+        board.verifyEvalTotals()
+    work = [boards[i % len(boards)] for i in range(args.evaluations)]
+    for name, run in (
+        ("evaluate", lambda board: board.evaluate(board.turn)),
+        ("running totals", lambda board: runningTerms(board, board.turn)),
+        ("recomputed totals", computeTotals),
+    ):
+        start = time.perf_counter()
+        for board in work:
+            run(board)
+        elapsed = time.perf_counter() - start
+        print(
+            "%-18s %8d calls %8.3fs %10.0f calls/s"
+            % (name, len(work), elapsed, len(work) / elapsed)
+        )
+
+
+if __name__ == "__main__":
+    main()
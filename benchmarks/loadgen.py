@@ -0,0 +1,187 @@
+"""Load generator for server.py: many simulated games, move latency and throughput.
+
+    python3 server.py &
+    python3 -m benchmarks.loadgen -g 2000 -c 20
+    python3 -m benchmarks.loadgen -g 200 --bot random --serve
+    python3 -m benchmarks.loadgen -g 200 --bot search --bot-games 20 --serve
+
+Every simulated game plays random legal moves until it ends or reaches the
+ply limit. The latency of a move is the time from sending the request to
+reading its answer, which includes the bot's reply when there is one.
+`--serve` runs the server in this process instead of connecting to one.
+With `--bot-games` only that many games play the bot, and the latency of
+the others shows whether thinking bots hold up the server.
+"""
+from itertools import count
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from server import GameServer, createExecutor
+
+
+class Connection:
+    """One TCP connection carrying the requests of many games."""
+
+    def __init__(
+        self, reader: "asyncio.StreamReader", writer: "asyncio.StreamWriter"
+    ) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.ids = count(1)
+        self.waiting: "dict[int, asyncio.Future]" = {}
+        self.listener = asyncio.create_task(self.listen())
+
+    async def listen(self) -> None:
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            response = json.loads(line)
+            future = self.waiting.pop(response.get("id"), None)
+            if future != None and not future.done():
+                future.set_result(response)
+        for future in self.waiting.values():
+            future.set_exception(ConnectionError("server closed the connection"))
+
+    async def call(self, **message) -> dict:
+        message["id"] = requestId = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[requestId] = future
+        self.writer.write(json.dumps(message).encode() + b"\n")
+        await self.writer.drain()
+        return await future
+
+    async def close(self) -> None:
+        # the server closes its side once it sees ours closed
+        self.writer.close()
+        await self.listener
+
+
+async def playGame(
+    connection: "Connection",
+    bot: "str|None",
+    maxPlies: int,
+    rng: "random.Random",
+    latencies: "list[float]",
+    errors: "list[str]",
+) -> None:
+    request: dict = {"op": "new", "legal": True}
+    if bot != None:
+        request["bot"] = bot
+        request["color"] = rng.choice(["white", "black"])
+    response = await connection.call(**request)
+    if not response["ok"]:
+        errors.append(response["error"])
+        return
+    gameId = response["game"]
+    plies = 1 if "reply" in response else 0
+    while not response["over"] and plies < maxPlies:
+        move = rng.choice(response["legal"])
+        start = time.perf_counter()
+        response = await connection.call(op="move", game=gameId, move=move, legal=True)
+        latencies.append(time.perf_counter() - start)
+        if not response["ok"]:
+            errors.append(response["error"])
+            break
+        plies += 2 if "reply" in response else 1
+    await connection.call(op="close", game=gameId)
+
+
+def percentile(values: "list[float]", fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run(args: "argparse.Namespace") -> None:
+    host, port = args.host, args.port
+    tcp = None
+    if args.serve:
+        executor = createExecutor(args.bot_workers, args.movetime)
+        server = GameServer(executor)
+        tcp = await asyncio.start_server(server.handle, host, 0)
+        port = tcp.sockets[0].getsockname()[1]
+
+    connections = []
+    for _ in range(args.connections):
+        reader, writer = await asyncio.open_connection(host, port)
+        connections.append(Connection(reader, writer))
+
+    rng = random.Random(args.seed)
+    botGames = args.games if args.bot_games == None else args.bot_games
+    # by whether the game has a bot opponent
+    latencies: "dict[bool, list[float]]" = {True: [], False: []}
+    errors: "list[str]" = []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            playGame(
+                connections[game % len(connections)],
+                args.bot if game < botGames else None,
+                args.max_plies,
+                random.Random(rng.random()),
+                latencies[args.bot != None and game < botGames],
+                errors,
+            )
+            for game in range(args.games)
+        )
+    )
+    elapsed = time.perf_counter() - start
+
+    for connection in connections:
+        await connection.close()
+    if tcp != None:
+        tcp.close()
+        executor.shutdown()
+
+    print(
+        "%d games over %d connections in %.2fs"
+        % (args.games, len(connections), elapsed)
+    )
+    for withBot in (True, False):
+        moves = latencies[withBot]
+        if not moves:
+            continue
+        print(
+            "%-11s %d moves  %.0f moves/s  p50 %.2fms  p99 %.2fms"
+            % (
+                "with bot" if withBot else "without bot",
+                len(moves),
+                len(moves) / elapsed,
+                percentile(moves, 0.5) * 1000,
+                percentile(moves, 0.99) * 1000,
+            )
+        )
+    if errors:
+        print("%d errors, first: %s" % (len(errors), errors[0]))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("-g", "--games", type=int, default=1000)
+    parser.add_argument("-c", "--connections", type=int, default=10)
+    parser.add_argument(
+        "--bot", choices=["random", "search"], help="play against a bot"
+    )
+    parser.add_argument(
+        "--bot-games", type=int, help="games that play the bot, default all"
+    )
+    parser.add_argument("--max-plies", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--serve", action="store_true", help="run the server in process"
+    )
+    parser.add_argument("--bot-workers", type=int, default=4)
+    parser.add_argument(
+        "--movetime", type=float, default=0.05, help="seconds per bot move"
+    )
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
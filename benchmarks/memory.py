@@ -0,0 +1,141 @@
+"""Memory use of the board representation, against the one it replaced.
+
+    python3 -m benchmarks.memory [-n BOARDS]
+
+Reports the bytes held by one Board in the starting position and, for a
+getAllPossibleMoves call on an empty move cache, the memory blocks it
+allocates that are still alive afterwards and its peak traced bytes.
+
+The baseline column rebuilds the earlier representation next to the
+current one: a `@dataclass` Pos allocated for every piece and every
+generated target square, and Piece and PossibleMoves objects with a
+`__dict__`. Baseline boards are current boards whose pieces were swapped
+for such objects, and the baseline move lists come from the same legal
+move masks, so the columns differ only by the representation.
+"""
+from dataclasses import dataclass
+import argparse
+import gc
+import sys
+import tracemalloc
+
+from game.board import Board
+from game.bitboard import squares
+from game.utils import Color
+
+FEN = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+
+
+@dataclass
+class BaselinePos:
+    X: int
+    Y: int
+
+
+class BaselinePiece:
+    kind = -1
+
+    def __init__(self, x: int, y: int, color: "Color") -> None:
+        self.pos = BaselinePos(x, y)
+        self.color = color
+        self.hasMoved = False
+
+
+@dataclass
+class BaselinePossibleMoves:
+    piece: object
+    to: "list[BaselinePos]"
+
+
+def baselineBoard() -> "Board":
+    """A starting position whose pieces are held as baseline objects."""
+    board = Board()
+    board.resetBoard()
+    for row in board.board:
+        for x, piece in enumerate(row):
+            if piece != None:
+                row[x] = BaselinePiece(piece.pos.X, piece.pos.Y, piece.color)  # type: ignore
+    return board
+
+
+def currentBoard() -> "Board":
+    board = Board()
+    board.resetBoard()
+    return board
+
+
+def baselineMoves(board: "Board", color: "Color") -> "list[BaselinePossibleMoves]":
+    """getAllPossibleMoves as it was, a new Pos for every target square."""
+    board.refreshMoveCache()
+    possibleMoves = []
+    for piece in board.getPlayerPieces(color):
+        _, legalMoves = board.cachedMoves(piece)
+        if legalMoves:
+            to = [BaselinePos(sq & 7, sq >> 3) for sq in squares(legalMoves)]
+            possibleMoves.append(BaselinePossibleMoves(piece, to))
+    return possibleMoves
+
+
+def currentMoves(board: "Board", color: "Color") -> list:
+    return board.getAllPossibleMoves(color)
+
+
+def bytesPerBoard(count: int, build) -> float:
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    boards = [build() for _ in range(count)]
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del boards
+    return used / count
+
+
+def moveGenAllocations(board: "Board", color: "Color", generate) -> "tuple[int, int]":
+    """(blocks still allocated, peak bytes) for one uncached call."""
+    board.clearMoveCache()
+    gc.collect()
+    tracemalloc.start()
+    blocks = sys.getallocatedblocks()
+    moves = generate(board, color)
+    blocks = sys.getallocatedblocks() - blocks
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del moves
+    return blocks, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-n", "--boards", type=int, default=1000)
+    args = parser.parse_args()
+
+    print("%-40s %9s %9s" % ("", "baseline", "current"))
+    print(
+        "%-40s %9.0f %9.0f"
+        % (
+            "bytes per Board",
+            bytesPerBoard(args.boards, baselineBoard),
+            bytesPerBoard(args.boards, currentBoard),
+        )
+    )
+    start = currentBoard()
+    for name, board in (("start", start), ("kiwipete", Board.fromFEN(FEN))):
+        rows = []
+        for generate in (baselineMoves, currentMoves):
+            # the first call fills the attack tables, measure the second
+            moveGenAllocations(board, Color.WHITE, generate)
+            rows.append(moveGenAllocations(board, Color.WHITE, generate))
+        print(
+            "%-40s %9d %9d"
+            % ("getAllPossibleMoves %s blocks kept" % name, rows[0][0], rows[1][0])
+        )
+        print(
+            "%-40s %9d %9d"
+            % ("getAllPossibleMoves %s peak bytes" % name, rows[0][1], rows[1][1])
+        )
+
+
+if __name__ == "__main__":
+    main()
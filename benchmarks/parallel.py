@@ -0,0 +1,65 @@
+"""Search depth of ParallelSearchBot for an increasing number of workers.
+
+    python3 -m benchmarks.parallel [-t SECONDS] [-w MAX_WORKERS] [--mode lazy]
+    python3 -m benchmarks.parallel --depth 5 [-w MAX_WORKERS] [--mode lazy]
+
+Reports the depth of the move found in a fixed time or, with --depth, the
+time taken to finish that depth. Raw node counts are not compared: nodes
+that other workers already searched through the shared table don't make
+the search any deeper. More workers than cores only share the same cores,
+so the gain shows up to os.cpu_count() workers.
+"""
+import argparse
+import os
+import time
+
+from game.board import Board
+from game.moves import moveToUCI
+from bots.parallelSearchBot import ParallelSearchBot
+
+FEN = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-t", "--time", type=float, default=2.0)
+    parser.add_argument("-d", "--depth", type=int, default=None)
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--mode", choices=["split", "lazy"], default="split")
+    parser.add_argument("--fen", default=FEN)
+    args = parser.parse_args()
+
+    print("%d cores" % (os.cpu_count() or 1))
+    base = None
+    workers = 1
+    while workers <= args.workers:
+        if args.depth == None:
+            bot = ParallelSearchBot(
+                workers=workers, mode=args.mode, timeLimit=args.time
+            )
+        else:
+            # a time limit that never runs out, the search stops at the depth
+            bot = ParallelSearchBot(
+                workers=workers, mode=args.mode, timeLimit=3600, maxDepth=args.depth
+            )
+        board = Board.fromFEN(args.fen)
+        # start the pool so process start-up is not timed, on a fresh table
+        bot.search(board, 0.05)
+        bot.tt.clear()  # type: ignore
+        start = time.perf_counter()
+        move = bot.search(board)
+        elapsed = time.perf_counter() - start
+        bot.close()
+        base = base or elapsed
+        if args.depth == None:
+            print("%2d workers  depth %2d  %s" % (workers, bot.depth, moveToUCI(move)))
+        else:
+            print(
+                "%2d workers  depth %2d in %7.2fs  x%.2f"
+                % (workers, bot.depth, elapsed, base / elapsed)
+            )
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Perft correctness and throughput gate for the move generator.
+
+    python3 -m benchmarks.perft                 # every position to its default depth
+    python3 -m benchmarks.perft -d 5 -p start   # one position, deeper
+    python3 -m benchmarks.perft -p kiwipete --divide 2
+
+Node counts are compared against the published reference values and the
+exit status is non-zero when any of them differ.
+"""
+import argparse
+import sys
+import time
+
+from game.board import Board
+from game.perft import perft, divide
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+# (name, fen, nodes at depth 1, 2, ...) from the chessprogramming wiki
+POSITIONS = [
+    ("start", START_FEN, [20, 400, 8902, 197281, 4865609, 119060324]),
+    (
+        "kiwipete",
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        [48, 2039, 97862, 4085603, 193690690],
+    ),
+    (
+        "endgame",
+        "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+        [14, 191, 2812, 43238, 674624, 11030083],
+    ),
+    (
+        "promotions",
+        "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+        [6, 264, 9467, 422333, 15833292],
+    ),
+    (
+        "promotions-mirrored",
+        "r2q1rk1/pP1p2pp/Q4n2/bbp1p3/Np6/1B3NBn/pPPP1PPP/R3K2R b KQ - 0 1",
+        [6, 264, 9467, 422333, 15833292],
+    ),
+    (
+        "talkchess",
+        "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+        [44, 1486, 62379, 2103487, 89941194],
+    ),
+    (
+        "steven-edwards",
+        "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+        [46, 2079, 89890, 3894594, 164075551],
+    ),
+]
+
+DEFAULT_DEPTH = 3
+
+
+def runPosition(name: str, fen: str, expected: "list[int]", depth: int) -> bool:
+    ok = True
+    for d in range(1, min(depth, len(expected)) + 1):
+        board = Board.fromFEN(fen)
+        start = time.perf_counter()
+        nodes = perft(board, d)
+        elapsed = time.perf_counter() - start
+        passed = nodes == expected[d - 1]
+        ok = ok and passed
+        print(
+            "%-20s %2d %12d %12d  %-4s %9.3fs %10.0f nps"
+            % (
+                name,
+                d,
+                nodes,
+                expected[d - 1],
+                "ok" if passed else "FAIL",
+                elapsed,
+                nodes / elapsed if elapsed > 0 else 0,
+            )
+        )
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-d", "--depth", type=int, default=DEFAULT_DEPTH)
+    parser.add_argument("-p", "--position", action="append", help="position name")
+    parser.add_argument("--fen", help="run an arbitrary position instead")
+    parser.add_argument(
+        "--divide", type=int, metavar="DEPTH", help="print per root move counts"
+    )
+    args = parser.parse_args()
+
+    if args.fen:
+        positions = [("fen", args.fen, [])]
+    else:
+        positions = [p for p in POSITIONS if not args.position or p[0] in args.position]
+        if not positions:
+            parser.error(
+                "unknown position, choose from: " + ", ".join(p[0] for p in POSITIONS)
+            )
+
+    if args.divide:
+        for name, fen, _ in positions:
+            counts = divide(Board.fromFEN(fen), args.divide)
+            for move in sorted(counts):
+                print("%s: %d" % (move, counts[move]))
+            print("%s total: %d" % (name, sum(counts.values())))
+        return 0
+
+    if args.fen:
+        board = Board.fromFEN(args.fen)
+        for d in range(1, args.depth + 1):
+            start = time.perf_counter()
+            nodes = perft(board, d)
+            print(
+                "depth %d: %d nodes in %.3fs" % (d, nodes, time.perf_counter() - start)
+            )
+        return 0
+
+    print(
+        "%-20s %2s %12s %12s  %-4s %10s %14s"
+        % ("position", "d", "nodes", "expected", "", "time", "speed")
+    )
+    ok = True
+    for name, fen, expected in positions:
+        ok = runPosition(name, fen, expected, args.depth) and ok
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
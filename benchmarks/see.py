@@ -0,0 +1,119 @@
+"""Static exchange evaluation checked on known exchanges, then timed.
+
+    python3 -m benchmarks.see [-n POSITIONS]
+
+Every position below has the value Board.seeMove must give its move and
+the exit status is non-zero when any of them differ or the board changed.
+The speed is then measured over every capture of random game positions.
+"""
+import argparse
+import sys
+import time
+
+from game.board import Board
+from game.moves import moveFromUCI
+from benchmarks.encoding import samplePositions
+
+# (what it checks, fen, move, value) with the PIECE_VALUES of game.evaluation
+POSITIONS = [
+    (
+        "rook takes an undefended pawn",
+        "1k1r4/1pp4p/p7/4p3/8/P5P1/1PP4P/2K1R3 w - - 0 1",
+        "e1e5",
+        100,
+    ),
+    (
+        "knight takes a pawn defended twice",
+        "1k1r3q/1ppn3p/p4b2/4p3/8/P2N2P1/1PP1R1BP/2K1Q3 w - - 0 1",
+        "d3e5",
+        -220,
+    ),
+    (
+        "x-ray rook behind the capturing rook",
+        "3rk3/8/8/3p4/8/8/3R4/3RK3 w - - 0 1",
+        "d2d5",
+        100,
+    ),
+    (
+        "x-ray rooks on both sides",
+        "3rk3/3r4/8/3p4/8/8/3R4/3RK3 w - - 0 1",
+        "d2d5",
+        -400,
+    ),
+    (
+        "bishop takes a pawn defended by a pawn",
+        "4k3/8/2p5/3p4/8/8/6B1/4K3 w - - 0 1",
+        "g2d5",
+        -230,
+    ),
+    (
+        "knight for knight",
+        "4k3/8/2p5/3n4/8/4N3/8/4K3 w - - 0 1",
+        "e3d5",
+        0,
+    ),
+    (
+        "promotion capture of an undefended knight",
+        "1n2k3/P7/8/8/8/8/8/4K3 w - - 0 1",
+        "a7b8q",
+        1120,
+    ),
+    (
+        "promotion capture, the queen is taken back",
+        "rn2k3/P7/8/8/8/8/8/4K3 w - - 0 1",
+        "a7b8q",
+        220,
+    ),
+    ("en passant", "4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1", "e5d6", 100),
+    (
+        "quiet queen move onto a pawn-attacked square",
+        "4k3/8/8/4p3/8/8/8/3QK3 w - - 0 1",
+        "d1d4",
+        -900,
+    ),
+]
+
+
+def checkPositions() -> bool:
+    ok = True
+    for name, fen, uci, expected in POSITIONS:
+        board = Board.fromFEN(fen)
+        move = moveFromUCI(uci)
+        assert move != None and move in board.generateMoves(), (name, uci)
+        before = (board.toFEN(), board.zobristKey)
+        value = board.seeMove(move)
+        passed = value == expected and (board.toFEN(), board.zobristKey) == before
+        ok = ok and passed
+        print(
+            "%-46s %-6s %6d %6d  %s"
+            % (name, uci, value, expected, "ok" if passed else "FAIL")
+        )
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-n", "--positions", type=int, default=500)
+    args = parser.parse_args()
+
+    ok = checkPositions()
+
+    work = []
+    for board in samplePositions(args.positions):
+        occ = board.occupancy()
+        for move in board.generateMoves():
+            if occ >> ((move >> 6) & 63) & 1:
+                work.append((board, move))
+    start = time.perf_counter()
+    for board, move in work:
+        board.seeMove(move)
+    elapsed = time.perf_counter() - start
+    print(
+        "%d captures in %.3fs, %.2fus per exchange"
+        % (len(work), elapsed, elapsed / max(len(work), 1) * 1e6)
+    )
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Board.stagedMoves checked against generateMoves, then timed.
+
+    python3 -m benchmarks.staged [-d DEPTH]
+
+At every node of the perft positions' move trees down to DEPTH the staged
+moves must be the legal moves of generateMoves, each once, with a hash move
+first. The exit status is non-zero when any node differs. The time of
+taking every move, only the captures and promotions as the quiescence
+search does, and only the first as a cutoff would, is compared with
+generating the full list.
+"""
+import argparse
+import sys
+import time
+
+from game.board import Board
+from game.moves import moveToUCI
+from benchmarks.perft import POSITIONS
+
+DEFAULT_DEPTH = 3
+
+
+def checkTree(board: "Board", depth: int, boards: "list[Board]") -> int:
+    """Nodes whose staged moves differ from generateMoves, FENs go to `boards`."""
+    # staged first, so it can't lean on a move list generateMoves refreshed
+    first = list(board.stagedMoves())
+    moves = board.generateMoves()
+    boards.append(Board.fromFEN(board.toFEN()))
+    bad = 0
+    hashMove = moves[-1] if moves else 0
+    for hint in (0, hashMove):
+        staged = list(board.stagedMoves(hashMove=hint)) if hint else first
+        if (
+            len(staged) != len(set(staged))
+            or set(staged) != set(moves)
+            or (hint and staged[0] != hint)
+        ):
+            bad += 1
+            print(
+                "%s hash %s: %d staged, %d legal"
+                % (
+                    board.toFEN(),
+                    moveToUCI(hint) if hint else "-",
+                    len(staged),
+                    len(moves),
+                )
+            )
+    if depth > 1:
+        for move in moves:
+            board.pushMove(move)
+            bad += checkTree(board, depth - 1, boards)
+            board.unmakeMove()
+    return bad
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-d", "--depth", type=int, default=DEFAULT_DEPTH)
+    args = parser.parse_args()
+
+    bad = 0
+    boards: "list[Board]" = []
+    for name, fen, _ in POSITIONS:
+        start = len(boards)
+        failed = checkTree(Board.fromFEN(fen), args.depth, boards)
+        bad += failed
+        print(
+            "%-20s %7d nodes  %s"
+            % (name, len(boards) - start, "ok" if not failed else "FAIL")
+        )
+
+    for name, run in (
+        ("generateMoves", lambda board: board.generateMoves()),
+        ("stagedMoves", lambda board: list(board.stagedMoves())),
+        ("staged captures", lambda board: list(board.stagedMoves(quiets=False))),
+        ("first staged move", lambda board: next(board.stagedMoves(), 0)),
+    ):
+        # fresh boards for every run, so none finds the move cache warm
+        work = [Board.fromFEN(board.toFEN()) for board in boards]
+        start = time.perf_counter()
+        for board in work:
+            run(board)
+        elapsed = time.perf_counter() - start
+        print(
+            "%-18s %8d positions %8.3fs %8.2fus per position"
+            % (name, len(boards), elapsed, elapsed / len(boards) * 1e6)
+        )
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
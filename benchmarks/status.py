@@ -0,0 +1,129 @@
+"""Board.gameStatus checked on known positions, then timed.
+
+    python3 -m benchmarks.status [-n POSITIONS]
+
+Every position below, reached from a FEN by the listed moves, has the
+status gameStatus must give it and the exit status is non-zero when any of
+them differ. The speed is then measured over random game positions.
+"""
+import argparse
+import sys
+import time
+
+from game.board import Board
+from game.moves import moveFromUCI
+from game.utils import GameStatus
+from benchmarks.encoding import samplePositions
+from benchmarks.perft import START_FEN
+
+KNIGHT_SHUFFLE = "g1f3 g8f6 f3g1 f6g8"
+
+# (what it checks, fen, moves in UCI notation, status)
+POSITIONS = [
+    ("start", START_FEN, "", GameStatus.ONGOING),
+    (
+        "fool's mate",
+        START_FEN,
+        "f2f3 e7e5 g2g4 d8h4",
+        GameStatus.CHECKMATE,
+    ),
+    (
+        "back rank mate",
+        "6k1/5ppp/8/8/8/8/8/3R2K1 w - - 0 1",
+        "d1d8",
+        GameStatus.CHECKMATE,
+    ),
+    ("stalemate", "7k/5Q2/6K1/8/8/8/8/8 b - - 0 1", "", GameStatus.STALEMATE),
+    ("position twice", START_FEN, KNIGHT_SHUFFLE, GameStatus.ONGOING),
+    (
+        "threefold repetition",
+        START_FEN,
+        KNIGHT_SHUFFLE + " " + KNIGHT_SHUFFLE,
+        GameStatus.THREEFOLD,
+    ),
+    (
+        "repetition broken by a pawn move",
+        START_FEN,
+        KNIGHT_SHUFFLE + " e2e4 e7e5 " + KNIGHT_SHUFFLE,
+        GameStatus.ONGOING,
+    ),
+    ("99 half moves", "4k3/8/8/8/8/8/8/R3K3 w - - 99 80", "", GameStatus.ONGOING),
+    ("fifty moves", "4k3/8/8/8/8/8/8/R3K3 w - - 99 80", "a1a2", GameStatus.FIFTY_MOVES),
+    (
+        "fifty moves ends in mate",
+        "7k/8/6K1/8/8/8/8/R7 w - - 99 80",
+        "a1a8",
+        GameStatus.CHECKMATE,
+    ),
+    (
+        "bare kings",
+        "4k3/8/8/8/8/8/8/4K3 w - - 0 1",
+        "",
+        GameStatus.INSUFFICIENT_MATERIAL,
+    ),
+    (
+        "king and knight",
+        "4k3/8/8/8/8/8/8/4KN2 w - - 0 1",
+        "",
+        GameStatus.INSUFFICIENT_MATERIAL,
+    ),
+    (
+        "bishops on one colour",
+        "4kb2/8/8/8/8/8/8/2B1K3 w - - 0 1",
+        "",
+        GameStatus.INSUFFICIENT_MATERIAL,
+    ),
+    (
+        "bishops on both colours",
+        "4k3/8/8/8/8/8/8/2B1KB2 w - - 0 1",
+        "",
+        GameStatus.ONGOING,
+    ),
+    ("two knights", "4k3/8/8/8/8/8/8/1N2K1N1 w - - 0 1", "", GameStatus.ONGOING),
+    ("a pawn left", "4k3/8/8/8/8/8/4P3/4K3 w - - 0 1", "", GameStatus.ONGOING),
+]
+
+
+def checkPositions() -> bool:
+    ok = True
+    for name, fen, moves, expected in POSITIONS:
+        board = Board.fromFEN(fen)
+        for uci in moves.split():
+            move = moveFromUCI(uci)
+            assert move != None and move in board.generateMoves(), (name, uci)
+            board.pushMove(move)
+        status = board.gameStatus()
+        ok = ok and status == expected
+        print(
+            "%-34s %-22s %-22s %s"
+            % (
+                name,
+                status.value,
+                expected.value,
+                "ok" if status == expected else "FAIL",
+            )
+        )
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-n", "--positions", type=int, default=2000)
+    args = parser.parse_args()
+
+    ok = checkPositions()
+
+    boards = samplePositions(args.positions)
+    start = time.perf_counter()
+    for board in boards:
+        board.gameStatus()
+    elapsed = time.perf_counter() - start
+    print(
+        "%d positions in %.3fs, %.2fus per status"
+        % (len(boards), elapsed, elapsed / len(boards) * 1e6)
+    )
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""Endgame table probe speed.
+
+    python3 -m benchmarks.tablebase [-d tables] [-n PROBES]
+
+Probes random legal positions of every table in the directory. Without
+`-d` the KRvK table is generated into a temporary directory first. The
+moves the generator followed from a sample of positions are counted
+against a plain legal-move enumeration of the same boards first, and the
+exit status is non-zero when any count differs.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from game.board import Board
+from game.tablebase import (
+    Tablebase,
+    Signature,
+    INVALID,
+    HEADER_SIZE,
+    ILLEGAL,
+    generate,
+    _expand,
+)
+
+
+def boardAt(signature: "Signature", index: int) -> "Board":
+    squares, stm = signature.decode(index)
+    rows = [["1"] * 8 for _ in range(8)]
+    for (color, kind), sq in zip(signature.pieces, squares):
+        letter = "pnbrqk"[kind]
+        rows[sq >> 3][sq & 7] = letter.upper() if color == 1 else letter
+    fen = "/".join("".join(row) for row in rows)
+    return Board.fromFEN(fen + (" w" if stm == 1 else " b") + " - - 0 1")
+
+
+def samplePositions(
+    tablebase: "Tablebase", name: str, count: int, rng: "random.Random"
+) -> "list[Board]":
+    """Boards of legal positions picked at random from a table's own index."""
+    table = tablebase.table(name)
+    assert table != None
+    signature, data = table
+    boards = []
+    while len(boards) < count:
+        index = rng.randrange(signature.size)
+        if data[HEADER_SIZE + index] == INVALID:
+            continue
+        boards.append(boardAt(signature, index))
+    return boards
+
+
+def checkSuccessors(directory: str, name: str, count: int, rng: "random.Random") -> int:
+    """Positions among `count` random ones whose generator moves differ in number
+    from Board.generateMoves on the same board."""
+    signature = Signature(name)
+    bad = checked = 0
+    while checked < count:
+        index = rng.randrange(signature.size)
+        statuses, offsets, _ = _expand(name, directory, index, index + 1)
+        if statuses[0] == ILLEGAL:
+            continue
+        checked += 1
+        expected = len(boardAt(signature, index).generateMoves())
+        if offsets[1] != expected:
+            bad += 1
+            print(
+                "%s index %d: %d successors, %d legal moves"
+                % (name, index, offsets[1], expected)
+            )
+    return bad
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-d", "--directory", help="table directory")
+    parser.add_argument("-n", "--probes", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--check", type=int, default=2000, help="positions to check, 0 for none"
+    )
+    args = parser.parse_args()
+
+    directory = args.directory
+    if directory == None:
+        directory = tempfile.mkdtemp()
+        generate("KRvK", directory)
+    rng = random.Random(args.seed)
+    tablebase = Tablebase(directory)
+    bad = 0
+    try:
+        for fileName in sorted(os.listdir(directory)):
+            name = fileName[:-3]
+            if not fileName.endswith(".tb") or len(Signature(name).pieces) < 3:
+                continue
+            if args.check:
+                bad += checkSuccessors(directory, name, args.check, rng)
+            boards = samplePositions(tablebase, name, 200, rng)
+            work = [boards[i % len(boards)] for i in range(args.probes)]
+            start = time.perf_counter()
+            for board in work:
+                tablebase.probe(board)
+            elapsed = time.perf_counter() - start
+            print(
+                "%-8s %8d probes %8.3fs %8.2fus per probe"
+                % (name, len(work), elapsed, elapsed / len(work) * 1e6)
+            )
+    finally:
+        tablebase.close()
+        if args.directory == None:
+            shutil.rmtree(directory)
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,53 @@
 from typing import TYPE_CHECKING
+from game.bitboard import PAWN
+from game.moves import movePromotion, PROMOTION_LETTERS
+from game.utils import endcodingFromPos
 
 if TYPE_CHECKING:
     from ..game.board import Board
+    from ..game.book import Book
+    from ..game.tablebase import Tablebase
     from ..game.utils import Color, Pos
 
 
 class Bot:
-    def __init__(self) -> None:
-        pass
+    def __init__(
+        self, book: "Book|None" = None, tablebase: "Tablebase|None" = None
+    ) -> None:
+        # opening book and endgame tables consulted before thinking about a move
+        self.book = book
+        self.tablebase = tablebase
+        # move code of the last move given, its promotion answers giveUpgrade
+        self.lastMove = 0
 
-    def giveNextMove(self, board: "Board", color: "Color") -> "tuple[Pos,Pos]":
+    def bookMove(self, board: "Board") -> int:
+        """Move code from the opening book for the side to move, 0 out of book."""
+        if self.book == None:
+            return 0
+        return self.book.choose(board)
+
+    def tablebaseMove(self, board: "Board") -> int:
+        """Move code from the endgame tables for the side to move, 0 when not covered."""
+        if self.tablebase == None:
+            return 0
+        return self.tablebase.bestMove(board)
+
+    def giveMove(self, board: "Board", color: "Color") -> "tuple[Pos,Pos]":
         return None  # type: ignore
 
     def giveUpgrade(self, board: "Board", color: "Color", move: "tuple[Pos,Pos]"):
+        letter = PROMOTION_LETTERS.get(movePromotion(self.lastMove), "q").upper()
+
         def getInput(message: "str") -> "str":
-            return "Q"
+            return letter
 
         return getInput
+
+    def giveUCIMove(self, board: "Board") -> str:
+        """The move of the side to move in UCI notation, promotion included."""
+        src, dest = self.giveMove(board, board.turn)
+        uci = endcodingFromPos(src) + endcodingFromPos(dest)
+        piece = board.getPiece(src)
+        if piece != None and piece.kind == PAWN and dest.Y in (0, 7):
+            uci += self.giveUpgrade(board, board.turn, (src, dest))("").lower()
+        return uci
@@ -0,0 +1,163 @@
+from typing import TYPE_CHECKING
+from concurrent.futures import ProcessPoolExecutor, wait
+import os
+from .bot import Bot
+from .searchBot import SearchBot, MAX_PLY
+from .transposition import SharedTranspositionTable
+from game.board import Board
+from game.bitboard import posOf
+from game.moves import moveSrc, moveDest
+
+if TYPE_CHECKING:
+    from ..game.book import Book
+    from ..game.tablebase import Tablebase
+    from ..game.utils import Pos, Color
+
+# one engine per worker process, all of them on the bot's shared
+# transposition table
+_engine: "SearchBot|None" = None
+
+
+def _initWorker(tt: "SharedTranspositionTable", tablebase: "Tablebase|None") -> None:
+    global _engine
+    _engine = SearchBot(tablebase=tablebase, tt=tt)
+
+
+def _searchWorker(
+    fen: str,
+    rootMoves: "list[int]|None",
+    timeLimit: float,
+    maxDepth: int,
+    startDepth: int,
+) -> "tuple[list[tuple[int, int, int]], int]":
+    """Search a position sent as FEN, returns (finished iterations, nodes)."""
+    engine = _engine if _engine != None else SearchBot()
+    board = Board.fromFEN(fen)
+    engine.search(board, timeLimit, maxDepth, rootMoves, startDepth)
+    return engine.iterations, engine.nodes
+
+
+class ParallelSearchBot(Bot):
+    """SearchBot spread over a pool of worker processes.
+
+    The workers share one transposition table in shared memory. In "split"
+    mode the root moves are dealt round-robin to the workers and the best
+    score at the deepest depth every worker finished wins. In "lazy" mode
+    every worker searches the whole position, starting at staggered depths,
+    and through the shared table each one finds what the others already
+    searched; the deepest finished result wins. Positions go to the workers
+    as FEN strings rather than pickled boards. `depth` is the depth of the
+    last move's result.
+    """
+
+    def __init__(
+        self,
+        workers: "int|None" = None,
+        mode: str = "split",
+        timeLimit: float = 1.0,
+        maxDepth: int = MAX_PLY,
+        ttSizeMB: float = 16,
+        book: "Book|None" = None,
+        tablebase: "Tablebase|None" = None,
+    ) -> None:
+        super().__init__(book, tablebase)
+        if mode not in ("split", "lazy"):
+            raise ValueError("mode must be 'split' or 'lazy'")
+        self.workers = workers or os.cpu_count() or 1
+        self.mode = mode
+        self.timeLimit = timeLimit
+        self.maxDepth = maxDepth
+        self.ttSizeMB = ttSizeMB
+        self.tt: "SharedTranspositionTable|None" = None
+        self.pool: "ProcessPoolExecutor|None" = None
+        self.nodes = 0
+        self.depth = 0
+
+    def giveMove(self, board: "Board", color: "Color") -> "tuple[Pos,Pos]":
+        move = self.bookMove(board) or self.tablebaseMove(board) or self.search(board)
+        self.lastMove = move
+        return posOf(moveSrc(move)), posOf(moveDest(move))
+
+    def getPool(self) -> ProcessPoolExecutor:
+        if self.pool == None:
+            self.tt = SharedTranspositionTable(self.ttSizeMB)
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_initWorker,
+                # workers attach to the same table and map the same table files
+                initargs=(self.tt, self.tablebase),
+            )
+        return self.pool
+
+    def close(self) -> None:
+        if self.pool != None:
+            self.pool.shutdown()
+            self.pool = None
+        if self.tt != None:
+            self.tt.close()
+            self.tt = None
+
+    def search(self, board: "Board", timeLimit: "float|None" = None) -> int:
+        """Best move code for the side to move, 0 when there is no legal move."""
+        timeLimit = self.timeLimit if timeLimit == None else timeLimit
+        moves = board.generateMoves()
+        if len(moves) <= 1:
+            return moves[0] if moves else 0
+        fen = board.toFEN()
+        pool = self.getPool()
+        # the workers take this search's age from the table
+        self.tt.newSearch()  # type: ignore
+        if self.mode == "split":
+            count = min(self.workers, len(moves))
+            jobs = [
+                (fen, moves[i::count], timeLimit, self.maxDepth, 1)
+                for i in range(count)
+            ]
+        else:
+            jobs = [
+                (fen, None, timeLimit, self.maxDepth, 1 + i % 2)
+                for i in range(self.workers)
+            ]
+        futures = [pool.submit(_searchWorker, *job) for job in jobs]
+        # workers stop on their own clock, the slack covers process overhead
+        wait(futures, timeout=timeLimit + 5)
+        results = []
+        self.nodes = 0
+        for future in futures:
+            if not future.done() or future.exception() != None:
+                continue
+            iterations, nodes = future.result()
+            self.nodes += nodes
+            if iterations:
+                results.append(iterations)
+        if not results:
+            self.depth = 0
+            return moves[0]
+        if self.mode == "split":
+            self.depth, move = combineSplit(results)
+        else:
+            self.depth, move = combineLazy(results)
+        return move
+
+
+def combineSplit(results: "list[list[tuple[int, int, int]]]") -> "tuple[int, int]":
+    """(depth, move), comparing workers at the deepest depth all of them finished."""
+    depth = min(iterations[-1][0] for iterations in results)
+    best = None
+    for iterations in results:
+        for d, score, move in iterations:
+            if d == depth and (best == None or score > best[0]):
+                best = (score, move)
+    return depth, best[1]  # type: ignore
+
+
+def combineLazy(results: "list[list[tuple[int, int, int]]]") -> "tuple[int, int]":
+    """(depth, move), the deepest result wins and ties go to the move most
+    workers agree on."""
+    depth = max(iterations[-1][0] for iterations in results)
+    votes: "dict[int, int]" = {}
+    for iterations in results:
+        d, _, move = iterations[-1]
+        if d == depth:
+            votes[move] = votes.get(move, 0) + 1
+    return depth, max(votes, key=lambda move: votes[move])
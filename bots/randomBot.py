@@ -2,22 +2,28 @@ from typing import TYPE_CHECKING
 from random import choice
 from .bot import Bot
 from time import sleep
+from game.bitboard import posOf
+from game.moves import moveSrc, moveDest
 
 if TYPE_CHECKING:
     from ..game.board import Board
+    from ..game.book import Book
     from ..game.utils import Pos, Color
 
 
 class RandomBot(Bot):
+    def __init__(self, delay: float = 1, book: "Book|None" = None) -> None:
+        super().__init__(book)
+        # seconds to pause before answering, so a human can follow the game
+        self.delay = delay
+
     def giveMove(self, board: "Board", color: "Color") -> "tuple[Pos,Pos]":
-        sleep(1)
+        if self.delay > 0:
+            sleep(self.delay)
+        self.lastMove = self.bookMove(board)
+        if self.lastMove:
+            return posOf(moveSrc(self.lastMove)), posOf(moveDest(self.lastMove))
         allMoves = board.getAllPossibleMoves(color)
         pieceMoves = choice(allMoves)
         move = choice(pieceMoves.to)
         return pieceMoves.piece.pos, move
-
-    def giveUpgrade(self, board: "Board", color: "Color", move: "tuple[Pos,Pos]"):
-        def getInput(message: "str") -> "str":
-            return "Q"
-
-        return getInput
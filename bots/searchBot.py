@@ -0,0 +1,316 @@
+from typing import TYPE_CHECKING
+from time import perf_counter
+from .bot import Bot
+from .transposition import TranspositionTable, EXACT, LOWER, UPPER
+from game.bitboard import PAWN, posOf
+from game.evaluation import PIECE_VALUES
+from game.moves import moveSrc, moveDest
+
+if TYPE_CHECKING:
+    from ..game.board import Board
+    from ..game.book import Book
+    from ..game.tablebase import Tablebase
+    from ..game.utils import Pos, Color
+
+MATE = 100000
+# scores beyond this are mates, stored relative to the node in the table
+MATE_BOUND = MATE - 1000
+MAX_PLY = 64
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class SearchBot(Bot):
+    """Iterative deepening negamax alpha-beta with a transposition table.
+
+    Below the root moves come from Board.stagedMoves: the table move,
+    captures that don't lose material by static exchange, promotions, then
+    the quiet moves by killer moves and the history heuristic, and the
+    losing captures last. The quiescence search stops before the quiet
+    moves. When the time budget runs out the best move of the
+    last finished iteration is played.
+    """
+
+    def __init__(
+        self,
+        timeLimit: float = 1.0,
+        maxDepth: int = MAX_PLY,
+        ttSizeMB: float = 16,
+        book: "Book|None" = None,
+        tablebase: "Tablebase|None" = None,
+        tt: "TranspositionTable|None" = None,
+    ) -> None:
+        super().__init__(book, tablebase)
+        self.timeLimit = timeLimit
+        self.maxDepth = maxDepth
+        # a table passed in, such as a shared one, is used instead of a new one
+        self.tt = TranspositionTable(ttSizeMB) if tt == None else tt
+        self.nodes = 0
+        # set by stop() from another thread, cleared by whoever starts a search
+        self.stopped = False
+
+    def giveMove(self, board: "Board", color: "Color") -> "tuple[Pos,Pos]":
+        # the search plays for board.turn, which is `color` during a game
+        move = self.bookMove(board) or self.tablebaseMove(board) or self.search(board)
+        self.lastMove = move
+        return posOf(moveSrc(move)), posOf(moveDest(move))
+
+    def stop(self) -> None:
+        """Make a running search return its best move so far, callable from any thread."""
+        self.stopped = True
+
+    # search
+
+    def search(
+        self,
+        board: "Board",
+        timeLimit: "float|None" = None,
+        maxDepth: "int|None" = None,
+        rootMoves: "list[int]|None" = None,
+        startDepth: int = 1,
+    ) -> int:
+        """Best move code for the side to move, 0 when there is no legal move.
+
+        `rootMoves` restricts the moves searched at the root and `startDepth`
+        skips the first iterations, which the parallel search uses to give
+        its workers different work. Finished iterations are kept in
+        `self.iterations` as (depth, score, move).
+        """
+        timeLimit = self.timeLimit if timeLimit == None else timeLimit
+        maxDepth = self.maxDepth if maxDepth == None else maxDepth
+        self.deadline = perf_counter() + timeLimit
+        self.nodes = 0
+        self.killers = [[0, 0] for _ in range(MAX_PLY + 1)]
+        self.history = [[0] * 4096 for _ in range(2)]
+        self.iterations: "list[tuple[int, int, int]]" = []
+        self.tt.newSearch()
+
+        legal = board.generateMoves()
+        self.rootMoves = (
+            legal if rootMoves == None else [m for m in legal if m in rootMoves]
+        )
+        # a score over some of the root moves must not be reused elsewhere
+        self.rootRestricted = len(self.rootMoves) < len(legal)
+        if not self.rootMoves:
+            return 0
+        bestMove = self.rootBest = self.rootMoves[0]
+        rootDepth = len(board.moveStack)
+        for depth in range(min(startDepth, maxDepth), maxDepth + 1):
+            try:
+                score = self.negamax(board, depth, -MATE, MATE, 0)
+            except SearchTimeout:
+                # unwind the moves the interrupted iteration left on the board
+                while len(board.moveStack) > rootDepth:
+                    board.unmakeMove()
+                break
+            bestMove = self.rootBest
+            self.iterations.append((depth, score, bestMove))
+            self.onIteration(depth, score, bestMove)
+            if abs(score) >= MATE_BOUND:
+                break
+        return bestMove
+
+    def onIteration(self, depth: int, score: int, bestMove: int) -> None:
+        """Called after every finished iteration, for subclasses that report progress."""
+        pass
+
+    def principalVariation(
+        self, board: "Board", bestMove: int, length: int
+    ) -> "list[int]":
+        """`bestMove` followed by the table moves of the positions it leads to."""
+        pv = []
+        move = bestMove
+        seen = set()
+        while move and len(pv) < length and board.zobristKey not in seen:
+            if move not in board.generateMoves():
+                break
+            seen.add(board.zobristKey)
+            pv.append(move)
+            board.pushMove(move)
+            entry = self.tt.probe(board.zobristKey)
+            move = entry[3] if entry != None else 0
+        for _ in pv:
+            board.unmakeMove()
+        return pv
+
+    def negamax(
+        self, board: "Board", depth: int, alpha: int, beta: int, ply: int
+    ) -> int:
+        self.nodes += 1
+        if self.nodes & 255 == 0 and (self.stopped or perf_counter() > self.deadline):
+            raise SearchTimeout()
+
+        key = board.zobristKey
+        ttMove = 0
+        entry = self.tt.probe(key)
+        if entry != None:
+            score, ttDepth, bound, ttMove = entry
+            if ply > 0 and ttDepth >= depth:
+                score = fromTT(score, ply)
+                if bound == EXACT:
+                    return score
+                if bound == LOWER and score >= beta:
+                    return score
+                if bound == UPPER and score <= alpha:
+                    return score
+
+        if self.tablebase != None and ply > 0:
+            result = self.tablebase.probe(board)
+            if result != None:
+                wdl, plies = result
+                return wdl * (MATE - ply - plies)
+
+        inCheck = board.checked == board.turn
+        if depth <= 0 and not inCheck:
+            return self.quiescence(board, alpha, beta, ply)
+
+        if ply >= MAX_PLY:
+            if not board.hasLegalMove():
+                return -MATE + ply if inCheck else 0
+            return self.evaluate(board)
+        if ply > 0:
+            # generated stage by stage, a cutoff on the table move or a
+            # capture never builds the quiet moves
+            moves = board.stagedMoves(
+                hashMove=ttMove,
+                quietOrder=lambda quiets: self.orderQuiets(board, quiets, ply),
+            )
+        else:
+            moves = iter(self.orderMoves(board, self.rootMoves, ttMove, ply))
+
+        alphaOrig = alpha
+        bestScore = -MATE
+        bestMove = 0
+        color = board.turn.value
+        for move in moves:
+            if not bestMove:
+                bestMove = move
+            board.pushMove(move)
+            score = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+            board.unmakeMove()
+            if score > bestScore:
+                bestScore = score
+                bestMove = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                if not self.isCapture(board, move):
+                    killers = self.killers[ply]
+                    if killers[0] != move:
+                        killers[1] = killers[0]
+                        killers[0] = move
+                    self.history[color][move & 4095] += depth * depth
+                break
+        if not bestMove:
+            return -MATE + ply if inCheck else 0
+
+        if bestScore <= alphaOrig:
+            bound = UPPER
+        elif bestScore >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        if ply > 0 or not self.rootRestricted:
+            self.tt.store(key, toTT(bestScore, ply), max(depth, 0), bound, bestMove)
+        if ply == 0:
+            self.rootBest = bestMove
+        return bestScore
+
+    def quiescence(self, board: "Board", alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        if self.nodes & 255 == 0 and (self.stopped or perf_counter() > self.deadline):
+            raise SearchTimeout()
+        standPat = self.evaluate(board)
+        if standPat >= beta or ply >= MAX_PLY:
+            return standPat
+        if standPat > alpha:
+            alpha = standPat
+        # captures that don't lose material in the exchange, then queen promotions
+        for move in board.stagedMoves(quiets=False):
+            board.pushMove(move)
+            score = -self.quiescence(board, -beta, -alpha, ply + 1)
+            board.unmakeMove()
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+    # move ordering
+
+    def isCapture(self, board: "Board", move: int) -> bool:
+        dest = moveDest(move)
+        if board.board[dest >> 3][dest & 7] != None:
+            return True
+        piece = board.board[(move & 63) >> 3][move & 7]
+        return dest == board.epSquare and piece != None and piece.kind == PAWN
+
+    def orderQuiets(self, board: "Board", moves: "list[int]", ply: int) -> "list[int]":
+        """Killer moves first, then by the history heuristic."""
+        killers = self.killers[ply] if ply <= MAX_PLY else [0, 0]
+        history = self.history[board.turn.value]
+
+        def score(move: int) -> int:
+            if move == killers[0]:
+                return 1 << 22
+            if move == killers[1]:
+                return (1 << 22) - 1
+            return min(history[move & 4095], (1 << 22) - 2)
+
+        return sorted(moves, key=score, reverse=True)
+
+    def orderMoves(
+        self, board: "Board", moves: "list[int]", ttMove: int, ply: int
+    ) -> "list[int]":
+        killers = self.killers[ply] if ply <= MAX_PLY else [0, 0]
+        history = self.history[board.turn.value]
+        squares = board.board
+        scored = []
+        for move in moves:
+            if move == ttMove:
+                scored.append((1 << 30, move))
+                continue
+            dest = (move >> 6) & 63
+            victim = squares[dest >> 3][dest & 7]
+            attacker = squares[(move & 63) >> 3][move & 7]
+            if victim != None:
+                # most valuable victim first, cheapest attacker breaks ties
+                score = (1 << 24) + PIECE_VALUES[victim.kind] * 8 - attacker.kind  # type: ignore
+            elif move >> 12:
+                score = (1 << 23) + (move >> 12)
+            elif dest == board.epSquare and attacker.kind == PAWN:  # type: ignore
+                score = (1 << 24) + PIECE_VALUES[PAWN] * 8
+            elif move == killers[0]:
+                score = 1 << 22
+            elif move == killers[1]:
+                score = (1 << 22) - 1
+            else:
+                score = min(history[move & 4095], (1 << 22) - 2)
+            scored.append((score, move))
+        scored.sort(reverse=True)
+        return [move for _, move in scored]
+
+    # evaluation
+
+    def evaluate(self, board: "Board") -> int:
+        """Static score from the side to move's point of view."""
+        return board.evaluate(board.turn)
+
+
+def toTT(score: int, ply: int) -> int:
+    # mate scores are stored as distance from this node rather than the root
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def fromTT(score: int, ply: int) -> int:
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
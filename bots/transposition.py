@@ -0,0 +1,145 @@
+"""Fixed-size transposition table for the search bots."""
+from multiprocessing import shared_memory
+import os
+
+# bounds stored with a score
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# rough cost of one slot: two list pointers plus a key and a packed entry int
+ENTRY_BYTES = 2 * 8 + 36 + 36
+
+_SCORE_BITS = 22
+_SCORE_OFFSET = 1 << (_SCORE_BITS - 1)
+
+
+class TranspositionTable:
+    """Zobrist keyed table with one slot per index and depth-preferred replacement.
+
+    An entry is packed into a single int (score, depth, bound, age and move)
+    so the table costs the same amount of memory however full it is. A slot
+    is overwritten when it is empty, holds the same position, was written
+    during an earlier search, or holds a shallower result. The key is stored
+    xor the entry, so a slot whose key and entry were written by different
+    processes never matches a probe.
+    """
+
+    entryBytes = ENTRY_BYTES
+
+    def __init__(self, sizeMB: float = 16) -> None:
+        entries = max(1, int(sizeMB * 1024 * 1024) // self.entryBytes)
+        # power of two so the index is a mask of the key
+        self.size = 1 << (entries.bit_length() - 1)
+        self.mask = self.size - 1
+        self.keys: "list[int]" = [0] * self.size
+        self.entries: "list[int]" = [0] * self.size
+        self.age = 0
+
+    def newSearch(self) -> None:
+        self.age = (self.age + 1) & 0xFF
+
+    def clear(self) -> None:
+        self.keys = [0] * self.size
+        self.entries = [0] * self.size
+        self.age = 0
+
+    def probe(self, key: int) -> "tuple[int, int, int, int]|None":
+        """(score, depth, bound, move) stored for `key`, or None."""
+        index = key & self.mask
+        entry = self.entries[index]
+        if self.keys[index] ^ entry != key:
+            return None
+        score = (entry & ((1 << _SCORE_BITS) - 1)) - _SCORE_OFFSET
+        entry >>= _SCORE_BITS
+        depth = entry & 0xFF
+        bound = (entry >> 8) & 3
+        move = entry >> 18
+        return score, depth, bound, move
+
+    def store(self, key: int, score: int, depth: int, bound: int, move: int) -> None:
+        index = key & self.mask
+        old = self.entries[index]
+        if self.keys[index] ^ old != key and old:
+            oldDepth = (old >> _SCORE_BITS) & 0xFF
+            oldAge = (old >> (_SCORE_BITS + 10)) & 0xFF
+            if oldAge == self.age and oldDepth > depth:
+                return
+        entry = (
+            (score + _SCORE_OFFSET)
+            | min(depth, 0xFF) << _SCORE_BITS
+            | bound << (_SCORE_BITS + 8)
+            | self.age << (_SCORE_BITS + 10)
+            | move << (_SCORE_BITS + 18)
+        )
+        self.keys[index] = key ^ entry
+        self.entries[index] = entry
+
+    def usage(self) -> float:
+        """Fraction of slots written during the current search."""
+        sample = min(self.size, 1000)
+        used = 0
+        for i in range(sample):
+            if (
+                self.entries[i]
+                and (self.entries[i] >> (_SCORE_BITS + 10)) & 0xFF == self.age
+            ):
+                used += 1
+        return used / sample
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """TranspositionTable in shared memory, for the processes of one search.
+
+    The process that creates it owns the block and unlinks it on `close`;
+    a pickled table attaches to the same block by name, so every worker
+    reads and writes the same slots without locking. Only the owner moves
+    the age on, the others pick it up from the block in `newSearch`.
+    """
+
+    # a 64 bit key and a 64 bit entry
+    entryBytes = 16
+
+    def __init__(self, sizeMB: float = 16, name: "str|None" = None) -> None:
+        entries = max(1, int(sizeMB * 1024 * 1024) // self.entryBytes)
+        self.size = 1 << (entries.bit_length() - 1)
+        self.mask = self.size - 1
+        self.sizeMB = sizeMB
+        # a forked worker inherits this object, so the owner is a process
+        self.owner = os.getpid() if name == None else None
+        if name == None:
+            self.memory = shared_memory.SharedMemory(
+                create=True, size=8 + self.size * self.entryBytes
+            )
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+        words = self.memory.buf.cast("Q")
+        # the first word holds the age
+        self.header = words[:1]
+        self.keys = words[1 : self.size + 1]  # type: ignore
+        self.entries = words[self.size + 1 :]  # type: ignore
+        self.age = self.header[0]
+
+    def __getstate__(self) -> dict:
+        return {"sizeMB": self.sizeMB, "name": self.memory.name}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["sizeMB"], state["name"])
+
+    def newSearch(self) -> None:
+        if self.owner == os.getpid():
+            self.header[0] = (self.header[0] + 1) & 0xFF
+        self.age = self.header[0]
+
+    def clear(self) -> None:
+        self.memory.buf[:] = bytes(len(self.memory.buf))
+        self.age = 0
+
+    def close(self) -> None:
+        # the mapping can only be closed once no view of it is left
+        self.header.release()
+        self.keys.release()  # type: ignore
+        self.entries.release()  # type: ignore
+        self.memory.close()
+        if self.owner == os.getpid():
+            self.memory.unlink()
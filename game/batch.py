@@ -0,0 +1,421 @@
+"""Vectorized move generation over many positions at once, needs numpy.
+
+Positions are given as an (N, 12) uint64 array of the Board.bitboards
+layout, index `color.value * 6 + kind` and bit `Y * 8 + X`, or as
+(N, 12, 8, 8) piece planes indexed [position, piece, Y, X]. Every function
+works on the whole batch with numpy operations and gives the same answers
+as the scalar Board code for each position:
+
+    pseudoLegalMoves  (N, 64) destinations of the piece on each square,
+                      Piece.moveMask
+    attackMaps        (N, 2) squares attacked by each color, attackedBy
+    inCheck           (N, 2) whether each color's king is attacked,
+                      Board.checkers(color) != 0
+
+En passant squares and castling rights are not part of the bitboards and
+are passed separately where they matter.
+"""
+from typing import TYPE_CHECKING, Callable, Iterable
+
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError("game.batch needs numpy, install it with `pip install numpy`")
+
+from .bitboard import (
+    PAWN,
+    KNIGHT,
+    BISHOP,
+    ROOK,
+    QUEEN,
+    KING,
+    FULL,
+    SQUARE_BB,
+    KNIGHT_ATTACKS,
+    KING_ATTACKS,
+    PAWN_ATTACKS,
+    RAYS,
+    ROOK_MASKS,
+    BISHOP_MASKS,
+    rookAttacks,
+    bishopAttacks,
+)
+from .zobrist import WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE
+
+if TYPE_CHECKING:
+    from .board import Board
+
+U64 = np.uint64
+
+
+def _files(*files: int) -> int:
+    return sum(SQUARE_BB[y * 8 + x] for x in files for y in range(8))
+
+
+def _rows(*rows: int) -> int:
+    return sum(SQUARE_BB[y * 8 + x] for y in rows for x in range(8))
+
+
+ROW_2 = U64(_rows(2))
+ROW_5 = U64(_rows(5))
+ZERO = U64(0)
+
+SQUARE_TABLE = np.array(SQUARE_BB, dtype=U64)
+KNIGHT_TABLE = np.array(KNIGHT_ATTACKS, dtype=U64)
+KING_TABLE = np.array(KING_ATTACKS, dtype=U64)
+PAWN_TABLE = np.array(PAWN_ATTACKS, dtype=U64)
+# bitboard index + 1, so 0 means an empty square, and back to kind and color
+CODES = np.arange(1, 13, dtype=np.uint8)
+CODE_KINDS = np.array([-1] + [index % 6 for index in range(12)], dtype=np.int8)
+CODE_COLORS = np.array([0] + [index // 6 for index in range(12)], dtype=np.int64)
+
+
+def _pawnTable(step: int, rows: "list[range]") -> "list[int]":
+    table = []
+    for color in (0, 1):
+        direction = 1 if color == 0 else -1
+        for sq in range(64):
+            dest = sq + direction * step
+            ok = (sq >> 3) in rows[color] and 0 <= dest < 64
+            table.append(SQUARE_BB[dest] if ok else 0)
+    return table
+
+
+# the square one and two rows in front of a pawn, by color value * 64 + square
+PAWN_PUSH_TABLE = np.array(_pawnTable(8, [range(8), range(8)]), dtype=U64)
+PAWN_DOUBLE_TABLE = np.array(_pawnTable(16, [range(1, 2), range(6, 7)]), dtype=U64)
+
+
+def _step(dx: int, dy: int) -> "tuple[int, bool, np.uint64]":
+    """(shift, shift left, mask) moving every bit by (dx, dy) without wrapping."""
+    amount = dy * 8 + dx
+    if dx > 0:
+        mask = FULL ^ _files(*range(dx))
+    elif dx < 0:
+        mask = FULL ^ _files(*range(8 + dx, 8))
+    else:
+        mask = FULL
+    return abs(amount), amount > 0, U64(mask)
+
+
+def _shift(bb: "np.ndarray", amount: int, left: bool) -> "np.ndarray":
+    return bb << U64(amount) if left else bb >> U64(amount)
+
+
+def _leap(bb: "np.ndarray", step: "tuple[int, bool, np.uint64]") -> "np.ndarray":
+    amount, left, mask = step
+    return _shift(bb, amount, left) & mask
+
+
+def _slide(
+    gen: "np.ndarray", empty: "np.ndarray", step: "tuple[int, bool, np.uint64]"
+) -> "np.ndarray":
+    """Squares the pieces in `gen` reach in one direction, blockers included."""
+    amount, left, mask = step
+    # Kogge-Stone fill, `prop` is where a ray may continue
+    prop = empty & mask
+    gen = gen | prop & _shift(gen, amount, left)
+    prop = prop & _shift(prop, amount, left)
+    gen = gen | prop & _shift(gen, 2 * amount, left)
+    prop = prop & _shift(prop, 2 * amount, left)
+    gen = gen | prop & _shift(gen, 4 * amount, left)
+    return _shift(gen, amount, left) & mask
+
+
+KNIGHT_STEPS = [
+    _step(dx, dy)
+    for dx, dy in [
+        (2, 1),
+        (2, -1),
+        (-2, 1),
+        (-2, -1),
+        (1, 2),
+        (1, -2),
+        (-1, 2),
+        (-1, -2),
+    ]
+]
+KING_STEPS = [
+    _step(dx, dy)
+    for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)]
+]
+ROOK_STEPS = [_step(dx, dy) for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]]
+BISHOP_STEPS = [_step(dx, dy) for dx, dy in [(1, 1), (1, -1), (-1, 1), (-1, -1)]]
+
+
+def _lineTable(
+    directions: "list[tuple[int, int]]",
+    masks: "list[int]",
+    attacks: "Callable[[int, int], int]",
+) -> tuple:
+    """(inner masks, multipliers, attacks) for single piece lookups along one line.
+
+    The inner squares of the line through a square are multiplied into the
+    top 6 bits, which index the attacks along that line for every blocker
+    pattern. The multipliers were checked to be collision free on every
+    square.
+    """
+    inners, multipliers = [], []
+    table = np.zeros(64 * 64, dtype=U64)
+    for sq in range(64):
+        line = RAYS[directions[0]][sq] | RAYS[directions[1]][sq]
+        inner = masks[sq] & line
+        multiplier = 0
+        slot = 63
+        for bit in reversed(range(64)):
+            if inner >> bit & 1:
+                multiplier |= 1 << (slot - bit)
+                slot -= 1
+        # every blocker pattern on the inner squares
+        occ = 0
+        while True:
+            index = (occ * multiplier & FULL) >> 58
+            table[sq * 64 + index] = attacks(sq, occ) & line
+            occ = (occ - inner) & inner
+            if not occ:
+                break
+        inners.append(inner)
+        multipliers.append(multiplier)
+    return np.array(inners, dtype=U64), np.array(multipliers, dtype=U64), table
+
+
+ROOK_LINES = [
+    _lineTable([(1, 0), (-1, 0)], ROOK_MASKS, rookAttacks),
+    _lineTable([(0, 1), (0, -1)], ROOK_MASKS, rookAttacks),
+]
+BISHOP_LINES = [
+    _lineTable([(1, 1), (-1, -1)], BISHOP_MASKS, bishopAttacks),
+    _lineTable([(1, -1), (-1, 1)], BISHOP_MASKS, bishopAttacks),
+]
+
+
+def _lineAttacks(
+    lines: "list[tuple]", sq: "np.ndarray", occ: "np.ndarray"
+) -> "np.ndarray":
+    attacks = np.zeros(len(sq), dtype=U64)
+    for inners, multipliers, table in lines:
+        index = ((occ & inners[sq]) * multipliers[sq]) >> U64(58)
+        attacks |= table[sq * 64 + index.astype(np.int64)]
+    return attacks
+
+
+# indexed by color value, black pawns move towards higher rows
+PAWN_CAPTURE_STEPS = [
+    [_step(-1, 1), _step(1, 1)],
+    [_step(-1, -1), _step(1, -1)],
+]
+
+
+def _squares(*sqs: int) -> "np.uint64":
+    return U64(sum(SQUARE_BB[sq] for sq in sqs))
+
+
+# (right, color, king square, rook square, squares that must be empty,
+#  squares that must not be attacked, king destination)
+CASTLING = [
+    (WHITE_KINGSIDE, 1, 60, 63, _squares(61, 62), _squares(60, 61, 62), 62),
+    (WHITE_QUEENSIDE, 1, 60, 56, _squares(57, 58, 59), _squares(60, 59, 58), 58),
+    (BLACK_KINGSIDE, 0, 4, 7, _squares(5, 6), _squares(4, 5, 6), 6),
+    (BLACK_QUEENSIDE, 0, 4, 0, _squares(1, 2, 3), _squares(4, 3, 2), 2),
+]
+
+
+# input conversion
+
+
+def asBitboards(positions: "np.ndarray") -> "np.ndarray":
+    """(N, 12) uint64 bitboards from either accepted input shape."""
+    positions = np.asarray(positions)
+    if positions.ndim == 2 and positions.shape[1] == 12:
+        return positions.astype(U64, copy=False)
+    if positions.ndim == 4 and positions.shape[1:] == (12, 8, 8):
+        bits = np.packbits(
+            positions.reshape(len(positions), 12, 64).astype(bool),
+            axis=-1,
+            bitorder="little",
+        )
+        return (
+            np.ascontiguousarray(bits)
+            .view("<u8")
+            .reshape(len(positions), 12)
+            .astype(U64)
+        )
+    raise ValueError(
+        "expected an (N, 12) or (N, 12, 8, 8) array, got %s" % (positions.shape,)
+    )
+
+
+def toPlanes(bitboards: "np.ndarray") -> "np.ndarray":
+    """(N, 12, 8, 8) uint8 piece planes from (N, 12) bitboards."""
+    bitboards = asBitboards(bitboards)
+    bits = np.unpackbits(
+        bitboards.astype("<u8").view(np.uint8).reshape(len(bitboards), 12, 8),
+        axis=-1,
+        bitorder="little",
+    )
+    return bits.reshape(len(bitboards), 12, 8, 8)
+
+
+def fromBoards(
+    boards: "Iterable[Board]",
+) -> "tuple[np.ndarray, np.ndarray, np.ndarray]":
+    """(bitboards, en passant squares, castling rights) arrays for Board objects."""
+    bitboards, epSquares, rights = [], [], []
+    for board in boards:
+        bitboards.append(board.bitboards)
+        epSquares.append(board.epSquare)
+        rights.append(board.castlingRights)
+    return (
+        np.array(bitboards, dtype=U64).reshape(-1, 12),
+        np.array(epSquares, dtype=np.int64),
+        np.array(rights, dtype=np.int64),
+    )
+
+
+def _colorBoards(bb: "np.ndarray") -> "tuple[np.ndarray, np.ndarray]":
+    return np.bitwise_or.reduce(bb[:, 0:6], axis=1), np.bitwise_or.reduce(
+        bb[:, 6:12], axis=1
+    )
+
+
+# whole batch
+
+
+def attackMaps(positions: "np.ndarray") -> "np.ndarray":
+    """(N, 2) uint64, the squares each color attacks, indexed by color value."""
+    bb = asBitboards(positions)
+    black, white = _colorBoards(bb)
+    empty = ~(black | white)
+    maps = np.zeros((len(bb), 2), dtype=U64)
+    for color in (0, 1):
+        base = color * 6
+        attacks = np.zeros(len(bb), dtype=U64)
+        for step in PAWN_CAPTURE_STEPS[color]:
+            attacks |= _leap(bb[:, base + PAWN], step)
+        for step in KNIGHT_STEPS:
+            attacks |= _leap(bb[:, base + KNIGHT], step)
+        for step in KING_STEPS:
+            attacks |= _leap(bb[:, base + KING], step)
+        queens = bb[:, base + QUEEN]
+        rooks = bb[:, base + ROOK] | queens
+        bishops = bb[:, base + BISHOP] | queens
+        for step in ROOK_STEPS:
+            attacks |= _slide(rooks, empty, step)
+        for step in BISHOP_STEPS:
+            attacks |= _slide(bishops, empty, step)
+        maps[:, color] = attacks
+    return maps
+
+
+def inCheck(positions: "np.ndarray", maps: "np.ndarray|None" = None) -> "np.ndarray":
+    """(N, 2) bool, whether the king of each color is attacked."""
+    bb = asBitboards(positions)
+    if maps is None:
+        maps = attackMaps(bb)
+    checks = np.zeros((len(bb), 2), dtype=bool)
+    for color in (0, 1):
+        checks[:, color] = (bb[:, color * 6 + KING] & maps[:, 1 - color]) != ZERO
+    return checks
+
+
+def pieceCounts(positions: "np.ndarray") -> "np.ndarray":
+    """(N, 12) number of pieces on each bitboard."""
+    bb = asBitboards(positions)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(bb).astype(np.int64)
+    return toPlanes(bb).reshape(len(bb), 12, 64).sum(axis=-1, dtype=np.int64)
+
+
+def pseudoLegalMoves(
+    positions: "np.ndarray",
+    epSquares: "np.ndarray|None" = None,
+    castlingRights: "np.ndarray|None" = None,
+) -> "np.ndarray":
+    """(N, 64) uint64 pseudo-legal destinations of the piece on each square.
+
+    Empty squares get 0. `epSquares` holds the en passant square of each
+    position, -1 for none, and `castlingRights` the game.zobrist castling
+    bits; both default to none.
+    """
+    bb = asBitboards(positions)
+    count = len(bb)
+    black, white = _colorBoards(bb)
+    colorOcc = np.stack([black, white], axis=1).ravel()
+    occ = black | white
+    empty = ~occ
+
+    # piece code + 1 on every square, then one entry per piece
+    bits = np.unpackbits(
+        bb.astype("<u8").view(np.uint8).reshape(count, 12, 8),
+        axis=-1,
+        bitorder="little",
+    )
+    codes = np.einsum("nis,i->ns", bits, CODES).ravel()
+    flat = np.flatnonzero(codes)
+    code = codes[flat]
+    n = flat >> 6
+    sq = flat & 63
+    kind = CODE_KINDS[code]
+    # index into (N, 2) arrays of the piece's own color
+    side = n * 2 + CODE_COLORS[code]
+    result = np.zeros(len(flat), dtype=U64)
+
+    knights = kind == KNIGHT
+    result[knights] = KNIGHT_TABLE[sq[knights]]
+    kings = kind == KING
+    result[kings] = KING_TABLE[sq[kings]]
+
+    for sliders, lines in (
+        ((kind == ROOK) | (kind == QUEEN), ROOK_LINES),
+        ((kind == BISHOP) | (kind == QUEEN), BISHOP_LINES),
+    ):
+        result[sliders] |= _lineAttacks(lines, sq[sliders], occ[n[sliders]])
+
+    pawns = kind == PAWN
+    if pawns.any():
+        # pushes and capture targets of all pawns of a side at once, each
+        # pawn then keeps the squares in front of and diagonal to it
+        pushes = np.zeros(count * 2, dtype=U64)
+        doubles = np.zeros(count * 2, dtype=U64)
+        targets = np.zeros(count * 2, dtype=U64)
+        pushes[0::2] = (bb[:, PAWN] << U64(8)) & empty
+        doubles[0::2] = ((pushes[0::2] & ROW_2) << U64(8)) & empty
+        pushes[1::2] = (bb[:, 6 + PAWN] >> U64(8)) & empty
+        doubles[1::2] = ((pushes[1::2] & ROW_5) >> U64(8)) & empty
+        targets[0::2] = white
+        targets[1::2] = black
+        if epSquares is not None:
+            ep = np.asarray(epSquares, dtype=np.int64)
+            epBB = np.where(ep >= 0, SQUARE_TABLE[ep & 63], ZERO)
+            # en passant squares sit on the sixth rank from the capturing side
+            targets[0::2] |= np.where(ep >> 3 == 5, epBB, ZERO)
+            targets[1::2] |= np.where(ep >> 3 == 2, epBB, ZERO)
+        pside = side[pawns]
+        table = (pside & 1) * 64 + sq[pawns]
+        result[pawns] = (
+            PAWN_PUSH_TABLE[table] & pushes[pside]
+            | PAWN_DOUBLE_TABLE[table] & doubles[pside]
+            | PAWN_TABLE.ravel()[table] & targets[pside]
+        )
+
+    result &= ~colorOcc[side]
+    moves = np.zeros((count, 64), dtype=U64)
+    moves.ravel()[flat] = result
+
+    if castlingRights is not None:
+        rights = np.asarray(castlingRights, dtype=np.int64)
+        # only the positions that still have a right need attack maps
+        rows = np.flatnonzero(rights)
+        maps = attackMaps(bb[rows])
+        occ = occ[rows]
+        rights = rights[rows]
+        for flag, color, kingSq, rookSq, between, safe, dest in CASTLING:
+            able = (
+                (rights & flag != 0)
+                & (bb[rows, color * 6 + KING] & SQUARE_TABLE[kingSq] != ZERO)
+                & (bb[rows, color * 6 + ROOK] & SQUARE_TABLE[rookSq] != ZERO)
+                & (occ & between == ZERO)
+                & (maps[:, 1 - color] & safe == ZERO)
+            )
+            moves[rows[able], kingSq] |= SQUARE_TABLE[dest]
+    return moves
@@ -0,0 +1,189 @@
+"""Bitboard tables and helpers used by Board for move generation.
+
+Squares are numbered `Y * 8 + X`, so square 0 is a8 and square 63 is h1,
+and a bitboard is a python int with bit `sq` set for every occupied square.
+"""
+from .utils import Pos, SQUARES
+
+# piece kinds, a piece bitboard lives at index `color.value * 6 + kind`
+PAWN = 0
+KNIGHT = 1
+BISHOP = 2
+ROOK = 3
+QUEEN = 4
+KING = 5
+
+FULL = (1 << 64) - 1
+SQUARE_BB = [1 << sq for sq in range(64)]
+
+
+# a8 and every square of its colour
+LIGHT_SQUARES = sum(SQUARE_BB[sq] for sq in range(64) if ((sq >> 3) + sq) & 1 == 0)
+
+
+def squareOf(pos: "Pos") -> int:
+    return pos.Y * 8 + pos.X
+
+
+def posOf(sq: int) -> "Pos":
+    return SQUARES[sq]
+
+
+def lsb(bb: int) -> int:
+    return (bb & -bb).bit_length() - 1
+
+
+if hasattr(int, "bit_count"):
+    # python 3.10 and later count bits natively
+    popcount = int.bit_count
+else:
+
+    def popcount(bb: int) -> int:
+        return bin(bb).count("1")
+
+
+def squares(bb: int) -> "list[int]":
+    sqs = []
+    while bb:
+        low = bb & -bb
+        sqs.append(low.bit_length() - 1)
+        bb ^= low
+    return sqs
+
+
+def positions(bb: int) -> "list[Pos]":
+    result = []
+    while bb:
+        low = bb & -bb
+        result.append(SQUARES[low.bit_length() - 1])
+        bb ^= low
+    return result
+
+
+def _onBoard(x: int, y: int) -> bool:
+    return 0 <= x < 8 and 0 <= y < 8
+
+
+def _stepTable(steps: "list[tuple[int, int]]") -> "list[int]":
+    table = []
+    for sq in range(64):
+        x, y = sq & 7, sq >> 3
+        bb = 0
+        for dx, dy in steps:
+            if _onBoard(x + dx, y + dy):
+                bb |= SQUARE_BB[(y + dy) * 8 + x + dx]
+        table.append(bb)
+    return table
+
+
+KNIGHT_ATTACKS = _stepTable(
+    [(+2, +1), (+2, -1), (-2, +1), (-2, -1), (+1, +2), (+1, -2), (-1, +2), (-1, -2)]
+)
+KING_ATTACKS = _stepTable(
+    [(+1, 0), (-1, 0), (0, +1), (0, -1), (+1, +1), (+1, -1), (-1, +1), (-1, -1)]
+)
+# indexed by Color.value, black pawns move towards higher rows
+PAWN_ATTACKS = [_stepTable([(-1, +1), (+1, +1)]), _stepTable([(-1, -1), (+1, -1)])]
+
+ROOK_DIRECTIONS = [(+1, 0), (-1, 0), (0, +1), (0, -1)]
+BISHOP_DIRECTIONS = [(+1, +1), (+1, -1), (-1, +1), (-1, -1)]
+
+
+def _ray(sq: int, dx: int, dy: int) -> int:
+    x, y = sq & 7, sq >> 3
+    bb = 0
+    while _onBoard(x + dx, y + dy):
+        x, y = x + dx, y + dy
+        bb |= SQUARE_BB[y * 8 + x]
+    return bb
+
+
+# RAYS[(dx, dy)][sq] is every square from sq towards the edge, sq excluded
+RAYS = {
+    dir: [_ray(sq, dir[0], dir[1]) for sq in range(64)]
+    for dir in ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+}
+
+
+def _lines() -> "tuple[list[list[int]], list[list[int]]]":
+    between = [[0] * 64 for _ in range(64)]
+    line = [[0] * 64 for _ in range(64)]
+    for a in range(64):
+        for dir in ROOK_DIRECTIONS + BISHOP_DIRECTIONS:
+            ray = RAYS[dir][a]
+            back = RAYS[(-dir[0], -dir[1])][a]
+            bb = ray
+            while bb:
+                b = lsb(bb)
+                bb &= bb - 1
+                between[a][b] = ray & ~RAYS[dir][b] & ~SQUARE_BB[b]
+                line[a][b] = ray | back | SQUARE_BB[a]
+    return between, line
+
+
+# BETWEEN[a][b] is the squares strictly between two squares on a common
+# rank, file or diagonal, LINE[a][b] that whole line edge to edge; both
+# are 0 for squares that share none
+BETWEEN, LINE = _lines()
+
+
+def _increasing(dir: "tuple[int, int]") -> bool:
+    # square numbers grow along a ray going down the board or to the right
+    return dir[1] > 0 or (dir[1] == 0 and dir[0] > 0)
+
+
+def _slide(sq: int, occ: int, dirs: "list[tuple[int, int]]") -> int:
+    attacks = 0
+    for dir in dirs:
+        ray = RAYS[dir][sq]
+        blockers = ray & occ
+        if blockers:
+            if _increasing(dir):
+                first = lsb(blockers)
+            else:
+                first = blockers.bit_length() - 1
+            ray ^= RAYS[dir][first]
+        attacks |= ray
+    return attacks
+
+
+def _relevantMask(sq: int, dirs: "list[tuple[int, int]]") -> int:
+    # the last square of a ray never blocks anything beyond it
+    mask = 0
+    for dir in dirs:
+        ray = RAYS[dir][sq]
+        if ray:
+            edge = ray.bit_length() - 1 if _increasing(dir) else lsb(ray)
+            ray ^= SQUARE_BB[edge]
+        mask |= ray
+    return mask
+
+
+ROOK_MASKS = [_relevantMask(sq, ROOK_DIRECTIONS) for sq in range(64)]
+BISHOP_MASKS = [_relevantMask(sq, BISHOP_DIRECTIONS) for sq in range(64)]
+
+# magic-style lookup: relevant occupancy -> attacks, filled on first use
+_ROOK_TABLES: "list[dict[int, int]]" = [{} for _ in range(64)]
+_BISHOP_TABLES: "list[dict[int, int]]" = [{} for _ in range(64)]
+
+
+def rookAttacks(sq: int, occ: int) -> int:
+    key = occ & ROOK_MASKS[sq]
+    table = _ROOK_TABLES[sq]
+    attacks = table.get(key)
+    if attacks is None:
+        attacks = table[key] = _slide(sq, key, ROOK_DIRECTIONS)
+    return attacks
+
+
+def bishopAttacks(sq: int, occ: int) -> int:
+    key = occ & BISHOP_MASKS[sq]
+    table = _BISHOP_TABLES[sq]
+    attacks = table.get(key)
+    if attacks is None:
+        attacks = table[key] = _slide(sq, key, BISHOP_DIRECTIONS)
+    return attacks
+
+
+def queenAttacks(sq: int, occ: int) -> int:
+    return rookAttacks(sq, occ) | bishopAttacks(sq, occ)
@@ -1,7 +1,66 @@
-from typing import TYPE_CHECKING, Callable
+import os
+from typing import TYPE_CHECKING, Callable, Iterator
 
-from .utils import Pos, Color, UNICODE_PIECE_SYMBOLS as UP
-from .pieces import Pawn, Knight, Bishop, Rook, Queen, King, PossibleMoves
+from .utils import (
+    Pos,
+    Color,
+    GameStatus,
+    UNICODE_PIECE_SYMBOLS as UP,
+    posFromEncoding,
+    endcodingFromPos,
+)
+from .pieces import (
+    Pawn,
+    Knight,
+    Bishop,
+    Rook,
+    Queen,
+    King,
+    PossibleMoves,
+)
+from .bitboard import (
+    PAWN,
+    KNIGHT,
+    BISHOP,
+    ROOK,
+    QUEEN,
+    KING,
+    FULL,
+    SQUARE_BB,
+    LIGHT_SQUARES,
+    BETWEEN,
+    LINE,
+    KNIGHT_ATTACKS,
+    KING_ATTACKS,
+    PAWN_ATTACKS,
+    bishopAttacks,
+    rookAttacks,
+    popcount,
+    positions,
+    squares,
+    posOf,
+    squareOf,
+)
+from .moves import encodeMove
+from .evaluation import (
+    PIECE_VALUES,
+    PHASE_WEIGHTS,
+    PST_MIDDLEGAME,
+    PST_ENDGAME,
+    evaluate as evaluatePosition,
+    computeTotals,
+)
+from .zobrist import (
+    PIECE_KEYS,
+    BLACK_TO_MOVE,
+    CASTLING_KEYS,
+    EP_KEYS,
+    CASTLING_MASKS,
+    WHITE_KINGSIDE,
+    WHITE_QUEENSIDE,
+    BLACK_KINGSIDE,
+    BLACK_QUEENSIDE,
+)
 
 if TYPE_CHECKING:
     from .pieces import Piece
@@ -15,22 +74,194 @@ CLASS_MAP: "dict[str, type[Piece]]" = {
     "K": King,
 }
 
+# first and last rows, where pawns promote
+BACK_RANKS = 0xFF | 0xFF << 56
+# rows of the pawns one step from promoting, by color
+PROMOTING_RANKS = [0xFF << 48, 0xFF << 8]
+
+# piece classes by promotion kind of a move code
+PROMOTION_CLASSES: "dict[int, type[Piece]]" = {
+    KNIGHT: Knight,
+    BISHOP: Bishop,
+    ROOK: Rook,
+    QUEEN: Queen,
+}
+
+CASTLING_LETTERS = {
+    "K": WHITE_KINGSIDE,
+    "Q": WHITE_QUEENSIDE,
+    "k": BLACK_KINGSIDE,
+    "q": BLACK_QUEENSIDE,
+}
+
+# (castling flag, king home, rook home)
+CASTLING_SQUARES = [
+    (WHITE_KINGSIDE, Pos(4, 7), Pos(7, 7)),
+    (WHITE_QUEENSIDE, Pos(4, 7), Pos(0, 7)),
+    (BLACK_KINGSIDE, Pos(4, 0), Pos(7, 0)),
+    (BLACK_QUEENSIDE, Pos(4, 0), Pos(0, 0)),
+]
+
+# 'k' is still accepted for a knight, as the old promotion prompt offered it
+PROMOTION_MAP: "dict[str, type[Piece]]" = {
+    "R": Rook,
+    "N": Knight,
+    "K": Knight,
+    "B": Bishop,
+    "Q": Queen,
+}
+
+
+# piece values for exchanges, a king that gets taken back loses everything
+SEE_VALUES = PIECE_VALUES[:KING] + [20000]
+
 
 class Board:
+    # compare the incremental zobrist key and evaluation totals with a full
+    # recomputation after every makeMove/unmakeMove
+    debugZobrist = bool(os.environ.get("CHESS_DEBUG_ZOBRIST"))
+
     def __init__(self) -> None:
         self.board: "list[list[Piece|None]]" = [
             [None for _ in range(8)] for _ in range(8)
         ]
         self.deaths: "list[Piece]" = []
         self.checked: "None| Color" = None
+        # undo records pushed by makeMove and popped by unmakeMove
+        self.moveStack: "list[tuple]" = []
+        # piece bitboards indexed by `color.value * 6 + kind` and per color
+        # occupancy, kept current by setPiece/removePiece
+        self.bitboards: "list[int]" = [0] * 12
+        self.colorBoards: "list[int]" = [0, 0]
+        self.turn: "Color" = Color.WHITE
+        # square a pawn can capture onto en passant, -1 when there is none
+        self.epSquare: int = -1
+        # castling rights bits from game.zobrist and the position hash, both
+        # updated incrementally
+        self.castlingRights: int = 0
+        self.zobristKey: int = 0
+        # plies since the last capture or pawn move, and the FEN move number
+        self.halfmoveClock: int = 0
+        self.fullmoveNumber: int = 1
+        self.clearEvalTotals()
+        self.clearMoveCache()
 
-        pass
+    @classmethod
+    def fromFEN(cls, fen: str) -> "Board":
+        """Build a board from a FEN string.
+
+        Kings and rooks only keep `hasMoved == False` where the castling
+        field still allows castling with them. The move counters are optional.
+        """
+        fields = fen.split()
+        if len(fields) not in (4, 6):
+            raise ValueError("invalid FEN: " + fen)
+        placement, turn, castling, ep = fields[:4]
+        board = cls()
+        rows = placement.split("/")
+        if len(rows) != 8:
+            raise ValueError("invalid FEN placement: " + placement)
+        for j, row in enumerate(rows):
+            i = 0
+            for ch in row:
+                if ch.isdigit():
+                    i += int(ch)
+                    continue
+                Piec = CLASS_MAP.get(ch.upper())
+                if Piec == None or i > 7:
+                    raise ValueError("invalid FEN placement: " + placement)
+                color = Color.WHITE if ch.isupper() else Color.BLACK
+                board.createPiece(Piec, color, i, j)
+                board.board[j][i].hasMoved = True  # type: ignore
+                i += 1
+            if i != 8:
+                raise ValueError("invalid FEN placement: " + placement)
+        if turn not in ("w", "b"):
+            raise ValueError("invalid FEN side to move: " + turn)
+        board.turn = Color.WHITE if turn == "w" else Color.BLACK
+
+        rights = 0
+        if castling != "-":
+            for ch in castling:
+                if ch not in CASTLING_LETTERS:
+                    raise ValueError("invalid FEN castling rights: " + castling)
+                rights |= CASTLING_LETTERS[ch]
+        board.setCastlingRights(rights)
+
+        if ep != "-":
+            epPos = posFromEncoding(ep)
+            if epPos == None:
+                raise ValueError("invalid FEN en passant square: " + ep)
+            board.epSquare = squareOf(epPos)
+        if len(fields) == 6:
+            try:
+                board.halfmoveClock = int(fields[4])
+                board.fullmoveNumber = int(fields[5])
+            except ValueError:
+                raise ValueError("invalid FEN move counters: " + fen)
+        board.recomputeState()
+        return board
+
+    def toFEN(self) -> str:
+        rows = []
+        for row in self.board:
+            fenRow = ""
+            empty = 0
+            for piece in row:
+                if piece == None:
+                    empty += 1
+                    continue
+                if empty:
+                    fenRow += str(empty)
+                    empty = 0
+                letter = str(piece)[1]
+                fenRow += letter if piece.color == Color.WHITE else letter.lower()
+            if empty:
+                fenRow += str(empty)
+            rows.append(fenRow)
+        castling = ""
+        for letter, flag in CASTLING_LETTERS.items():
+            if self.castlingRights & flag:
+                castling += letter
+        ep = "-" if self.epSquare < 0 else endcodingFromPos(posOf(self.epSquare))
+        return " ".join(
+            [
+                "/".join(rows),
+                "w" if self.turn == Color.WHITE else "b",
+                castling or "-",
+                ep,
+                str(self.halfmoveClock),
+                str(self.fullmoveNumber),
+            ]
+        )
+
+    def setCastlingRights(self, rights: int) -> None:
+        """Mark the kings and rooks named by the `rights` bits as unmoved."""
+        for flag, kingPos, rookPos in CASTLING_SQUARES:
+            if not rights & flag:
+                continue
+            king = self.getPiece(kingPos)
+            rook = self.getPiece(rookPos)
+            if isinstance(king, King) and isinstance(rook, Rook):
+                if king.color == rook.color:
+                    king.hasMoved = False
+                    rook.hasMoved = False
+
+    def recomputeState(self) -> None:
+        """Derive check, castling rights and the key after setting up a position."""
+        self.updateCheck(self.turn.GetOpp())
+        self.castlingRights = self.computeCastlingRights()
+        self.zobristKey = self.computeZobristKey()
+        self.clearMoveCache()
 
     def resetBoard(self) -> None:
         # empty spaces
-        for j in range(2, 5):
+        for j in range(8):
             for i in range(8):
                 self.board[j][i] = None
+        self.bitboards = [0] * 12
+        self.colorBoards = [0, 0]
+        self.clearEvalTotals()
         # pawns
         for i in range(8):
             self.createPiece(Pawn, Color.BLACK, i, 1)
@@ -63,6 +294,14 @@ class Board:
         self.createPiece(King, Color.WHITE, 4, 7)
         self.deaths.clear()
         self.checked = None
+        self.moveStack.clear()
+        self.turn = Color.WHITE
+        self.epSquare = -1
+        self.halfmoveClock = 0
+        self.fullmoveNumber = 1
+        self.castlingRights = self.computeCastlingRights()
+        self.zobristKey = self.computeZobristKey()
+        self.clearMoveCache()
 
     def movePieceFromTo(
         self, src: "Pos", dest: "Pos", getInput: "Callable[[str],str]"
@@ -79,59 +318,25 @@ class Board:
         if isinstance(srcPiece, King):
             if dest == src.move(-2, 0) or dest == src.move(2, 0):
                 self.castlingMove(srcPiece, src, dest)
-                if len(self.getAllPossibleMoves(srcPiece.color.GetOpp())) == 0:
+                if not self.hasLegalMove(srcPiece.color.GetOpp()):
                     return True, True
                 return True, False
 
         destPiece = self.getPiece(dest)
-        if destPiece == None:
-            # pawn promotion
-            if self.checkPawnPromotion(srcPiece, dest):
-                return self.pawnPromotionMove(src, dest, getInput)
-            self.setPiece(srcPiece, dest)
-            self.removePiece(src)
-            srcPiece.moveTo(dest)
-            self.updateCheck(srcPiece.color)
-            if len(self.getAllPossibleMoves(srcPiece.color.GetOpp())) == 0:
-                return True, True
-            return True, False
-        if destPiece.color != srcPiece.color:
+        if destPiece == None or destPiece.color != srcPiece.color:
             isKing = isinstance(destPiece, King)
             # pawn promotion
             if not isKing and self.checkPawnPromotion(srcPiece, dest):
                 return self.pawnPromotionMove(src, dest, getInput)
-            self.killPiece(dest)
-            self.setPiece(srcPiece, dest)
-            self.removePiece(src)
-            srcPiece.moveTo(dest)
-            self.updateCheck(srcPiece.color)
-            if len(self.getAllPossibleMoves(srcPiece.color.GetOpp())) == 0:
+            self.makeMove(src, dest)
+            if not self.hasLegalMove(srcPiece.color.GetOpp()):
                 return True, True
             return True, isKing
         return False, False
 
     def castlingMove(self, srcPiece: "Piece", src: "Pos", dest: "Pos"):
-        if dest == src.move(2, 0):
-            self.setPiece(srcPiece, dest)
-            self.removePiece(src)
-            srcPiece.moveTo(dest)
-
-            rookPos = src.move(3, 0)
-            rook: Rook = self.getPiece(rookPos)  # type: ignore
-            self.setPiece(rook, src.move(1, 0))
-            self.removePiece(rookPos)
-            rook.moveTo(src.move(1, 0))
-        if dest == src.move(-2, 0):
-            self.setPiece(srcPiece, dest)
-            self.removePiece(src)
-            srcPiece.moveTo(dest)
-
-            rookPos = src.move(-4, 0)
-            rook: Rook = self.getPiece(rookPos)  # type: ignore
-            self.setPiece(rook, src.move(-1, 0))
-            self.removePiece(rookPos)
-            rook.moveTo(src.move(-1, 0))
-        self.updateCheck(srcPiece.color)
+        # makeMove brings the rook along when the king moves two files
+        self.makeMove(src, dest)
 
     def checkPawnPromotion(self, srcPiece: "Piece", dest: "Pos"):
         if not isinstance(srcPiece, Pawn):
@@ -148,20 +353,16 @@ class Board:
         selection = None
         while True:
             inp = getInput(
-                "Choose what to upgrade - ['r','k','b','q'] - or 'e' to discard move > "
+                "Choose what to upgrade - ['r','n','b','q'] - or 'e' to discard move > "
             ).upper()
             if inp == "E":
                 return False, False
-            if inp in ["R", "K", "B", "Q"]:
+            if inp in PROMOTION_MAP:
                 selection = inp
                 break
         srcColor = self.getPiece(src).color  # type: ignore
-        newPiece = CLASS_MAP[selection](dest.X, dest.Y, srcColor)
-        self.killPiece(dest)
-        self.setPiece(newPiece, dest)
-        self.removePiece(src)
-        self.updateCheck(srcColor)
-        if len(self.getAllPossibleMoves(srcColor.GetOpp())) == 0:
+        self.makeMove(src, dest, PROMOTION_MAP[selection])
+        if not self.hasLegalMove(srcColor.GetOpp()):
             return True, True
         return True, False
 
@@ -173,8 +374,193 @@ class Board:
         self.setPiece(srcPiece, dest)
         self.removePiece(src)
         srcPiece.moveTo(dest)
+        self.updateCastlingRights(squareOf(src), squareOf(dest))
         self.updateCheck(srcPiece.color)
 
+    def makeMove(
+        self, src: "Pos", dest: "Pos", promotion: "type[Piece]|None" = None
+    ) -> bool:
+        """Play a move in place and push an undo record for unmakeMove.
+
+        The move is not validated. Castling is recognised by the king moving
+        two files, en passant by a pawn moving onto `epSquare`, and
+        `promotion` replaces the moved piece on `dest`.
+        """
+        piece = self.getPiece(src)
+        if piece == None:
+            return False
+        srcSq = squareOf(src)
+        destSq = squareOf(dest)
+        captured = self.getPiece(dest)
+        castling = None
+        if piece.kind == KING and dest.Y == src.Y and abs(dest.X - src.X) == 2:
+            rookSrc = src.move(3 if dest.X > src.X else -4, 0)
+            rook = self.getPiece(rookSrc)
+            if rook != None:
+                castling = (rook, rookSrc, rook.hasMoved)
+        elif piece.kind == PAWN and destSq == self.epSquare and captured == None:
+            # the pawn being taken en passant sits beside the moving pawn
+            captured = self.getPiece(Pos(dest.X, src.Y))
+        # (piece, src, dest, captured, hasMoved, castling, checked,
+        #  deaths length, en passant square, turn, castling rights, key,
+        #  halfmove clock, fullmove number)
+        self.moveStack.append(
+            (
+                piece,
+                src,
+                dest,
+                captured,
+                piece.hasMoved,
+                castling,
+                self.checked,
+                len(self.deaths),
+                self.epSquare,
+                self.turn,
+                self.castlingRights,
+                self.zobristKey,
+                self.halfmoveClock,
+                self.fullmoveNumber,
+            )
+        )
+        self.zobristKey ^= self.epKey()
+
+        if captured != None:
+            self.killPiece(captured.pos)
+        self.setPiece(piece, dest)
+        self.removePiece(src)
+        piece.moveTo(dest)
+        if castling != None:
+            rook, rookSrc, _ = castling
+            rookDest = src.move(1 if dest.X > src.X else -1, 0)
+            self.setPiece(rook, rookDest)
+            self.removePiece(rookSrc)
+            rook.moveTo(rookDest)
+        if promotion != None:
+            newPiece = promotion(dest.X, dest.Y, piece.color)
+            newPiece.hasMoved = True
+            self.setPiece(newPiece, dest)
+        self.updateCastlingRights(srcSq, destSq)
+        if piece.kind == PAWN and abs(destSq - srcSq) == 16:
+            self.epSquare = (srcSq + destSq) // 2
+        else:
+            self.epSquare = -1
+        if piece.kind == PAWN or captured != None:
+            self.halfmoveClock = 0
+        else:
+            self.halfmoveClock += 1
+        if piece.color == Color.BLACK:
+            self.fullmoveNumber += 1
+        if self.turn == piece.color:
+            self.zobristKey ^= BLACK_TO_MOVE
+        self.turn = piece.color.GetOpp()
+        self.zobristKey ^= self.epKey()
+        self.updateCheck(piece.color)
+        if self.debugZobrist:
+            self.verifyZobristKey()
+            self.verifyEvalTotals()
+        return True
+
+    def pushMove(self, move: int) -> bool:
+        """makeMove for a move code from game.moves."""
+        return self.makeMove(
+            posOf(move & 63),
+            posOf((move >> 6) & 63),
+            PROMOTION_CLASSES.get(move >> 12),
+        )
+
+    def unmakeMove(self) -> None:
+        """Take back the last move played with makeMove."""
+        (
+            piece,
+            src,
+            dest,
+            captured,
+            hasMoved,
+            castling,
+            checked,
+            deathsLen,
+            self.epSquare,
+            self.turn,
+            self.castlingRights,
+            zobristKey,
+            self.halfmoveClock,
+            self.fullmoveNumber,
+        ) = self.moveStack.pop()
+        if castling != None:
+            rook, rookSrc, rookHasMoved = castling
+            self.removePiece(rook.pos)
+            self.setPiece(rook, rookSrc)
+            rook.pos = rookSrc
+            rook.hasMoved = rookHasMoved
+        self.removePiece(dest)
+        if captured != None:
+            self.setPiece(captured, captured.pos)
+        self.setPiece(piece, src)
+        piece.pos = src
+        piece.hasMoved = hasMoved
+        del self.deaths[deathsLen:]
+        self.checked = checked
+        self.zobristKey = zobristKey
+        if self.debugZobrist:
+            self.verifyZobristKey()
+            self.verifyEvalTotals()
+
+    def updateCastlingRights(self, srcSq: int, destSq: int):
+        # moving from or onto a king or rook home square ends its castling
+        rights = self.castlingRights & CASTLING_MASKS[srcSq] & CASTLING_MASKS[destSq]
+        if rights != self.castlingRights:
+            self.zobristKey ^= (
+                CASTLING_KEYS[self.castlingRights] ^ CASTLING_KEYS[rights]
+            )
+            self.castlingRights = rights
+
+    def epKey(self) -> int:
+        """Key of the en passant square, only while a pawn can take on it."""
+        ep = self.epSquare
+        if ep < 0:
+            return 0
+        mover = self.turn.GetOpp().value
+        if PAWN_ATTACKS[mover][ep] & self.bitboards[self.turn.value * 6 + PAWN]:
+            return EP_KEYS[ep & 7]
+        return 0
+
+    def computeCastlingRights(self) -> int:
+        """Castling rights derived from King.hasMoved and Rook.hasMoved."""
+        rights = 0
+        for flag, kingPos, rookPos in CASTLING_SQUARES:
+            king = self.getPiece(kingPos)
+            rook = self.getPiece(rookPos)
+            if not isinstance(king, King) or not isinstance(rook, Rook):
+                continue
+            if king.color != rook.color or king.hasMoved or rook.hasMoved:
+                continue
+            rights |= flag
+        return rights
+
+    def computeZobristKey(self) -> int:
+        """Hash the position from scratch, the hot path updates it incrementally."""
+        key = 0
+        for piece in self.getPlayerPieces(Color.BLACK) + self.getPlayerPieces(
+            Color.WHITE
+        ):
+            key ^= PIECE_KEYS[piece.color.value * 6 + piece.kind][squareOf(piece.pos)]
+        if self.turn == Color.BLACK:
+            key ^= BLACK_TO_MOVE
+        key ^= CASTLING_KEYS[self.computeCastlingRights()]
+        return key ^ self.epKey()
+
+    def verifyZobristKey(self):
+        rights = self.computeCastlingRights()
+        if rights != self.castlingRights:
+            raise AssertionError(
+                "castling rights %d, expected %d" % (self.castlingRights, rights)
+            )
+        key = self.computeZobristKey()
+        if key != self.zobristKey:
+            raise AssertionError(
+                "zobrist key %016x, expected %016x" % (self.zobristKey, key)
+            )
+
     def killPiece(self, pos: "Pos"):
         piece = self.getPiece(pos)
         if piece != None:
@@ -188,19 +574,64 @@ class Board:
 
     def createPiece(self, Piec: "type[Piece]", color: "Color", i, j) -> None:
         piece = Piec(i, j, color)
-        self.board[j][i] = piece
-        pass
+        self.setPiece(piece, piece.pos)
 
     def setPiece(self, piece: "Piece|None", pos: "Pos"):
         if not self.isValidPos(pos):
             return
+        self.removePiece(pos)
         self.board[pos.Y][pos.X] = piece
+        if piece != None:
+            sq = pos.Y * 8 + pos.X
+            index = piece.color.value * 6 + piece.kind
+            self.bitboards[index] |= SQUARE_BB[sq]
+            self.colorBoards[piece.color.value] |= SQUARE_BB[sq]
+            self.zobristKey ^= PIECE_KEYS[index][sq]
+            self.changedSquares |= SQUARE_BB[sq]
+            self.material[piece.color.value] += PIECE_VALUES[piece.kind]
+            self.pstMiddlegame[piece.color.value] += PST_MIDDLEGAME[index][sq]
+            self.pstEndgame[piece.color.value] += PST_ENDGAME[index][sq]
+            self.phase += PHASE_WEIGHTS[piece.kind]
 
     def removePiece(self, pos: "Pos"):
         if not self.isValidPos(pos):
             return
+        old = self.board[pos.Y][pos.X]
+        if old != None:
+            sq = pos.Y * 8 + pos.X
+            index = old.color.value * 6 + old.kind
+            self.bitboards[index] &= ~SQUARE_BB[sq]
+            self.colorBoards[old.color.value] &= ~SQUARE_BB[sq]
+            self.zobristKey ^= PIECE_KEYS[index][sq]
+            self.changedSquares |= SQUARE_BB[sq]
+            self.material[old.color.value] -= PIECE_VALUES[old.kind]
+            self.pstMiddlegame[old.color.value] -= PST_MIDDLEGAME[index][sq]
+            self.pstEndgame[old.color.value] -= PST_ENDGAME[index][sq]
+            self.phase -= PHASE_WEIGHTS[old.kind]
         self.board[pos.Y][pos.X] = None
 
+    # evaluation
+
+    def clearEvalTotals(self) -> None:
+        # running material and piece-square totals per color, and the game
+        # phase, kept current by setPiece/removePiece
+        self.material: "list[int]" = [0, 0]
+        self.pstMiddlegame: "list[int]" = [0, 0]
+        self.pstEndgame: "list[int]" = [0, 0]
+        self.phase: int = 0
+
+    def evaluate(self, color: "Color") -> int:
+        """Static score in centipawns from `color`'s point of view."""
+        return evaluatePosition(self, color)
+
+    def verifyEvalTotals(self):
+        totals = computeTotals(self)
+        current = (self.material, self.pstMiddlegame, self.pstEndgame, self.phase)
+        if totals != current:
+            raise AssertionError(
+                "evaluation totals %r, expected %r" % (current, totals)
+            )
+
     def __repr__(self) -> str:
         repr = ""
 
@@ -256,64 +687,565 @@ class Board:
             return 1
         return -1
 
+    def occupancy(self) -> int:
+        return self.colorBoards[0] | self.colorBoards[1]
+
+    def kingSquare(self, color: "Color") -> int:
+        """Square of the king of `color`, -1 once it has been captured."""
+        return self.bitboards[color.value * 6 + KING].bit_length() - 1
+
     def getKings(self) -> "tuple[King, King]":
-        blackKing = None
-        whiteKing = None
-        for row in self.board:
-            for piece in row:
-                if piece == None:
-                    continue
-                if not isinstance(piece, King):
-                    continue
-                if piece.color == Color.BLACK:
-                    blackKing = piece
-                if piece.color == Color.WHITE:
-                    whiteKing = piece
-        return blackKing, whiteKing  # type: ignore
+        kings = []
+        for color in (Color.BLACK, Color.WHITE):
+            sq = self.kingSquare(color)
+            kings.append(None if sq < 0 else self.board[sq >> 3][sq & 7])
+        return kings[0], kings[1]  # type: ignore
+
+    def attackedBy(self, sq: int, color: "Color", occ: int, captured: int = 0) -> bool:
+        """Whether pieces of `color` attack square `sq` given the occupancy `occ`.
+
+        Pieces of `color` on the `captured` squares are ignored, which lets a
+        move be tested without being played.
+        """
+        bb = self.bitboards
+        base = color.value * 6
+        alive = ~captured
+        if KNIGHT_ATTACKS[sq] & bb[base + KNIGHT] & alive:
+            return True
+        if PAWN_ATTACKS[1 - color.value][sq] & bb[base + PAWN] & alive:
+            return True
+        if KING_ATTACKS[sq] & bb[base + KING]:
+            return True
+        queens = bb[base + QUEEN]
+        if rookAttacks(sq, occ) & (bb[base + ROOK] | queens) & alive:
+            return True
+        if bishopAttacks(sq, occ) & (bb[base + BISHOP] | queens) & alive:
+            return True
+        return False
+
+    def isSquareAttacked(self, pos: "Pos", color: "Color") -> bool:
+        """Whether any piece of `color` attacks `pos`."""
+        return self.attackedBy(squareOf(pos), color, self.occupancy())
 
     def updateCheck(self, lastMove: "Color"):
-        # find kings
-        blackKing, whiteKing = self.getKings()
-        if blackKing == None or whiteKing == None:
+        selfKing = self.kingSquare(lastMove)
+        oppKing = self.kingSquare(lastMove.GetOpp())
+        if selfKing < 0 or oppKing < 0:
             self.checked = None
             return
-        selfKing = blackKing if lastMove == Color.BLACK else whiteKing
-        oppKing = whiteKing if lastMove == Color.BLACK else blackKing
-
+        occ = self.occupancy()
         # check if self getting into check
-        for row in self.board:
-            for piece in row:
-                if piece == None or piece.color == lastMove:
-                    continue
-                legalMoves, _ = piece.possibleMoves(self, depth=0)
-                if selfKing.pos in legalMoves:
-                    self.checked = selfKing.color
-                    return
-
+        if self.attackedBy(selfKing, lastMove.GetOpp(), occ):
+            self.checked = lastMove
         # check if opp getting into check
-        for row in self.board:
-            for piece in row:
-                if piece == None or piece.color != lastMove:
-                    continue
-                legalMoves, _ = piece.possibleMoves(self, depth=0)
-                if oppKing.pos in legalMoves:
-                    self.checked = oppKing.color
-                    return
-        self.checked = None
+        elif self.attackedBy(oppKing, lastMove, occ):
+            self.checked = lastMove.GetOpp()
+        else:
+            self.checked = None
+
+    def legalMask(self, piece: "Piece", mask: int) -> int:
+        """Keep the destinations in `mask` that don't leave `piece`'s king in check.
+
+        Other pieces than the king are limited to the squares that capture or
+        block a single checker and, when pinned, to the line through their
+        king. Only king moves and en passant captures, which also empty the
+        captured pawn's square, are tested against attacks.
+        """
+        color = piece.color
+        kingSq, checkers, pinned = self.checkContext(color)
+        if kingSq < 0:
+            return mask
+        opp = color.GetOpp()
+        src = squareOf(piece.pos)
+        occ = self.occupancy() & ~SQUARE_BB[src]
+        legal = 0
+        if piece.kind == KING:
+            while mask:
+                dest = mask & -mask
+                mask ^= dest
+                if not self.attackedBy(dest.bit_length() - 1, opp, occ | dest, dest):
+                    legal |= dest
+            return legal
+        if piece.kind == PAWN and self.epSquare >= 0:
+            dest = mask & SQUARE_BB[self.epSquare]
+            if dest:
+                mask ^= dest
+                # the captured pawn is on the moving pawn's row
+                captured = SQUARE_BB[(src & ~7) | (self.epSquare & 7)]
+                if not self.attackedBy(kingSq, opp, occ & ~captured | dest, captured):
+                    legal = dest
+        if checkers:
+            if checkers & (checkers - 1):
+                # only the king can get out of a double check
+                return legal
+            mask &= checkers | BETWEEN[kingSq][checkers.bit_length() - 1]
+        if pinned & SQUARE_BB[src]:
+            mask &= LINE[kingSq][src]
+        return mask | legal
+
+    def checkContext(self, color: "Color") -> "tuple[int, int, int]":
+        """(king square, checkers, pinned pieces) of `color`, once per position."""
+        self.refreshMoveCache()
+        context = self.cacheContext[color.value]
+        if context == None:
+            context = (
+                self.kingSquare(color),
+                self.checkers(color),
+                self.pinnedPieces(color),
+            )
+            self.cacheContext[color.value] = context
+        return context
+
+    def checkers(self, color: "Color") -> int:
+        """Bitboard of the pieces giving check to the king of `color`."""
+        sq = self.kingSquare(color)
+        if sq < 0:
+            return 0
+        bb = self.bitboards
+        base = color.GetOpp().value * 6
+        occ = self.occupancy()
+        queens = bb[base + QUEEN]
+        return (
+            KNIGHT_ATTACKS[sq] & bb[base + KNIGHT]
+            | PAWN_ATTACKS[color.value][sq] & bb[base + PAWN]
+            | KING_ATTACKS[sq] & bb[base + KING]
+            | rookAttacks(sq, occ) & (bb[base + ROOK] | queens)
+            | bishopAttacks(sq, occ) & (bb[base + BISHOP] | queens)
+        )
+
+    def pinnedPieces(self, color: "Color") -> int:
+        """Bitboard of the pieces of `color` pinned to their king."""
+        sq = self.kingSquare(color)
+        if sq < 0:
+            return 0
+        bb = self.bitboards
+        base = color.GetOpp().value * 6
+        occ = self.occupancy()
+        own = self.colorBoards[color.value]
+        queens = bb[base + QUEEN]
+        pinned = 0
+        for attacks, sliders in (
+            (rookAttacks, bb[base + ROOK] | queens),
+            (bishopAttacks, bb[base + BISHOP] | queens),
+        ):
+            direct = attacks(sq, occ)
+            blockers = direct & own
+            # sliders seen through exactly one own piece
+            pinners = attacks(sq, occ ^ blockers) & ~direct & sliders
+            while pinners:
+                low = pinners & -pinners
+                pinners ^= low
+                pinned |= attacks(low.bit_length() - 1, occ) & blockers
+        return pinned
+
+    # static exchange evaluation
+
+    def attackersTo(self, sq: int, occ: int) -> int:
+        """Bitboard of the pieces of both colors attacking `sq` given the occupancy `occ`."""
+        bb = self.bitboards
+        rooks = bb[ROOK] | bb[QUEEN] | bb[6 + ROOK] | bb[6 + QUEEN]
+        bishops = bb[BISHOP] | bb[QUEEN] | bb[6 + BISHOP] | bb[6 + QUEEN]
+        return (
+            PAWN_ATTACKS[1][sq] & bb[PAWN]
+            | PAWN_ATTACKS[0][sq] & bb[6 + PAWN]
+            | KNIGHT_ATTACKS[sq] & (bb[KNIGHT] | bb[6 + KNIGHT])
+            | KING_ATTACKS[sq] & (bb[KING] | bb[6 + KING])
+            | rookAttacks(sq, occ) & rooks
+            | bishopAttacks(sq, occ) & bishops
+        ) & occ
+
+    def see(self, src: "Pos", dest: "Pos") -> int:
+        """Material the side moving from `src` wins by the exchange on `dest`.
+
+        Both sides capture on `dest` with their least valuable attacker and
+        may stop whenever going on would lose material; sliders behind a
+        capturing piece join in as it leaves. Pins are ignored and the board
+        is left untouched. Negative for a capture that loses material, and
+        for a quiet move onto a square where the piece is lost.
+        """
+        return self.seeSquares(squareOf(src), squareOf(dest))
+
+    def seeMove(self, move: int) -> int:
+        """see for a move code from game.moves."""
+        return self.seeSquares(move & 63, (move >> 6) & 63)
+
+    def seeSquares(self, src: int, dest: int) -> int:
+        piece = self.board[src >> 3][src & 7]
+        if piece == None:
+            return 0
+        bb = self.bitboards
+        target = self.board[dest >> 3][dest & 7]
+        occ = self.occupancy() ^ SQUARE_BB[src]
+        gain = [0 if target == None else SEE_VALUES[target.kind]]
+        kind = piece.kind
+        if kind == PAWN:
+            if dest == self.epSquare and target == None:
+                gain[0] = SEE_VALUES[PAWN]
+                occ ^= SQUARE_BB[(src & ~7) | (dest & 7)]
+            if dest >> 3 in (0, 7):
+                gain[0] += SEE_VALUES[QUEEN] - SEE_VALUES[PAWN]
+                kind = QUEEN
+        # value of the piece standing on dest, the next one to be taken
+        onSquare = SEE_VALUES[kind]
+        attackers = self.attackersTo(dest, occ)
+        rooks = bb[ROOK] | bb[QUEEN] | bb[6 + ROOK] | bb[6 + QUEEN]
+        bishops = bb[BISHOP] | bb[QUEEN] | bb[6 + BISHOP] | bb[6 + QUEEN]
+        side = 1 - piece.color.value
+        # pawns taking on the last rank come back as queens
+        promoting = dest >> 3 in (0, 7)
+        while True:
+            own = attackers & self.colorBoards[side] & occ
+            if not own:
+                break
+            for kind in range(6):
+                found = own & bb[side * 6 + kind]
+                if found:
+                    break
+            if kind == KING and attackers & self.colorBoards[1 - side] & occ:
+                # the king can't take a defended piece
+                break
+            if kind == PAWN and promoting:
+                kind = QUEEN
+                promotion = SEE_VALUES[QUEEN] - SEE_VALUES[PAWN]
+            else:
+                promotion = 0
+            gain.append(onSquare + promotion - gain[-1])
+            occ ^= found & -found
+            # sliders lined up behind the piece that just left
+            attackers |= (
+                rookAttacks(dest, occ) & rooks | bishopAttacks(dest, occ) & bishops
+            ) & occ
+            onSquare = SEE_VALUES[kind]
+            side = 1 - side
+        for d in range(len(gain) - 1, 0, -1):
+            gain[d - 1] = -max(-gain[d - 1], gain[d])
+        return gain[0]
+
+    # legal move cache
+
+    def clearMoveCache(self) -> None:
+        # pseudo-legal and legal destinations of the piece on each square,
+        # valid for the squares set in `cachedSquares`
+        self.pseudoCache: "list[int]" = [0] * 64
+        self.legalCache: "list[int]" = [0] * 64
+        # squares each cached entry depends on, see Piece.reachMask
+        self.cacheReach: "list[int]" = [0] * 64
+        self.cachedSquares = 0
+        # squares whose contents changed since the cache was last checked
+        self.changedSquares = 0
+        self.cacheEpSquare = -1
+        # (king square, checkers, pinned pieces) per color when last checked
+        self.cacheContext: "list[tuple[int, int, int]|None]" = [None, None]
+        # whole move lists by color, dropped on any change
+        self.moveLists: "list[list[int]|None]" = [None, None]
+        self.possibleMoveLists: "list[list[PossibleMoves]|None]" = [None, None]
+
+    def refreshMoveCache(self) -> None:
+        """Drop the cached moves that the changes since the last call can affect.
+
+        An entry stays valid while none of the squares it depends on changed
+        and its side's king square, checkers and pins are the same, as that
+        is all legalMask looks at for a non-king piece.
+        """
+        changed = self.changedSquares
+        if self.epSquare != self.cacheEpSquare:
+            for ep in (self.epSquare, self.cacheEpSquare):
+                if ep >= 0:
+                    changed |= SQUARE_BB[ep]
+            self.cacheEpSquare = self.epSquare
+        if not changed:
+            return
+        self.changedSquares = 0
+        self.moveLists = [None, None]
+        self.possibleMoveLists = [None, None]
+        valid = self.cachedSquares
+        for color in (Color.BLACK, Color.WHITE):
+            context = (
+                self.kingSquare(color),
+                self.checkers(color),
+                self.pinnedPieces(color),
+            )
+            old = self.cacheContext[color.value]
+            if old == None or old[0] != context[0] or old[1] != context[1]:
+                valid &= ~self.colorBoards[color.value]
+            else:
+                valid &= ~(old[2] ^ context[2])
+            self.cacheContext[color.value] = context
+        squares = valid
+        reach = self.cacheReach
+        while squares:
+            low = squares & -squares
+            squares ^= low
+            if reach[low.bit_length() - 1] & changed:
+                valid ^= low
+        self.cachedSquares = valid
+
+    def cachedMoves(self, piece: "Piece", pseudo: int = -1) -> "tuple[int, int]":
+        """(pseudo-legal, legal) destination bitboards of `piece`.
+
+        `pseudo` is piece.moveMask when the caller already has it.
+        """
+        self.refreshMoveCache()
+        sq = piece.pos.Y * 8 + piece.pos.X
+        bit = SQUARE_BB[sq]
+        if self.cachedSquares & bit:
+            return self.pseudoCache[sq], self.legalCache[sq]
+        if pseudo < 0:
+            pseudo = piece.moveMask(self)
+        legal = self.legalMask(piece, pseudo)
+        if (
+            piece.kind == PAWN
+            and self.epSquare >= 0
+            and pseudo & SQUARE_BB[self.epSquare]
+        ):
+            # an en passant capture clears two squares of the pawn's row
+            reach = FULL
+        else:
+            reach = piece.reachMask(self) | bit
+        self.pseudoCache[sq] = pseudo
+        self.legalCache[sq] = legal
+        self.cacheReach[sq] = reach
+        self.cachedSquares |= bit
+        return pseudo, legal
 
     def getPlayerPieces(self, color: "Color") -> "list[Piece]":
         pieces: "list[Piece]" = []
-        for row in self.board:
-            for piece in row:
-                if piece != None and piece.color == color:
-                    pieces.append(piece)
+        own = self.colorBoards[color.value]
+        while own:
+            low = own & -own
+            own ^= low
+            sq = low.bit_length() - 1
+            pieces.append(self.board[sq >> 3][sq & 7])  # type: ignore
         return pieces
 
     def getAllPossibleMoves(self, color: "Color") -> "list[PossibleMoves]":
+        self.refreshMoveCache()
+        cached = self.possibleMoveLists[color.value]
+        if cached != None:
+            return list(cached)
         pieces = self.getPlayerPieces(color)
         possibleMoves: "list[PossibleMoves]" = []
         for piece in pieces:
-            legalMoves, _ = piece.possibleMoves(self)
-            if len(legalMoves) > 0:
-                possibleMoves.append(PossibleMoves(piece, legalMoves))
-        return possibleMoves
+            _, legalMoves = self.cachedMoves(piece)
+            if legalMoves:
+                possibleMoves.append(PossibleMoves(piece, positions(legalMoves)))
+        self.possibleMoveLists[color.value] = possibleMoves
+        return list(possibleMoves)
+
+    def generateMoves(self, color: "Color|None" = None) -> "list[int]":
+        """Legal move codes for `color`, the side to move by default.
+
+        Promotions produce one move per piece the pawn can become.
+        """
+        if color == None:
+            color = self.turn
+        self.refreshMoveCache()
+        cached = self.moveLists[color.value]
+        if cached != None:
+            return list(cached)
+        moves: "list[int]" = []
+        for piece in self.getPlayerPieces(color):
+            src = squareOf(piece.pos)
+            _, legal = self.cachedMoves(piece)
+            promoting = piece.kind == PAWN and legal & BACK_RANKS
+            while legal:
+                low = legal & -legal
+                legal ^= low
+                dest = low.bit_length() - 1
+                if promoting and low & BACK_RANKS:
+                    for kind in (QUEEN, KNIGHT, ROOK, BISHOP):
+                        moves.append(encodeMove(src, dest, kind))
+                else:
+                    moves.append(src | dest << 6)
+        self.moveLists[color.value] = moves
+        return list(moves)
+
+    def stagedMoves(
+        self,
+        color: "Color|None" = None,
+        hashMove: int = 0,
+        quiets: bool = True,
+        quietOrder: "Callable[[list[int]], list[int]]|None" = None,
+    ) -> "Iterator[int]":
+        """Legal move codes for `color` in stages, each generated when it is reached.
+
+        The stages are `hashMove` when it is legal, captures that don't lose
+        material by see (most valuable victim first), queen promotions,
+        quiet moves and underpromotions, then the losing captures, best
+        first. A capture's see is only worked out when it comes up, and the
+        full legal masks only at the quiet stage. `quiets=False` stops after
+        the promotions and `quietOrder` sorts the quiet moves. The board must be back in the same position
+        whenever the next move is asked for.
+        """
+        if color == None:
+            color = self.turn
+        if hashMove and self.isLegalMove(hashMove, color):
+            yield hashMove
+
+        opp = self.colorBoards[1 - color.value]
+        epBB = SQUARE_BB[self.epSquare] if self.epSquare >= 0 else 0
+        pieces = self.getPlayerPieces(color)
+        # only the capture destinations are made legal here, the pseudo-legal
+        # masks are kept for the quiet stage to finish
+        self.refreshMoveCache()
+        pseudos = [-1] * len(pieces)
+        captures: "list[tuple[int, int, int]]" = []
+        for i, piece in enumerate(pieces):
+            src = squareOf(piece.pos)
+            victims = opp | epBB if piece.kind == PAWN else opp
+            if self.cachedSquares & SQUARE_BB[src]:
+                targets = self.legalCache[src] & victims
+            else:
+                pseudos[i] = piece.moveMask(self)
+                targets = pseudos[i] & victims
+                if targets:
+                    targets = self.legalMask(piece, targets)
+            while targets:
+                low = targets & -targets
+                targets ^= low
+                dest = low.bit_length() - 1
+                move = src | dest << 6
+                if piece.kind == PAWN and low & BACK_RANKS:
+                    move |= QUEEN << 12
+                victim = self.board[dest >> 3][dest & 7]
+                kind = PAWN if victim == None else victim.kind
+                captures.append((PIECE_VALUES[kind] * 8 - piece.kind, move, kind))
+        captures.sort(reverse=True)
+        losing: "list[tuple[int, int]]" = []
+        for _, move, kind in captures:
+            if move == hashMove:
+                continue
+            src = move & 63
+            attacker = self.board[src >> 3][src & 7].kind  # type: ignore
+            # taking a piece worth at least the attacker can't lose material
+            if SEE_VALUES[kind] < SEE_VALUES[attacker]:
+                see = self.seeSquares(src, (move >> 6) & 63)
+                if see < 0:
+                    losing.append((see, move))
+                    continue
+            yield move
+
+        pawns = self.bitboards[color.value * 6 + PAWN] & PROMOTING_RANKS[color.value]
+        for src in squares(pawns):
+            _, legal = self.cachedMoves(self.board[src >> 3][src & 7])  # type: ignore
+            for dest in squares(legal & BACK_RANKS & ~opp):
+                move = encodeMove(src, dest, QUEEN)
+                if move != hashMove:
+                    yield move
+        if not quiets:
+            return
+
+        moves = []
+        for piece, pseudo in zip(pieces, pseudos):
+            src = squareOf(piece.pos)
+            _, legal = self.cachedMoves(piece, pseudo)
+            if piece.kind == PAWN:
+                for dest in squares(legal & BACK_RANKS):
+                    for kind in (KNIGHT, ROOK, BISHOP):
+                        moves.append(encodeMove(src, dest, kind))
+                legal &= ~BACK_RANKS & ~epBB
+            for dest in squares(legal & ~opp):
+                moves.append(src | dest << 6)
+        if quietOrder != None:
+            moves = quietOrder(moves)
+        for move in moves:
+            if move != hashMove:
+                yield move
+
+        losing.sort(reverse=True)
+        for _, move in losing:
+            if move != hashMove:
+                yield move
+
+    def orderedMoves(
+        self, color: "Color|None" = None, hashMove: int = 0
+    ) -> "list[int]":
+        """All of stagedMoves at once, for callers that want a list."""
+        return list(self.stagedMoves(color, hashMove))
+
+    def isLegalMove(self, move: int, color: "Color|None" = None) -> bool:
+        """Whether a move code, e.g. from a hash table, is legal for `color`."""
+        if color == None:
+            color = self.turn
+        src, dest = move & 63, (move >> 6) & 63
+        piece = self.board[src >> 3][src & 7]
+        if piece == None or piece.color != color:
+            return False
+        _, legal = self.cachedMoves(piece)
+        if not legal & SQUARE_BB[dest]:
+            return False
+        # pawns reaching the last rank must name their promotion, others can't
+        promotion = move >> 12
+        if piece.kind == PAWN and SQUARE_BB[dest] & BACK_RANKS:
+            return KNIGHT <= promotion <= QUEEN
+        return promotion == 0
+
+    def hasLegalMove(self, color: "Color|None" = None) -> bool:
+        """Whether `color`, the side to move by default, has any legal move.
+
+        Stops at the first piece that can move instead of generating them all.
+        """
+        if color == None:
+            color = self.turn
+        self.refreshMoveCache()
+        cached = self.moveLists[color.value]
+        if cached != None:
+            return len(cached) > 0
+        king = self.bitboards[color.value * 6 + KING]
+        # the king first, it is the piece that can still move in check
+        for group in (king, self.colorBoards[color.value] & ~king):
+            while group:
+                low = group & -group
+                group ^= low
+                sq = low.bit_length() - 1
+                _, legal = self.cachedMoves(self.board[sq >> 3][sq & 7])  # type: ignore
+                if legal:
+                    return True
+        return False
+
+    # game end
+
+    def repetitions(self) -> int:
+        """How many times the current position has occurred, this time included.
+
+        Positions are compared by zobrist key through the keys kept in the
+        undo records, back to the last capture or pawn move.
+        """
+        stack = self.moveStack
+        oldest = max(len(stack) - self.halfmoveClock, 0)
+        count = 1
+        # the same side is to move every second ply, index 11 is the key
+        # before the record's move
+        for i in range(len(stack) - 2, oldest - 1, -2):
+            if stack[i][11] == self.zobristKey:
+                count += 1
+        return count
+
+    def insufficientMaterial(self) -> bool:
+        """Whether neither side can checkmate: bare kings plus a knight or bishops of one colour."""
+        bb = self.bitboards
+        for base in (0, 6):
+            if bb[base + PAWN] | bb[base + ROOK] | bb[base + QUEEN]:
+                return False
+        knights = bb[KNIGHT] | bb[6 + KNIGHT]
+        bishops = bb[BISHOP] | bb[6 + BISHOP]
+        if not bishops:
+            return popcount(knights) <= 1
+        if knights:
+            return False
+        return not bishops & LIGHT_SQUARES or not bishops & ~LIGHT_SQUARES
+
+    def gameStatus(self) -> "GameStatus":
+        """Whether the game is over for the side to move, and why."""
+        color = self.turn
+        if not self.hasLegalMove(color):
+            if self.checkers(color):
+                return GameStatus.CHECKMATE
+            return GameStatus.STALEMATE
+        if self.insufficientMaterial():
+            return GameStatus.INSUFFICIENT_MATERIAL
+        if self.halfmoveClock >= 100:
+            return GameStatus.FIFTY_MOVES
+        if self.repetitions() >= 3:
+            return GameStatus.THREEFOLD
+        return GameStatus.ONGOING
@@ -0,0 +1,193 @@
+"""Opening book: a sorted binary file of (position key, move, weight) entries.
+
+The file is an 8 byte magic followed by 16 byte little endian entries,
+sorted by zobrist key and, within a position, by falling weight. Books are
+read through a read-only `mmap` and searched by bisection, so nothing is
+loaded up front and every process opening the same file shares its pages
+through the OS page cache.
+"""
+from typing import TYPE_CHECKING
+from bisect import bisect_left
+import mmap
+import os
+import random
+import struct
+import sys
+
+from .board import Board
+from .pgn import openPGN, readGames, parseSAN
+
+if TYPE_CHECKING:
+    from .pgn import PGNGame
+
+MAGIC = b"CHSBOOK1"
+# zobrist key, move code, weight and 4 unused bytes that keep keys aligned
+ENTRY = struct.Struct("<QHHI")
+KEY = struct.Struct("<Q")
+MAX_WEIGHT = 0xFFFF
+
+
+class BookBuilder:
+    """Counts how often each move was played from each position."""
+
+    def __init__(self, maxPlies: int = 20) -> None:
+        self.maxPlies = maxPlies
+        self.counts: "dict[tuple[int, int], int]" = {}
+        self.games = 0
+
+    def count(self, key: int, move: int) -> None:
+        entry = (key, move)
+        self.counts[entry] = self.counts.get(entry, 0) + 1
+
+    def addGame(self, game: "PGNGame") -> bool:
+        """Count the opening of a PGN game.
+
+        False when its FEN tag does not parse or one of its moves is not
+        legal SAN, the moves before that are still counted.
+        """
+        self.games += 1
+        fen = game.headers.get("FEN")
+        if fen:
+            try:
+                board = Board.fromFEN(fen)
+            except ValueError:
+                return False
+        else:
+            board = Board()
+            board.resetBoard()
+        for san in game.moves[: self.maxPlies]:
+            move = parseSAN(board, san)
+            if move == None:
+                return False
+            self.count(board.zobristKey, move)
+            board.pushMove(move)
+        return True
+
+    def addPGN(self, path: str) -> "tuple[int, int]":
+        """Count every game of a PGN file, returns (games added, games skipped)."""
+        added = skipped = 0
+        with openPGN(path) as stream:
+            for game in readGames(stream):
+                if self.addGame(game):
+                    added += 1
+                else:
+                    skipped += 1
+        return added, skipped
+
+    def entries(self, minCount: int = 1) -> "list[tuple[int, int, int]]":
+        """(key, move, weight) rows in file order."""
+        byKey: "dict[int, list[tuple[int, int]]]" = {}
+        for (key, move), count in self.counts.items():
+            if count >= minCount:
+                byKey.setdefault(key, []).append((count, move))
+        rows = []
+        for key in sorted(byKey):
+            moves = sorted(byKey[key], reverse=True)
+            # scale a position's counts down only when they overflow a weight
+            top = moves[0][0]
+            for count, move in moves:
+                if top > MAX_WEIGHT:
+                    count = max(1, count * MAX_WEIGHT // top)
+                rows.append((key, move, count))
+        return rows
+
+    def write(self, path: str, minCount: int = 1) -> int:
+        """Write the book file, returns the number of entries."""
+        rows = self.entries(minCount)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as out:
+            out.write(MAGIC)
+            for row in rows:
+                out.write(ENTRY.pack(*row, 0))
+        # readers never see a half written book
+        os.replace(tmp, path)
+        return len(rows)
+
+
+class Book:
+    """Read-only view of a book file."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as stream:
+            self.data = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[: len(MAGIC)] != MAGIC:
+            self.data.close()
+            raise ValueError("%s is not an opening book" % path)
+        self.size = (len(self.data) - len(MAGIC)) // ENTRY.size
+        # on little endian machines the keys are every other 8 byte word of
+        # the mapping, which bisect searches without unpacking them
+        self.keys: "memoryview|None" = None
+        if sys.byteorder == "little":
+            end = len(MAGIC) + self.size * ENTRY.size
+            words = memoryview(self.data)[len(MAGIC) : end].cast("Q")
+            self.keys = words[:: ENTRY.size // KEY.size]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def close(self) -> None:
+        # the mapping can only be closed once no view of it is left
+        if self.keys != None:
+            self.keys.release()
+        self.data.close()
+
+    def __enter__(self) -> "Book":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __getstate__(self) -> dict:
+        # processes reopen the file and share its pages rather than copy them
+        return {"path": self.path}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["path"])
+
+    def lookup(self, key: int) -> "list[tuple[int, int]]":
+        """(move, weight) entries of a position key, heaviest first."""
+        data, offset, size = self.data, len(MAGIC), ENTRY.size
+        if self.keys != None:
+            lo = bisect_left(self.keys, key)
+        else:
+            lo, hi = 0, self.size
+            while lo < hi:
+                mid = (lo + hi) >> 1
+                if KEY.unpack_from(data, offset + mid * size)[0] < key:
+                    lo = mid + 1
+                else:
+                    hi = mid
+        found = []
+        while lo < self.size:
+            entryKey, move, weight, _ = ENTRY.unpack_from(data, offset + lo * size)
+            if entryKey != key:
+                break
+            found.append((move, weight))
+            lo += 1
+        return found
+
+    def moves(self, board: "Board") -> "list[tuple[int, int]]":
+        """Book entries for the side to move that are legal on `board`.
+
+        Checking legality guards against two positions sharing a key, only
+        the pieces of the found moves have their moves generated.
+        """
+        return [
+            (move, weight)
+            for move, weight in self.lookup(board.zobristKey)
+            if board.isLegalMove(move)
+        ]
+
+    def choose(self, board: "Board", rng: "random.Random|None" = None) -> int:
+        """A book move picked at random by weight, 0 when out of book."""
+        found = self.moves(board)
+        if not found:
+            return 0
+        randrange = rng.randrange if rng != None else random.randrange
+        pick = randrange(sum(weight for _, weight in found))
+        for move, weight in found:
+            pick -= weight
+            if pick < 0:
+                return move
+        return found[0][0]
@@ -0,0 +1,108 @@
+"""Fixed-size binary position encoding for storage and IPC.
+
+A position takes POSITION_BYTES (32) bytes:
+
+    0..7    occupancy bitboard, little endian
+    8..23   4 bit piece codes for the occupied squares in square order,
+            low nibble first, code = color.value * 6 + kind
+    24      bit 0: black to move, bits 1..4: castling rights
+    25      en passant square + 1, 0 when there is none
+    26      halfmove clock
+    27..28  fullmove number, little endian
+    29..31  zero padding
+
+Decoding an encoding and encoding the board again gives the same bytes,
+and the decoded board has the FEN of the encoded one. A halfmove clock
+above 255 or a fullmove number above 65535 doesn't fit and raises
+ValueError rather than being cut.
+"""
+from typing import TYPE_CHECKING, Iterable, Iterator
+import struct
+
+from .board import Board
+from .pieces import Pawn, Knight, Bishop, Rook, Queen, King
+from .utils import Color
+
+if TYPE_CHECKING:
+    from .pieces import Piece
+
+POSITION_BYTES = 32
+_HEADER = struct.Struct("<Q")
+_TRAILER = struct.Struct("<BBBH3x")
+
+# piece classes by kind
+_CLASSES: "list[type[Piece]]" = [Pawn, Knight, Bishop, Rook, Queen, King]
+_COLORS = [Color.BLACK, Color.WHITE]
+
+
+def encodePosition(board: "Board") -> bytes:
+    occupied = board.occupancy()
+    nibbles = bytearray(16)
+    rows = board.board
+    index = 0
+    bb = occupied
+    while bb:
+        low = bb & -bb
+        bb ^= low
+        sq = low.bit_length() - 1
+        if index == 32:
+            raise ValueError("cannot encode a position with more than 32 pieces")
+        piece = rows[sq >> 3][sq & 7]
+        code = piece.color.value * 6 + piece.kind  # type: ignore
+        nibbles[index >> 1] |= code << (4 * (index & 1))
+        index += 1
+    if board.halfmoveClock > 255 or board.fullmoveNumber > 0xFFFF:
+        raise ValueError("halfmove clock or fullmove number too large to encode")
+    flags = (board.turn == Color.BLACK) | board.castlingRights << 1
+    return (
+        _HEADER.pack(occupied)
+        + bytes(nibbles)
+        + _TRAILER.pack(
+            flags,
+            board.epSquare + 1,
+            board.halfmoveClock,
+            board.fullmoveNumber,
+        )
+    )
+
+
+def decodePosition(data: bytes) -> "Board":
+    if len(data) != POSITION_BYTES:
+        raise ValueError("a position takes %d bytes" % POSITION_BYTES)
+    (occupied,) = _HEADER.unpack_from(data, 0)
+    flags, ep, halfmove, fullmove = _TRAILER.unpack_from(data, 24)
+    if ep > 64 or flags >> 5:
+        raise ValueError("invalid position flags")
+    board = Board()
+    index = 0
+    bb = occupied
+    while bb:
+        low = bb & -bb
+        bb ^= low
+        sq = low.bit_length() - 1
+        code = (data[8 + (index >> 1)] >> (4 * (index & 1))) & 15
+        if code >= 12:
+            raise ValueError("invalid piece code %d" % code)
+        board.createPiece(_CLASSES[code % 6], _COLORS[code // 6], sq & 7, sq >> 3)
+        board.board[sq >> 3][sq & 7].hasMoved = True  # type: ignore
+        index += 1
+    board.turn = Color.BLACK if flags & 1 else Color.WHITE
+    board.setCastlingRights(flags >> 1)
+    board.epSquare = ep - 1
+    board.halfmoveClock = halfmove
+    board.fullmoveNumber = fullmove
+    board.recomputeState()
+    return board
+
+
+def encodePositions(boards: "Iterable[Board]") -> bytes:
+    return b"".join(encodePosition(board) for board in boards)
+
+
+def decodePositions(data: bytes) -> "Iterator[Board]":
+    """Decode consecutive positions lazily, one Board at a time."""
+    if len(data) % POSITION_BYTES:
+        raise ValueError("data is not a whole number of positions")
+    view = memoryview(data)
+    for offset in range(0, len(data), POSITION_BYTES):
+        yield decodePosition(bytes(view[offset : offset + POSITION_BYTES]))
@@ -0,0 +1,235 @@
+"""Static evaluation: material, piece-square tables, mobility and king safety.
+
+Material and piece-square scores are kept by Board as running totals, updated
+in setPiece/removePiece, so those terms cost nothing to read at a leaf. The
+piece-square tables are written from white's side with rank 8 on the first
+row, matching square numbering; black looks its squares up mirrored.
+
+Middlegame and endgame scores are blended by the game phase, which goes
+from 24 with all minor and major pieces on the board down to 0.
+"""
+from typing import TYPE_CHECKING
+
+from .utils import Color
+from .bitboard import (
+    PAWN,
+    KNIGHT,
+    BISHOP,
+    ROOK,
+    QUEEN,
+    KING,
+    KNIGHT_ATTACKS,
+    KING_ATTACKS,
+    bishopAttacks,
+    rookAttacks,
+    popcount,
+)
+
+if TYPE_CHECKING:
+    from .board import Board
+
+PIECE_VALUES = [100, 320, 330, 500, 900, 0]
+# phase each kind adds while on the board
+PHASE_WEIGHTS = [0, 1, 1, 2, 4, 0]
+MAX_PHASE = 24
+
+# fmt: off
+_PAWN = [
+     0,   0,   0,   0,   0,   0,   0,   0,
+    50,  50,  50,  50,  50,  50,  50,  50,
+    10,  10,  20,  30,  30,  20,  10,  10,
+     5,   5,  10,  25,  25,  10,   5,   5,
+     0,   0,   0,  20,  20,   0,   0,   0,
+     5,  -5, -10,   0,   0, -10,  -5,   5,
+     5,  10,  10, -20, -20,  10,  10,   5,
+     0,   0,   0,   0,   0,   0,   0,   0,
+]
+_KNIGHT = [
+   -50, -40, -30, -30, -30, -30, -40, -50,
+   -40, -20,   0,   0,   0,   0, -20, -40,
+   -30,   0,  10,  15,  15,  10,   0, -30,
+   -30,   5,  15,  20,  20,  15,   5, -30,
+   -30,   0,  15,  20,  20,  15,   0, -30,
+   -30,   5,  10,  15,  15,  10,   5, -30,
+   -40, -20,   0,   5,   5,   0, -20, -40,
+   -50, -40, -30, -30, -30, -30, -40, -50,
+]
+_BISHOP = [
+   -20, -10, -10, -10, -10, -10, -10, -20,
+   -10,   0,   0,   0,   0,   0,   0, -10,
+   -10,   0,   5,  10,  10,   5,   0, -10,
+   -10,   5,   5,  10,  10,   5,   5, -10,
+   -10,   0,  10,  10,  10,  10,   0, -10,
+   -10,  10,  10,  10,  10,  10,  10, -10,
+   -10,   5,   0,   0,   0,   0,   5, -10,
+   -20, -10, -10, -10, -10, -10, -10, -20,
+]
+_ROOK = [
+     0,   0,   0,   0,   0,   0,   0,   0,
+     5,  10,  10,  10,  10,  10,  10,   5,
+    -5,   0,   0,   0,   0,   0,   0,  -5,
+    -5,   0,   0,   0,   0,   0,   0,  -5,
+    -5,   0,   0,   0,   0,   0,   0,  -5,
+    -5,   0,   0,   0,   0,   0,   0,  -5,
+    -5,   0,   0,   0,   0,   0,   0,  -5,
+     0,   0,   0,   5,   5,   0,   0,   0,
+]
+_QUEEN = [
+   -20, -10, -10,  -5,  -5, -10, -10, -20,
+   -10,   0,   0,   0,   0,   0,   0, -10,
+   -10,   0,   5,   5,   5,   5,   0, -10,
+    -5,   0,   5,   5,   5,   5,   0,  -5,
+     0,   0,   5,   5,   5,   5,   0,  -5,
+   -10,   5,   5,   5,   5,   5,   0, -10,
+   -10,   0,   5,   0,   0,   0,   0, -10,
+   -20, -10, -10,  -5,  -5, -10, -10, -20,
+]
+_KING_MIDDLEGAME = [
+   -30, -40, -40, -50, -50, -40, -40, -30,
+   -30, -40, -40, -50, -50, -40, -40, -30,
+   -30, -40, -40, -50, -50, -40, -40, -30,
+   -30, -40, -40, -50, -50, -40, -40, -30,
+   -20, -30, -30, -40, -40, -30, -30, -20,
+   -10, -20, -20, -20, -20, -20, -20, -10,
+    20,  20,   0,   0,   0,   0,  20,  20,
+    20,  30,  10,   0,   0,  10,  30,  20,
+]
+_KING_ENDGAME = [
+   -50, -40, -30, -20, -20, -30, -40, -50,
+   -30, -20, -10,   0,   0, -10, -20, -30,
+   -30, -10,  20,  30,  30,  20, -10, -30,
+   -30, -10,  30,  40,  40,  30, -10, -30,
+   -30, -10,  30,  40,  40,  30, -10, -30,
+   -30, -10,  20,  30,  30,  20, -10, -30,
+   -30, -30,   0,   0,   0,   0, -30, -30,
+   -50, -30, -30, -30, -30, -30, -30, -50,
+]
+# fmt: on
+
+
+def _byIndex(tables: "list[list[int]]") -> "list[list[int]]":
+    # black's tables are white's mirrored top to bottom
+    return [[table[sq ^ 56] for sq in range(64)] for table in tables] + tables
+
+
+# PST_MIDDLEGAME[color.value * 6 + kind][square], same layout as PIECE_KEYS
+PST_MIDDLEGAME = _byIndex([_PAWN, _KNIGHT, _BISHOP, _ROOK, _QUEEN, _KING_MIDDLEGAME])
+PST_ENDGAME = _byIndex([_PAWN, _KNIGHT, _BISHOP, _ROOK, _QUEEN, _KING_ENDGAME])
+
+# per square reached by a knight, bishop, rook or queen
+MOBILITY_WEIGHTS = [0, 4, 4, 2, 1, 0]
+# per square next to the enemy king attacked by a knight, bishop, rook or queen
+KING_ATTACK_WEIGHTS = [0, 6, 6, 8, 12, 0]
+# per own pawn on the row in front of the king and on the row after it
+SHIELD_BONUS = (12, 6)
+
+
+def _shieldTable(color: "Color", distance: int) -> "list[int]":
+    # the 3 squares `distance` rows ahead of a king on each square
+    step = 1 if color == Color.BLACK else -1
+    table = []
+    for sq in range(64):
+        x, y = sq & 7, (sq >> 3) + step * distance
+        bb = 0
+        if 0 <= y < 8:
+            for dx in (-1, 0, 1):
+                if 0 <= x + dx < 8:
+                    bb |= 1 << (y * 8 + x + dx)
+        table.append(bb)
+    return table
+
+
+# SHIELDS[color.value][distance - 1][king square]
+SHIELDS = [
+    [_shieldTable(color, 1), _shieldTable(color, 2)]
+    for color in (Color.BLACK, Color.WHITE)
+]
+
+
+def dynamicTerms(board: "Board") -> "tuple[list[int], list[int]]":
+    """Mobility and king safety of each side, indexed by color value.
+
+    Mobility counts the squares the knights, bishops, rooks and queens reach;
+    king safety weighs the pawn shield against the enemy pieces hitting the
+    squares around the king.
+    """
+    bb = board.bitboards
+    occ = board.colorBoards[0] | board.colorBoards[1]
+    kings = [bb[KING].bit_length() - 1, bb[6 + KING].bit_length() - 1]
+    mobility = [0, 0]
+    safety = [0, 0]
+    for side in (0, 1):
+        base = side * 6
+        own = board.colorBoards[side]
+        enemyKing = kings[1 - side]
+        zone = KING_ATTACKS[enemyKing] if enemyKing >= 0 else 0
+        for kind in (KNIGHT, BISHOP, ROOK, QUEEN):
+            pieces = bb[base + kind]
+            while pieces:
+                low = pieces & -pieces
+                sq = low.bit_length() - 1
+                pieces ^= low
+                if kind == KNIGHT:
+                    reach = KNIGHT_ATTACKS[sq]
+                elif kind == BISHOP:
+                    reach = bishopAttacks(sq, occ)
+                elif kind == ROOK:
+                    reach = rookAttacks(sq, occ)
+                else:
+                    reach = bishopAttacks(sq, occ) | rookAttacks(sq, occ)
+                mobility[side] += MOBILITY_WEIGHTS[kind] * popcount(reach & ~own)
+                if reach & zone:
+                    attack = KING_ATTACK_WEIGHTS[kind] * popcount(reach & zone)
+                    safety[1 - side] -= attack
+        king = kings[side]
+        if king >= 0:
+            pawns = bb[base + PAWN]
+            near, far = SHIELDS[side]
+            safety[side] += SHIELD_BONUS[0] * popcount(pawns & near[king])
+            safety[side] += SHIELD_BONUS[1] * popcount(pawns & far[king])
+    return mobility, safety
+
+
+def runningTerms(board: "Board", color: "Color") -> int:
+    """Material and piece-square score from `color`'s side, read off Board's totals."""
+    us, them = color.value, 1 - color.value
+    middlegame = board.pstMiddlegame[us] - board.pstMiddlegame[them]
+    endgame = board.pstEndgame[us] - board.pstEndgame[them]
+    material = board.material[us] - board.material[them]
+    return material + blend(middlegame, endgame, board.phase)
+
+
+def blend(middlegame: int, endgame: int, phase: int) -> int:
+    phase = min(phase, MAX_PHASE)
+    # truncate rather than floor so both colors see the same score
+    return int((middlegame * phase + endgame * (MAX_PHASE - phase)) / MAX_PHASE)
+
+
+def evaluate(board: "Board", color: "Color") -> int:
+    """Score of the position in centipawns from `color`'s point of view."""
+    us, them = color.value, 1 - color.value
+    mobility, safety = dynamicTerms(board)
+    # king safety is a middlegame term, it fades as the attackers come off
+    return (
+        runningTerms(board, color)
+        + blend(safety[us] - safety[them], 0, board.phase)
+        + mobility[us]
+        - mobility[them]
+    )
+
+
+def computeTotals(board: "Board") -> "tuple[list[int], list[int], list[int], int]":
+    """(material, middlegame PST, endgame PST, phase) recomputed from the bitboards."""
+    material, middlegame, endgame = [0, 0], [0, 0], [0, 0]
+    phase = 0
+    for index, bb in enumerate(board.bitboards):
+        color, kind = index // 6, index % 6
+        while bb:
+            low = bb & -bb
+            sq = low.bit_length() - 1
+            bb ^= low
+            material[color] += PIECE_VALUES[kind]
+            middlegame[color] += PST_MIDDLEGAME[index][sq]
+            endgame[color] += PST_ENDGAME[index][sq]
+            phase += PHASE_WEIGHTS[kind]
+    return material, middlegame, endgame, phase
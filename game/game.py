@@ -0,0 +1,160 @@
+from dataclasses import dataclass
+
+from .board import Board
+from .utils import Color, GameStatus
+from .bitboard import PAWN, QUEEN
+from .moves import moveFromUCI, moveToUCI, moveDest, movePromotion, PROMOTION_LETTERS
+from .pgn import PGNGame, parseSAN, sanBody, writeGame
+
+
+# statuses that end a game by themselves, a threefold repetition or fifty
+# moves are reported but play goes on until a draw is claimed or agreed
+FINAL_STATUSES = (
+    GameStatus.CHECKMATE,
+    GameStatus.STALEMATE,
+    GameStatus.INSUFFICIENT_MATERIAL,
+)
+
+
+@dataclass
+class MoveResult:
+    legal: bool
+    move: str
+    error: "str|None" = None
+    capture: bool = False
+    check: bool = False
+    checkmate: bool = False
+    stalemate: bool = False
+    # letter of the piece a pawn promoted to
+    promotion: "str|None" = None
+    # GameStatus value of the position after the move
+    status: str = GameStatus.ONGOING.value
+
+
+class Game:
+    """One game's board, side to move and move history in UCI and SAN.
+
+    Everything goes through return values, there are no callbacks, prompts
+    or module globals, so a single process can drive any number of games.
+    """
+
+    def __init__(self, fen: "str|None" = None) -> None:
+        if fen == None:
+            self.board = Board()
+            self.board.resetBoard()
+        else:
+            self.board = Board.fromFEN(fen)
+        self.startFEN = fen
+        # moves played so far in UCI notation and in SAN
+        self.history: "list[str]" = []
+        self.sanHistory: "list[str]" = []
+        self.status = self.board.gameStatus()
+        self.over = self.status in FINAL_STATUSES
+
+    @property
+    def turn(self) -> "Color":
+        return self.board.turn
+
+    def legalMoves(self) -> "list[str]":
+        if self.over:
+            return []
+        return [moveToUCI(move) for move in self.board.generateMoves()]
+
+    def applyMove(self, uci: str) -> MoveResult:
+        """Play a move given in UCI notation, e.g. 'e2e4' or 'e7e8q'."""
+        uci = uci.strip().lower()
+        move = moveFromUCI(uci)
+        if move == None:
+            return MoveResult(False, uci, error="malformed move")
+        if self.over:
+            return MoveResult(False, uci, error="game is over")
+        board = self.board
+        legalMoves = board.generateMoves()
+        if move not in legalMoves:
+            if move | QUEEN << 12 in legalMoves:
+                return MoveResult(False, uci, error="missing promotion piece")
+            return MoveResult(False, uci, error="illegal move")
+        return self._play(move, uci, legalMoves)
+
+    def _play(self, move: int, uci: str, legalMoves: "list[int]") -> MoveResult:
+        """Push a move already known to be legal and record it."""
+        board = self.board
+        dest = moveDest(move)
+        mover = board.board[(move & 63) >> 3][move & 7]
+        capture = board.board[dest >> 3][dest & 7] != None or (
+            dest == board.epSquare and mover != None and mover.kind == PAWN
+        )
+        san = sanBody(board, move, legalMoves)
+        board.pushMove(move)
+        self.history.append(uci)
+
+        check = board.checked == board.turn
+        self.status = board.gameStatus()
+        self.over = self.status in FINAL_STATUSES
+        if check:
+            san += "#" if self.status == GameStatus.CHECKMATE else "+"
+        self.sanHistory.append(san)
+        return MoveResult(
+            True,
+            uci,
+            capture=capture,
+            check=check,
+            checkmate=self.status == GameStatus.CHECKMATE,
+            stalemate=self.status == GameStatus.STALEMATE,
+            promotion=PROMOTION_LETTERS.get(movePromotion(move)),
+            status=self.status.value,
+        )
+
+    def undo(self) -> bool:
+        """Take back the last move, False when there is none."""
+        if not self.history:
+            return False
+        self.board.unmakeMove()
+        self.history.pop()
+        self.sanHistory.pop()
+        self.status = self.board.gameStatus()
+        self.over = self.status in FINAL_STATUSES
+        return True
+
+    def applySAN(self, san: str) -> MoveResult:
+        """Play a move given in SAN, e.g. 'Nf3', 'exd5' or 'e8=Q+'."""
+        if self.over:
+            return MoveResult(False, san, error="game is over")
+        legalMoves = self.board.generateMoves()
+        move = parseSAN(self.board, san.strip(), legalMoves)
+        if move == None:
+            return MoveResult(False, san, error="illegal move")
+        return self._play(move, moveToUCI(move), legalMoves)
+
+    def result(self) -> str:
+        """PGN result: a win by checkmate, a draw by any other end, '*' while in progress."""
+        if not self.over:
+            return "*"
+        if self.status != GameStatus.CHECKMATE:
+            return "1/2-1/2"
+        return "0-1" if self.turn == Color.WHITE else "1-0"
+
+    def pgn(self, headers: "dict[str, str]|None" = None) -> str:
+        """The game so far as PGN, `headers` adds or overrides tags."""
+        tags = dict(headers or {})
+        if self.startFEN != None:
+            tags.setdefault("SetUp", "1")
+            tags.setdefault("FEN", self.startFEN)
+        return writeGame(PGNGame(tags, list(self.sanHistory), self.result()))
+
+    def fen(self) -> str:
+        return self.board.toFEN()
+
+
+def replayPGN(pgnGame: "PGNGame") -> "tuple[Game, MoveResult|None]":
+    """Play a PGN game's moves through a Game, stopping at the first illegal one.
+
+    Returns the game and the failed move's result, None when all were legal.
+    """
+    fen = pgnGame.headers.get("FEN")
+    game = Game(fen if fen else None)
+    for san in pgnGame.moves:
+        result = game.applySAN(san)
+        if not result.legal:
+            return game, result
+    return game, None
@@ -0,0 +1,292 @@
+"""Opt-in call counting and timing for move generation and search.
+
+    profiler = Instrumentation()
+    profiler.addMoveTarget(SearchBot)
+    with profiler:
+        bot.giveMove(board, board.turn)
+    print(profiler.moveSummary(profiler.moves[-1]))
+    profiler.writeJSON("stats.json")
+    profiler.writeCollapsed("stats.folded")  # flamegraph.pl stats.folded
+
+Nothing is wrapped until `enable`, which replaces the target methods on
+their classes with counting wrappers, and `disable` puts the originals
+back, so the code runs exactly as before while profiling is off. Calls of
+a move target, such as a bot's giveMove, each get a record of their time,
+the calls made under them and the nodes visited, counted as moves made on
+a board. Only calls from the thread that enabled it are counted.
+"""
+from time import perf_counter
+from typing import Callable
+import functools
+import inspect
+import json
+import threading
+
+from .board import Board
+from .pieces import Piece, Pawn, Knight, Bishop, Rook, Queen, King
+
+# (class, method names) wrapped by default, movePieceFromTo and the bots'
+# giveMove are left to be move targets
+DEFAULT_TARGETS: "list[tuple[type, list[str]]]" = [
+    (
+        Board,
+        [
+            "makeMove",
+            "unmakeMove",
+            "updateCheck",
+            "attackedBy",
+            "legalMask",
+            "refreshMoveCache",
+            "cachedMoves",
+            "getAllPossibleMoves",
+            "generateMoves",
+            "stagedMoves",
+            "hasLegalMove",
+            "seeSquares",
+            "evaluate",
+        ],
+    ),
+    (Piece, ["possibleMoves", "childPossibleMoves"]),
+    (Pawn, ["moveMask"]),
+    (Knight, ["moveMask"]),
+    (Bishop, ["moveMask"]),
+    (Rook, ["moveMask"]),
+    (Queen, ["moveMask"]),
+    (King, ["moveMask"]),
+]
+# calls of this method are the nodes of a move record
+NODE_METHOD = "Board.makeMove"
+
+
+class Instrumentation:
+    def __init__(self, targets: "list[tuple[type, list[str]]]|None" = None) -> None:
+        self.targets = list(DEFAULT_TARGETS if targets == None else targets)
+        self.moveTargets: "list[tuple[type, str]]" = []
+        # (class, name, the class's own attribute or None when inherited)
+        self.originals: "list[tuple[type, str, object]]" = []
+        self.thread: "threading.Thread|None" = None
+        self.reset()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.originals)
+
+    def addTarget(self, cls: type, names: "list[str]") -> None:
+        self.targets.append((cls, names))
+
+    def addMoveTarget(self, cls: type, name: str = "giveMove") -> None:
+        """Record every call of `cls.name` as one move."""
+        self.moveTargets.append((cls, name))
+
+    def reset(self) -> None:
+        """Forget what was recorded, the wrappers keep counting into the same lists."""
+        if not hasattr(self, "stats"):
+            # qualified name -> [calls, seconds], recursive calls timed once
+            self.stats: "dict[str, list]" = {}
+            # call stack -> seconds spent in its last frame itself
+            self.stacks: "dict[tuple[str, ...], float]" = {}
+            self.moves: "list[dict]" = []
+            self.stack: "list[str]" = []
+            # time spent in the callees of each frame on the stack
+            self.childTime: "list[float]" = []
+            self.active: "dict[str, int]" = {}
+        for counts in self.stats.values():
+            counts[0], counts[1] = 0, 0.0
+        self.stacks.clear()
+        self.moves.clear()
+
+    # wrapping
+
+    def enable(self) -> None:
+        if self.enabled:
+            return
+        self.thread = threading.current_thread()
+        for cls, names in self.targets:
+            for name in names:
+                if inspect.isgeneratorfunction(getattr(cls, name)):
+                    self.wrap(cls, name, self.countedGenerator)
+                else:
+                    self.wrap(cls, name, self.counted)
+        for cls, name in self.moveTargets:
+            self.wrap(cls, name, self.moveRecorded)
+
+    def disable(self) -> None:
+        for cls, name, own in reversed(self.originals):
+            if own == None:
+                delattr(cls, name)
+            else:
+                setattr(cls, name, own)
+        self.originals = []
+
+    def __enter__(self) -> "Instrumentation":
+        self.enable()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.disable()
+
+    def wrap(self, cls: type, name: str, wrapper: "Callable") -> None:
+        func = getattr(cls, name)
+        qualified = "%s.%s" % (cls.__name__, name)
+        self.originals.append((cls, name, cls.__dict__.get(name)))
+        setattr(cls, name, functools.wraps(func)(wrapper(qualified, func)))
+
+    def counted(self, qualified: str, func: "Callable") -> "Callable":
+        stats = self.stats.setdefault(qualified, [0, 0.0])
+        stack, childTime, active, stacks = (
+            self.stack,
+            self.childTime,
+            self.active,
+            self.stacks,
+        )
+
+        def wrapper(*args, **kwargs):
+            if threading.current_thread() is not self.thread:
+                return func(*args, **kwargs)
+            stack.append(qualified)
+            childTime.append(0.0)
+            active[qualified] = active.get(qualified, 0) + 1
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                key = tuple(stack)
+                stacks[key] = stacks.get(key, 0.0) + elapsed - childTime.pop()
+                stack.pop()
+                if childTime:
+                    childTime[-1] += elapsed
+                active[qualified] -= 1
+                stats[0] += 1
+                if not active[qualified]:
+                    stats[1] += elapsed
+
+        return wrapper
+
+    def countedGenerator(self, qualified: str, func: "Callable") -> "Callable":
+        """counted for a generator function: the time of every step is its time
+        and a generator is one call, so lazily generated work is not missed."""
+        stats = self.stats.setdefault(qualified, [0, 0.0])
+        stack, childTime, active, stacks = (
+            self.stack,
+            self.childTime,
+            self.active,
+            self.stacks,
+        )
+
+        def wrapper(*args, **kwargs):
+            generator = func(*args, **kwargs)
+            if threading.current_thread() is not self.thread:
+                yield from generator
+                return
+            stats[0] += 1
+            while True:
+                stack.append(qualified)
+                childTime.append(0.0)
+                active[qualified] = active.get(qualified, 0) + 1
+                start = perf_counter()
+                try:
+                    item = next(generator)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed = perf_counter() - start
+                    key = tuple(stack)
+                    stacks[key] = stacks.get(key, 0.0) + elapsed - childTime.pop()
+                    stack.pop()
+                    if childTime:
+                        childTime[-1] += elapsed
+                    active[qualified] -= 1
+                    if not active[qualified]:
+                        stats[1] += elapsed
+                yield item
+
+        return wrapper
+
+    def moveRecorded(self, qualified: str, func: "Callable") -> "Callable":
+        timed = self.counted(qualified, func)
+
+        def wrapper(bot, *args, **kwargs):
+            if threading.current_thread() is not self.thread:
+                return func(bot, *args, **kwargs)
+            before = {name: tuple(counts) for name, counts in self.stats.items()}
+            start = perf_counter()
+            result = timed(bot, *args, **kwargs)
+            elapsed = perf_counter() - start
+            functions = {}
+            for name, (calls, seconds) in self.stats.items():
+                calls0, seconds0 = before.get(name, (0, 0.0))
+                if calls != calls0 and name != qualified:
+                    functions[name] = {
+                        "calls": calls - calls0,
+                        "seconds": seconds - seconds0,
+                    }
+            record = {
+                "move": len(self.moves) + 1,
+                "target": qualified,
+                "seconds": elapsed,
+                "nodes": functions.get(NODE_METHOD, {"calls": 0})["calls"],
+                "functions": functions,
+            }
+            # search bots count their own nodes, quiescence included
+            searchNodes = getattr(bot, "nodes", None)
+            if isinstance(searchNodes, int):
+                record["searchNodes"] = searchNodes
+            self.moves.append(record)
+            return result
+
+        return wrapper
+
+    # reports
+
+    def snapshot(self) -> dict:
+        """Everything recorded so far as plain JSON types."""
+        return {
+            "functions": {
+                name: {"calls": calls, "seconds": seconds}
+                for name, (calls, seconds) in sorted(
+                    self.stats.items(), key=lambda item: -item[1][1]
+                )
+                if calls
+            },
+            "moves": self.moves,
+        }
+
+    def writeJSON(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=1)
+
+    def collapsed(self) -> "list[str]":
+        """Lines of `frame;frame;frame microseconds`, as flamegraph.pl reads them."""
+        return [
+            "%s %d" % (";".join(stack), round(seconds * 1e6))
+            for stack, seconds in sorted(self.stacks.items())
+            if seconds > 0
+        ]
+
+    def writeCollapsed(self, path: str) -> None:
+        with open(path, "w") as f:
+            for line in self.collapsed():
+                f.write(line + "\n")
+
+    def moveSummary(self, record: dict, top: int = 4) -> str:
+        """One move record in a few lines: time, nodes and the busiest functions."""
+        nodes = record.get("searchNodes", record["nodes"])
+        lines = [
+            "%s #%d: %.3fs, %d nodes, %.0f nodes/s"
+            % (
+                record["target"],
+                record["move"],
+                record["seconds"],
+                nodes,
+                nodes / max(record["seconds"], 1e-9),
+            )
+        ]
+        busiest = sorted(
+            record["functions"].items(), key=lambda item: -item[1]["seconds"]
+        )
+        for name, counts in busiest[:top]:
+            lines.append(
+                "  %-26s %8d calls %8.3fs" % (name, counts["calls"], counts["seconds"])
+            )
+        return "\n".join(lines)
@@ -0,0 +1,54 @@
+"""Compact move codes: `src | dest << 6 | promotion << 12`.
+
+Squares are bitboard squares (`Y * 8 + X`) and `promotion` is the kind of
+the piece a pawn promotes to, 0 for every other move.
+"""
+from .bitboard import KNIGHT, BISHOP, ROOK, QUEEN
+from .utils import CharToInt, IntToChar
+
+PROMOTION_LETTERS = {KNIGHT: "n", BISHOP: "b", ROOK: "r", QUEEN: "q"}
+LETTER_PROMOTIONS = {letter: kind for kind, letter in PROMOTION_LETTERS.items()}
+
+
+def encodeMove(src: int, dest: int, promotion: int = 0) -> int:
+    return src | dest << 6 | promotion << 12
+
+
+def moveSrc(move: int) -> int:
+    return move & 63
+
+
+def moveDest(move: int) -> int:
+    return (move >> 6) & 63
+
+
+def movePromotion(move: int) -> int:
+    return move >> 12
+
+
+def squareName(sq: int) -> str:
+    return IntToChar[sq & 7] + str(8 - (sq >> 3))
+
+
+def moveToUCI(move: int) -> str:
+    name = squareName(moveSrc(move)) + squareName(moveDest(move))
+    if movePromotion(move):
+        name += PROMOTION_LETTERS[movePromotion(move)]
+    return name
+
+
+def moveFromUCI(uci: str) -> "int|None":
+    """Parse long algebraic notation such as 'e2e4' or 'e7e8q', None if malformed."""
+    if len(uci) not in (4, 5):
+        return None
+    squares = []
+    for file, rank in (uci[0:2], uci[2:4]):
+        if file not in CharToInt or rank not in "12345678":
+            return None
+        squares.append((8 - int(rank)) * 8 + CharToInt[file])
+    promotion = 0
+    if len(uci) == 5:
+        promotion = LETTER_PROMOTIONS.get(uci[4].lower(), -1)
+        if promotion < 0:
+            return None
+    return encodeMove(squares[0], squares[1], promotion)
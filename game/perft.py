@@ -0,0 +1,36 @@
+"""Perft: count the leaf nodes of the legal move tree to a fixed depth.
+
+Promotions count once per piece a pawn can promote to, as in published
+perft tables.
+"""
+from typing import TYPE_CHECKING
+
+from .moves import moveToUCI
+
+if TYPE_CHECKING:
+    from .board import Board
+
+
+def perft(board: "Board", depth: int) -> int:
+    if depth == 0:
+        return 1
+    moves = board.generateMoves()
+    if depth == 1:
+        # bulk count the last ply instead of playing it
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        board.pushMove(move)
+        nodes += perft(board, depth - 1)
+        board.unmakeMove()
+    return nodes
+
+
+def divide(board: "Board", depth: int) -> "dict[str, int]":
+    """Perft split by root move, for finding where two generators disagree."""
+    counts: "dict[str, int]" = {}
+    for move in board.generateMoves():
+        board.pushMove(move)
+        counts[moveToUCI(move)] = perft(board, depth - 1)
+        board.unmakeMove()
+    return counts
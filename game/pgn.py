@@ -0,0 +1,225 @@
+"""Minimal PGN support: tag pairs, main line moves in SAN and the result.
+
+Comments, variations, NAGs and move numbers are skipped when reading. Games
+are read one at a time from any iterable of lines, so large files are
+streamed with constant memory.
+"""
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Iterable, Iterator, TextIO
+import gzip
+import re
+
+from .bitboard import PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING
+from .moves import moveSrc, moveDest, movePromotion, squareName
+from .utils import CharToInt, IntToChar
+
+if TYPE_CHECKING:
+    from .board import Board
+
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+SAN_KINDS = {"N": KNIGHT, "B": BISHOP, "R": ROOK, "Q": QUEEN, "K": KING}
+KIND_LETTERS = {kind: letter for letter, kind in SAN_KINDS.items()}
+# tags every exported game starts with, in this order
+SEVEN_TAG_ROSTER = ("Event", "Site", "Date", "Round", "White", "Black", "Result")
+LINE_WIDTH = 80
+
+_TAG = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+# a token is a comment, a parenthesis, a NAG or a run of other characters
+_TOKEN = re.compile(r"\{[^}]*\}?|;.*|\(|\)|\$\d+|[^\s{}();$]+")
+_MOVE_NUMBER = re.compile(r"^\d+\.+")
+_SAN = re.compile(r"^([NBRQK])?([a-h])?([1-8])?(x)?([a-h][1-8])(?:=?([NBRQ]))?$")
+
+
+@dataclass
+class PGNGame:
+    headers: "dict[str, str]" = field(default_factory=dict)
+    # main line in standard algebraic notation
+    moves: "list[str]" = field(default_factory=list)
+    result: str = "*"
+
+
+def openPGN(path: str) -> "TextIO":
+    """Open a PGN file for reading as text, gzip compressed when it ends in .gz."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, encoding="utf-8", errors="replace")
+
+
+def readGames(lines: "Iterable[str]") -> "Iterator[PGNGame]":
+    """Yield the games of a PGN stream one by one."""
+    game = PGNGame()
+    inMoves = False
+    depth = 0
+    comment = False
+    for line in lines:
+        if comment:
+            # inside a brace comment spanning lines
+            end = line.find("}")
+            if end < 0:
+                continue
+            line = line[end + 1 :]
+            comment = False
+        stripped = line.strip()
+        if stripped.startswith("%"):
+            # escape line
+            continue
+        if depth == 0 and stripped.startswith("["):
+            if inMoves:
+                # a new tag section without a result ends the game before it
+                yield game
+                game, inMoves = PGNGame(), False
+            match = _TAG.match(stripped)
+            if match:
+                game.headers[match.group(1)] = match.group(2).replace('\\"', '"')
+            continue
+        for token in _TOKEN.findall(line):
+            if token[0] == "{":
+                comment = not token.endswith("}")
+            elif token[0] in ";$":
+                continue
+            elif token == "(":
+                depth += 1
+            elif token == ")":
+                depth = max(0, depth - 1)
+            elif depth > 0:
+                continue
+            elif token in RESULTS:
+                game.result = token
+                yield game
+                game, inMoves = PGNGame(), False
+            else:
+                token = _MOVE_NUMBER.sub("", token)
+                if token:
+                    game.moves.append(token)
+                    inMoves = True
+    if inMoves or game.headers:
+        yield game
+
+
+def parseSAN(board: "Board", san: str, moves: "list[int]|None" = None) -> "int|None":
+    """Code of the legal move `san` names for the side to move, None if it names none.
+
+    Ambiguous moves also give None. `moves` saves generating the legal moves
+    again when the caller already has them.
+    """
+    san = san.rstrip("+#!?")
+    if moves == None:
+        moves = board.generateMoves()
+    if san.replace("0", "O") in ("O-O", "O-O-O"):
+        king = board.kingSquare(board.turn)
+        dest = king + (2 if san.replace("0", "O") == "O-O" else -2)
+        for move in moves:
+            if moveSrc(move) == king and moveDest(move) == dest:
+                return move
+        return None
+    match = _SAN.match(san)
+    if not match:
+        return None
+    letter, file, rank, _, square, promotion = match.groups()
+    kind = SAN_KINDS[letter] if letter else PAWN
+    dest = (8 - int(square[1])) * 8 + CharToInt[square[0]]
+    promotionKind = SAN_KINDS[promotion] if promotion else 0
+    found = None
+    for move in moves:
+        if moveDest(move) != dest or movePromotion(move) != promotionKind:
+            continue
+        src = moveSrc(move)
+        piece = board.board[src >> 3][src & 7]
+        if piece == None or piece.kind != kind:
+            continue
+        if file and src & 7 != CharToInt[file]:
+            continue
+        if rank and 8 - (src >> 3) != int(rank):
+            continue
+        if found != None:
+            return None
+        found = move
+    return found
+
+
+def sanBody(board: "Board", move: int, legalMoves: "list[int]") -> str:
+    """SAN of a legal move without its check suffix, before it is played."""
+    src, dest = moveSrc(move), moveDest(move)
+    piece = board.board[src >> 3][src & 7]
+    assert piece != None
+    target = board.board[dest >> 3][dest & 7]
+    if piece.kind == KING and abs(dest - src) == 2:
+        return "O-O" if dest > src else "O-O-O"
+    if piece.kind == PAWN:
+        san = ""
+        if src & 7 != dest & 7:
+            # captures, en passant included, change file
+            san = IntToChar[src & 7] + "x"
+        san += squareName(dest)
+        if movePromotion(move):
+            san += "=" + KIND_LETTERS[movePromotion(move)]
+        return san
+    # other pieces of the same kind that can reach the same square
+    rivals = []
+    for other in legalMoves:
+        otherSrc = moveSrc(other)
+        if moveDest(other) != dest or otherSrc == src:
+            continue
+        rival = board.board[otherSrc >> 3][otherSrc & 7]
+        if rival != None and rival.kind == piece.kind:
+            rivals.append(otherSrc)
+    san = KIND_LETTERS[piece.kind]
+    if rivals:
+        if all(sq & 7 != src & 7 for sq in rivals):
+            san += IntToChar[src & 7]
+        elif all(sq >> 3 != src >> 3 for sq in rivals):
+            san += str(8 - (src >> 3))
+        else:
+            san += squareName(src)
+    if target != None:
+        san += "x"
+    return san + squareName(dest)
+
+
+def moveToSAN(board: "Board", move: int) -> str:
+    """SAN of a legal move for the side to move, with '+' or '#'."""
+    san = sanBody(board, move, board.generateMoves())
+    board.pushMove(move)
+    if board.checked == board.turn:
+        san += "#" if not board.generateMoves() else "+"
+    board.unmakeMove()
+    return san
+
+
+def writeGame(game: "PGNGame") -> str:
+    """PGN text of a game, with the seven tag roster first and lines wrapped."""
+    headers = dict(game.headers)
+    headers["Result"] = game.result
+    lines = []
+    for tag in SEVEN_TAG_ROSTER:
+        lines.append('[%s "%s"]' % (tag, headers.pop(tag, "?").replace('"', '\\"')))
+    for tag, value in headers.items():
+        lines.append('[%s "%s"]' % (tag, value.replace('"', '\\"')))
+    lines.append("")
+
+    # the move numbers continue from a starting position given as FEN
+    fields = headers.get("FEN", "").split()
+    number = int(fields[5]) if len(fields) > 5 and fields[5].isdigit() else 1
+    white = len(fields) < 2 or fields[1] != "b"
+    tokens = []
+    for i, san in enumerate(game.moves):
+        if white:
+            tokens.append("%d. %s" % (number, san))
+        elif i == 0:
+            tokens.append("%d... %s" % (number, san))
+        else:
+            tokens.append(san)
+        if not white:
+            number += 1
+        white = not white
+    tokens.append(game.result)
+
+    line = ""
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > LINE_WIDTH:
+            lines.append(line)
+            line = token
+        else:
+            line = line + " " + token if line else token
+    lines.append(line)
+    return "\n".join(lines) + "\n"
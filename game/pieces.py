@@ -1,6 +1,23 @@
 from typing import TYPE_CHECKING
-from copy import deepcopy
 from .utils import Pos, Color
+from .bitboard import (
+    PAWN,
+    KNIGHT,
+    BISHOP,
+    ROOK,
+    QUEEN,
+    KING,
+    FULL,
+    SQUARE_BB,
+    KNIGHT_ATTACKS,
+    KING_ATTACKS,
+    PAWN_ATTACKS,
+    bishopAttacks,
+    rookAttacks,
+    queenAttacks,
+    positions,
+    squareOf,
+)
 from dataclasses import dataclass
 
 if TYPE_CHECKING:
@@ -8,246 +25,201 @@ if TYPE_CHECKING:
 
 
 class Piece:
+    __slots__ = ("pos", "color", "hasMoved")
+    kind = -1
+
     def __init__(self, x: "int", y: "int", color: "Color") -> "None":
         self.pos = Pos(x, y)
         self.color = color
+        self.hasMoved = False
 
     def __repr__(self) -> str:
         return "xX"
 
     def possibleMoves(self, board: "Board", depth=1) -> "tuple[list[Pos],list[Pos]]":
-        possMoves = self.childPossibleMoves(board)
         if depth == 0:
-            return possMoves, []
-        illegalMoves = []
-        legalMoves = []
-        for move in possMoves:
-            newBoard = deepcopy(board)
-            newBoard.overrideMove(self.pos, move)
-            if newBoard.checked == self.color:
-                legalMoves.append(move)
-            else:
-                illegalMoves.append(move)
-        return illegalMoves, legalMoves
+            return positions(self.moveMask(board)), []
+        possMoves, legalMoves = board.cachedMoves(self)
+        return positions(legalMoves), positions(possMoves & ~legalMoves)
 
     def childPossibleMoves(self, board: "Board") -> "list[Pos]":
-        return []
+        return positions(self.moveMask(board))
+
+    def moveMask(self, board: "Board") -> int:
+        """Bitboard of the pseudo-legal destination squares."""
+        return 0
+
+    def reachMask(self, board: "Board") -> int:
+        """Squares whose contents decide moveMask.
+
+        A change on any of them drops the board's cached moves for the piece.
+        Kings keep the default, their castling depends on the whole board.
+        """
+        return FULL
 
     def moveTo(self, pos: Pos):
+        self.hasMoved = True
         self.pos = pos
 
 
 class Pawn(Piece):
+    __slots__ = ()
+    kind = PAWN
+
     def __repr__(self) -> str:
         return "bP" if self.color == Color.BLACK else "wP"
 
-    def childPossibleMoves(self, board: "Board"):
-        dir = board.getDirection(self.color)
-        moves: "list[Pos]" = []
-
-        front = self.pos.move(0, dir)
-        if board.canMove(front):
-            moves.append(front)
-            if (dir == 1 and self.pos.Y == 1) or (dir == -1 and self.pos.Y == 6):
-                front2 = self.pos.move(0, dir * 2)
-                if board.canMove(front2):
-                    moves.append(front2)
-
-        diagLeft = self.pos.move(-1, dir)
-        if board.canKill(diagLeft, self.color):
-            moves.append(diagLeft)
-        diagRight = self.pos.move(+1, dir)
-        if board.canKill(diagRight, self.color):
-            moves.append(diagRight)
-        return moves
-
-
-KnightsMoves = [
-    (+2, +1),
-    (+2, -1),
-    (-2, +1),
-    (-2, -1),
-    (+1, +2),
-    (+1, -2),
-    (-1, +2),
-    (-1, -2),
-]
+    def moveMask(self, board: "Board"):
+        sq = squareOf(self.pos)
+        step = 8 * board.getDirection(self.color)
+        occ = board.occupancy()
+        moves = 0
+
+        front = sq + step
+        if 0 <= front < 64 and not occ & SQUARE_BB[front]:
+            moves |= SQUARE_BB[front]
+            if (step > 0 and self.pos.Y == 1) or (step < 0 and self.pos.Y == 6):
+                front2 = front + step
+                if not occ & SQUARE_BB[front2]:
+                    moves |= SQUARE_BB[front2]
+
+        opp = board.colorBoards[self.color.GetOpp().value]
+        # en passant squares sit on the sixth rank from the capturing side
+        ep = board.epSquare
+        if ep >= 0 and (ep >> 3) == (5 if step > 0 else 2):
+            opp |= SQUARE_BB[ep]
+        return moves | PAWN_ATTACKS[self.color.value][sq] & opp
+
+    def reachMask(self, board: "Board"):
+        sq = squareOf(self.pos)
+        step = 8 * board.getDirection(self.color)
+        reach = PAWN_ATTACKS[self.color.value][sq]
+        if 0 <= sq + step < 64:
+            reach |= SQUARE_BB[sq + step]
+            if 0 <= sq + 2 * step < 64:
+                reach |= SQUARE_BB[sq + 2 * step]
+        return reach
 
 
 class Knight(Piece):
+    __slots__ = ()
+    kind = KNIGHT
+
     def __repr__(self) -> str:
         return "bN" if self.color == Color.BLACK else "wN"
 
-    def childPossibleMoves(self, board: "Board"):
-        moves: "list[Pos]" = []
-        for mv in KnightsMoves:
-            pos = self.pos.move(mv[0], mv[1])
-            if board.canMove(pos) or board.canKill(pos, self.color):
-                moves.append(pos)
-        return moves
+    def moveMask(self, board: "Board"):
+        sq = squareOf(self.pos)
+        return KNIGHT_ATTACKS[sq] & ~board.colorBoards[self.color.value]
 
-
-BishopDirection = [
-    (+1, +1),
-    (+1, -1),
-    (-1, +1),
-    (-1, -1),
-]
+    def reachMask(self, board: "Board"):
+        return KNIGHT_ATTACKS[squareOf(self.pos)]
 
 
 class Bishop(Piece):
+    __slots__ = ()
+    kind = BISHOP
+
     def __repr__(self) -> str:
         return "bB" if self.color == Color.BLACK else "wB"
 
-    def childPossibleMoves(self, board: "Board"):
-        moves: "list[Pos]" = []
-        for dir in BishopDirection:
-            for i in range(1, 8):
-                posN = self.pos.move(dir[0] * i, dir[1] * i)
-                if board.canMove(posN):
-                    moves.append(posN)
-                elif board.canKill(posN, self.color):
-                    moves.append(posN)
-                    break
-                else:
-                    break
-        return moves
-
+    def moveMask(self, board: "Board"):
+        sq = squareOf(self.pos)
+        own = board.colorBoards[self.color.value]
+        return bishopAttacks(sq, board.occupancy()) & ~own
 
-RookDirections = [
-    (+1, 0),
-    (-1, 0),
-    (0, +1),
-    (0, -1),
-]
+    def reachMask(self, board: "Board"):
+        # the rays up to and including the first piece in each direction
+        return bishopAttacks(squareOf(self.pos), board.occupancy())
 
 
 class Rook(Piece):
-    def __init__(self, x: "int", y: "int", color: "Color") -> None:
-        super().__init__(x, y, color)
-        self.hasMoved = False
+    __slots__ = ()
+    kind = ROOK
 
     def __repr__(self) -> str:
         return "bR" if self.color == Color.BLACK else "wR"
 
-    def moveTo(self, pos: "Pos"):
-        self.hasMoved = True
-        return super().moveTo(pos)
-
-    def childPossibleMoves(self, board: "Board"):
-        moves: "list[Pos]" = []
-        for dir in RookDirections:
-            for i in range(1, 8):
-                posN = self.pos.move(dir[0] * i, dir[1] * i)
-                if board.canMove(posN):
-                    moves.append(posN)
-                elif board.canKill(posN, self.color):
-                    moves.append(posN)
-                    break
-                else:
-                    break
-        return moves
+    def moveMask(self, board: "Board"):
+        sq = squareOf(self.pos)
+        own = board.colorBoards[self.color.value]
+        return rookAttacks(sq, board.occupancy()) & ~own
+
+    def reachMask(self, board: "Board"):
+        return rookAttacks(squareOf(self.pos), board.occupancy())
 
 
 class Queen(Piece):
+    __slots__ = ()
+    kind = QUEEN
+
     def __repr__(self) -> str:
         return "bQ" if self.color == Color.BLACK else "wQ"
 
-    def childPossibleMoves(self, board: "Board"):
-        moves: "list[Pos]" = []
-        for dir in RookDirections + BishopDirection:
-            for i in range(1, 8):
-                posN = self.pos.move(dir[0] * i, dir[1] * i)
-                if board.canMove(posN):
-                    moves.append(posN)
-                elif board.canKill(posN, self.color):
-                    moves.append(posN)
-                    break
-                else:
-                    break
-        return moves
+    def moveMask(self, board: "Board"):
+        sq = squareOf(self.pos)
+        own = board.colorBoards[self.color.value]
+        return queenAttacks(sq, board.occupancy()) & ~own
+
+    def reachMask(self, board: "Board"):
+        return queenAttacks(squareOf(self.pos), board.occupancy())
 
 
 class King(Piece):
-    def __init__(self, x: "int", y: "int", color: "Color") -> None:
-        super().__init__(x, y, color)
-        self.hasMoved = False
+    __slots__ = ()
+    kind = KING
 
     def __repr__(self) -> str:
         return "bK" if self.color == Color.BLACK else "wK"
 
-    def moveTo(self, pos: Pos):
-        self.hasMoved = True
-        return super().moveTo(pos)
-
-    def childPossibleMoves(self, board: "Board"):
-        moves: "list[Pos]" = []
-        for dir in RookDirections + BishopDirection:
-            posN = self.pos.move(dir[0], dir[1])
-            if board.canMove(posN):
-                moves.append(posN)
-            elif board.canKill(posN, self.color):
-                moves.append(posN)
-        moves = moves + self.getCastlingMoves(board)
-        return moves
+    def moveMask(self, board: "Board"):
+        sq = squareOf(self.pos)
+        own = board.colorBoards[self.color.value]
+        return KING_ATTACKS[sq] & ~own | self.castlingMask(board)
 
     def getCastlingMoves(self, board: "Board") -> "list[Pos]":
+        return positions(self.castlingMask(board))
+
+    def castlingMask(self, board: "Board") -> int:
         if self.hasMoved:
-            return []
+            return 0
+        # only a king on its starting square can castle
+        if self.pos.X != 4 or self.pos.Y != (0 if self.color == Color.BLACK else 7):
+            return 0
 
         # check if currently in check
-        if board.checked == self.color:
-            return []
-        moves = []
-
-        def checkNonQueenSide():
-            if (
-                board.getPiece(self.pos.move(1, 0)) != None
-                or board.getPiece(self.pos.move(2, 0)) != None
-            ):
-                return
-            rookPos = board.getPiece(self.pos.move(3, 0))
-            if not isinstance(rookPos, Rook):
-                return
-            if rookPos.hasMoved:
-                return
-            newBoard = deepcopy(board)
-            newBoard.overrideMove(self.pos, self.pos.move(1, 0))
-            if newBoard.checked == self.color:
-                return
-            newBoard.overrideMove(self.pos.move(1, 0), self.pos.move(2, 0))
-            if newBoard.checked == self.color:
-                return
-            moves.append(self.pos.move(2, 0))
-
-        def checkQueenSide():
-            if (
-                board.getPiece(self.pos.move(-1, 0)) != None
-                or board.getPiece(self.pos.move(-2, 0)) != None
-                or board.getPiece(self.pos.move(-3, 0)) != None
+        sq = squareOf(self.pos)
+        opp = self.color.GetOpp()
+        occ = board.occupancy()
+        if board.attackedBy(sq, opp, occ):
+            return 0
+        rooks = board.bitboards[self.color.value * 6 + ROOK]
+        moves = 0
+
+        # (direction, distance to the rook)
+        for dir, rookDist in ((1, 3), (-1, 4)):
+            if not 0 <= self.pos.X + dir * rookDist < 8:
+                continue
+            rookSq = sq + dir * rookDist
+            if not rooks & SQUARE_BB[rookSq]:
+                continue
+            if board.getPiece(Pos(rookSq & 7, rookSq >> 3)).hasMoved:  # type: ignore
+                continue
+            between = 0
+            for i in range(1, rookDist):
+                between |= SQUARE_BB[sq + dir * i]
+            if occ & between:
+                continue
+            if board.attackedBy(sq + dir, opp, occ) or board.attackedBy(
+                sq + dir * 2, opp, occ
             ):
-                return
-            rookPos = board.getPiece(self.pos.move(-4, 0))
-            if not isinstance(rookPos, Rook):
-                return
-            if rookPos.hasMoved:
-                return
-            newBoard = deepcopy(board)
-            newBoard.overrideMove(self.pos, self.pos.move(-1, 0))
-            if newBoard.checked == self.color:
-                return
-            newBoard.overrideMove(self.pos.move(-1, 0), self.pos.move(-2, 0))
-            if newBoard.checked == self.color:
-                return
-            moves.append(self.pos.move(-2, 0))
-
-        checkNonQueenSide()
-        checkQueenSide()
-
+                continue
+            moves |= SQUARE_BB[sq + dir * 2]
         return moves
 
 
 @dataclass
 class PossibleMoves:
+    __slots__ = ("piece", "to")
     piece: Piece
     to: "list[Pos]"
@@ -0,0 +1,143 @@
+"""Terminal drawing that only sends what changed since the last frame.
+
+A view remembers what it last drew at its place on the screen and its
+`update` returns the escape sequences that bring the screen up to date:
+cursor moves to the squares or log rows that changed, then their new
+contents. A move on a drawn board costs a few dozen bytes instead of the
+whole screen.
+"""
+from collections import deque
+from typing import TYPE_CHECKING, TextIO
+import sys
+
+from .utils import UNICODE_PIECE_SYMBOLS as UP
+
+if TYPE_CHECKING:
+    from .board import Board
+
+CLEAR_SCREEN = "\033[2J\033[H"
+# erase from the cursor to the end of its line
+CLEAR_LINE = "\033[K"
+RESET = "\033[0m"
+
+
+def moveTo(row: int, col: int) -> str:
+    """Cursor to a 0-based screen position."""
+    return "\033[%d;%dH" % (row + 1, col + 1)
+
+
+def squareSymbol(board: "Board", sq: int) -> str:
+    piece = board.board[sq >> 3][sq & 7]
+    return " " if piece == None else UP[str(piece)]
+
+
+class BoardView:
+    """A board drawn at (top, left), redrawn square by square.
+
+    The full view has the frame and coordinates of Board.__repr__, the
+    compact one is eight rows of symbols, '.' for an empty square.
+    """
+
+    def __init__(self, top: int = 0, left: int = 0, compact: bool = False) -> None:
+        self.top = top
+        self.left = left
+        self.compact = compact
+        # symbol shown on each square, None until the frame is drawn
+        self.shown: "list[str|None]" = [None] * 64
+
+    @property
+    def height(self) -> int:
+        return 8 if self.compact else 18
+
+    @property
+    def width(self) -> int:
+        return 15 if self.compact else 42
+
+    def invalidate(self) -> None:
+        """Draw everything on the next update, e.g. after the screen was cleared."""
+        self.shown = [None] * 64
+
+    def frame(self) -> str:
+        """The view without pieces."""
+        if self.compact:
+            return ""
+        lines = ["    " + "    ".join("abcdefgh") + "   ", "  ╔" + "═" * 39 + "╗"]
+        for i in range(8):
+            if i:
+                lines.append("  ║" + "─" * 39 + "║")
+            lines.append(str(8 - i) + " ║ " + "  | ".join(" " * 8) + "  ║")
+        lines.append("  ╚" + "═" * 39 + "╝")
+        return "".join(
+            moveTo(self.top + row, self.left) + line for row, line in enumerate(lines)
+        )
+
+    def squarePosition(self, sq: int) -> "tuple[int, int]":
+        if self.compact:
+            return self.top + (sq >> 3), self.left + (sq & 7) * 2
+        return self.top + 2 + (sq >> 3) * 2, self.left + 4 + (sq & 7) * 5
+
+    def update(self, board: "Board") -> str:
+        out = []
+        if self.shown[0] == None:
+            out.append(self.frame())
+        shown = self.shown
+        for sq in range(64):
+            symbol = squareSymbol(board, sq)
+            if symbol == " " and self.compact:
+                symbol = "."
+            if shown[sq] != symbol:
+                shown[sq] = symbol
+                row, col = self.squarePosition(sq)
+                out.append(moveTo(row, col) + symbol)
+        return "".join(out)
+
+
+class LogView:
+    """The last `height` log lines at (top, left), newest at the bottom.
+
+    Lines are kept in a ring buffer and only the rows whose text changed
+    are rewritten.
+    """
+
+    def __init__(self, top: int, left: int, height: int) -> None:
+        self.top = top
+        self.left = left
+        self.height = height
+        self.lines: "deque[str]" = deque(maxlen=height)
+        self.shown: "list[str|None]" = [None] * height
+
+    def add(self, msg: str) -> None:
+        self.lines.extend(msg.split("\n"))
+
+    def invalidate(self) -> None:
+        self.shown = [None] * self.height
+
+    def update(self) -> str:
+        out = []
+        blank = self.height - len(self.lines)
+        for row in range(self.height):
+            text = self.lines[row - blank] if row >= blank else ""
+            if self.shown[row] != text:
+                self.shown[row] = text
+                out.append(
+                    moveTo(self.top + row, self.left) + text + RESET + CLEAR_LINE
+                )
+        return "".join(out)
+
+
+class Screen:
+    """An output stream that counts the bytes sent to it."""
+
+    def __init__(self, stream: "TextIO" = sys.stdout) -> None:
+        self.stream = stream
+        self.bytesWritten = 0
+
+    def write(self, text: str) -> None:
+        if not text:
+            return
+        self.stream.write(text)
+        self.stream.flush()
+        self.bytesWritten += len(text.encode())
+
+    def clear(self) -> None:
+        self.write(CLEAR_SCREEN)
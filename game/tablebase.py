@@ -0,0 +1,543 @@
+"""Endgame tablebases for a few pieces, built by retrograde analysis.
+
+A table covers one material signature such as "KRvKP", white's pieces
+before the "v" and black's after. It holds one byte per position with
+either side to move: 0 for a draw, otherwise the distance to mate in plies
+plus one, where an odd distance is a win for the side to move and an even
+one a loss. A file is a 16 byte header followed by those bytes in index
+order, so probing is one index computation and one read from a read-only
+`mmap`, and processes probing the same file share its pages.
+
+Pieces are indexed by square in signature order. The board's symmetries
+fold the first white king into a corner: into the 10 squares of the a8-d8-d5
+triangle without pawns, into files a-d with pawns. Castling rights are not
+covered and en passant captures are ignored.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from array import array
+from typing import TYPE_CHECKING, Callable
+import mmap
+import os
+
+from .board import Board
+from .utils import Color, SQUARES
+from .pieces import Pawn, Knight, Bishop, Rook, Queen, King
+from .bitboard import (
+    PAWN,
+    KNIGHT,
+    BISHOP,
+    ROOK,
+    QUEEN,
+    KING,
+    PAWN_ATTACKS,
+    popcount,
+)
+from .moves import moveSrc, moveDest, movePromotion
+from .evaluation import PIECE_VALUES
+
+if TYPE_CHECKING:
+    from .pieces import Piece
+
+MAGIC = b"CHSTB001"
+HEADER_SIZE = 16
+DRAW = 0
+INVALID = 255
+# distances must fit a byte next to DRAW and INVALID
+MAX_PLIES = 253
+
+# signature letters in index order
+LETTERS = "KQRBNP"
+LETTER_KINDS = {"K": KING, "Q": QUEEN, "R": ROOK, "B": BISHOP, "N": KNIGHT, "P": PAWN}
+KIND_LETTERS = {kind: letter for letter, kind in LETTER_KINDS.items()}
+# position of each kind in LETTERS
+KIND_ORDER = {kind: LETTERS.index(letter) for letter, kind in LETTER_KINDS.items()}
+PIECE_CLASSES: "list[type[Piece]]" = [Pawn, Knight, Bishop, Rook, Queen, King]
+
+# worker statuses of a position
+NORMAL, ILLEGAL, MATED, STALEMATE = range(4)
+
+
+def _transform(sq: int, flipX: bool, flipY: bool, swap: bool) -> int:
+    x, y = sq & 7, sq >> 3
+    if flipX:
+        x = 7 - x
+    if flipY:
+        y = 7 - y
+    if swap:
+        x, y = y, x
+    return y * 8 + x
+
+
+# TRANSFORMS[t][sq] for the 8 symmetries, t = flipX | flipY << 1 | swap << 2
+TRANSFORMS = [
+    [_transform(sq, bool(t & 1), bool(t & 2), bool(t & 4)) for sq in range(64)]
+    for t in range(8)
+]
+
+
+def _foldWithoutPawns(sq: int) -> int:
+    x, y = sq & 7, sq >> 3
+    t = (x > 3) | (y > 3) << 1
+    folded = TRANSFORMS[t][sq]
+    if folded >> 3 > folded & 7:
+        t |= 4
+    return t
+
+
+# symmetry that brings a king on each square into the folded region
+KING_FOLD = [
+    [_foldWithoutPawns(sq) for sq in range(64)],
+    [int(sq & 7 > 3) for sq in range(64)],
+]
+# index of each folded king square, -1 outside the region
+KING_REGION = [
+    [-1] * 64,
+    [-1] * 64,
+]
+for _sq in range(64):
+    if _sq & 7 <= 3 and _sq >> 3 <= _sq & 7:
+        KING_REGION[0][_sq] = sum(
+            1 for s in range(_sq) if s & 7 <= 3 and s >> 3 <= s & 7
+        )
+    if _sq & 7 <= 3:
+        KING_REGION[1][_sq] = (_sq >> 3) * 4 + (_sq & 7)
+REGION_SIZES = [10, 32]
+# folded king square of each region index
+REGION_SQUARES = [
+    [KING_REGION[pawns].index(i) for i in range(REGION_SIZES[pawns])]
+    for pawns in (0, 1)
+]
+
+
+class Signature:
+    """A material signature and the index of its positions.
+
+    `pieces` lists (color value, kind) in index order, white's first.
+    """
+
+    def __init__(self, name: str) -> None:
+        white, black = splitName(name)
+        self.name = white + "v" + black
+        self.pieces: "list[tuple[int, int]]" = [
+            (Color.WHITE.value, LETTER_KINDS[letter]) for letter in white
+        ] + [(Color.BLACK.value, LETTER_KINDS[letter]) for letter in black]
+        self.hasPawns = "P" in self.name
+        self.regionSize = REGION_SIZES[self.hasPawns]
+        self.size = 2 * self.regionSize * 64 ** (len(self.pieces) - 1)
+
+    def index(self, squares: "list[int]", stm: int) -> int:
+        """Index of pieces on `squares`, in signature order, with `stm` to move."""
+        t = KING_FOLD[self.hasPawns][squares[0]]
+        table = TRANSFORMS[t]
+        index = stm * self.regionSize + KING_REGION[self.hasPawns][table[squares[0]]]
+        for sq in squares[1:]:
+            index = index * 64 + table[sq]
+        return index
+
+    def decode(self, index: int) -> "tuple[list[int], int]":
+        squares = []
+        for _ in range(len(self.pieces) - 1):
+            squares.append(index & 63)
+            index >>= 6
+        region = index % self.regionSize
+        squares.append(REGION_SQUARES[self.hasPawns][region])
+        squares.reverse()
+        return squares, index // self.regionSize
+
+    def successors(self) -> "list[str]":
+        """Canonical signatures reached by a capture or a promotion."""
+        names = set()
+        white, black = splitName(self.name)
+        for own, other in ((white, black), (black, white)):
+            for i, letter in enumerate(other):
+                if letter != "K":
+                    names.add(canonicalName(own, other[:i] + other[i + 1 :]))
+            if "P" in own:
+                for promoted in "QRBN":
+                    mover = sortLetters(own.replace("P", promoted, 1))
+                    names.add(canonicalName(mover, other))
+                    for i, letter in enumerate(other):
+                        if letter != "K":
+                            names.add(canonicalName(mover, other[:i] + other[i + 1 :]))
+        names.discard(self.name)
+        return sorted(names)
+
+
+def sortLetters(letters: str) -> str:
+    return "".join(sorted(letters, key=LETTERS.index))
+
+
+def splitName(name: str) -> "tuple[str, str]":
+    """('KR', 'KP') for 'KRvKP' or 'KRKP'."""
+    name = name.upper()
+    if "V" in name:
+        white, black = name.split("V")
+    else:
+        second = name.find("K", 1)
+        white, black = name[:second], name[second:]
+    if (
+        white.count("K") != 1
+        or black.count("K") != 1
+        or any(letter not in LETTERS for letter in white + black)
+    ):
+        raise ValueError("bad material signature %r" % name)
+    return sortLetters(white), sortLetters(black)
+
+
+def _strength(letters: str) -> "tuple[int, int, str]":
+    value = sum(PIECE_VALUES[LETTER_KINDS[letter]] for letter in letters)
+    return len(letters), value, letters
+
+
+def isFlipped(white: str, black: str) -> bool:
+    """Whether the table of this material has black's pieces as white."""
+    return _strength(black) > _strength(white)
+
+
+def canonicalName(white: str, black: str) -> str:
+    white, black = sortLetters(white), sortLetters(black)
+    if isFlipped(white, black):
+        white, black = black, white
+    return white + "v" + black
+
+
+def decodeValue(code: int) -> "tuple[int, int]|None":
+    """(1 win, 0 draw or -1 loss for the side to move, plies to mate)."""
+    if code == INVALID:
+        return None
+    if code == DRAW:
+        return 0, 0
+    plies = code - 1
+    return (1 if plies & 1 else -1), plies
+
+
+class Tablebase:
+    """Probes the table files in a directory, mapping each when first needed."""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.tables: "dict[str, tuple[Signature, mmap.mmap]|None]" = {}
+        # (white letters, black letters) to the table and whether it is flipped
+        self.lookups: "dict[tuple[str, str], tuple[Signature, mmap.mmap, bool]|None]" = (
+            {}
+        )
+        self.maxPieces = 0
+        if os.path.isdir(directory):
+            for fileName in os.listdir(directory):
+                if fileName.endswith(".tb"):
+                    self.maxPieces = max(self.maxPieces, len(fileName) - 4)
+
+    def __getstate__(self) -> dict:
+        # worker processes map the files again rather than copy them
+        return {"directory": self.directory}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["directory"])
+
+    def close(self) -> None:
+        for table in self.tables.values():
+            if table != None:
+                table[1].close()
+        self.tables.clear()
+        self.lookups.clear()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name + ".tb")
+
+    def table(self, name: str) -> "tuple[Signature, mmap.mmap]|None":
+        if name in self.tables:
+            return self.tables[name]
+        table = None
+        if os.path.exists(self.path(name)):
+            with open(self.path(name), "rb") as stream:
+                data = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+            signature = Signature(name)
+            if data[: len(MAGIC)] != MAGIC or len(data) != HEADER_SIZE + signature.size:
+                data.close()
+                raise ValueError("%s is not a %s table" % (self.path(name), name))
+            table = (signature, data)
+        self.tables[name] = table
+        return table
+
+    def lookup(
+        self, white: str, black: str
+    ) -> "tuple[Signature, mmap.mmap, bool]|None":
+        """(signature, data, colors swapped) of the table holding this material."""
+        key = (white, black)
+        if key not in self.lookups:
+            flipped = isFlipped(white, black)
+            table = self.table(black + "v" + white if flipped else white + "v" + black)
+            self.lookups[key] = None if table == None else (*table, flipped)
+        return self.lookups[key]
+
+    def probeSquares(
+        self,
+        white: str,
+        whiteSquares: "list[int]",
+        black: str,
+        blackSquares: "list[int]",
+        stm: int,
+    ) -> "int|None":
+        """Stored byte for pieces given as letters and squares in LETTERS order."""
+        found = self.lookup(white, black)
+        if found == None:
+            return None
+        signature, data, flipped = found
+        if flipped:
+            # black plays white's part, mirrored top to bottom
+            squares = [sq ^ 56 for sq in blackSquares + whiteSquares]
+            stm = 1 - stm
+        else:
+            squares = whiteSquares + blackSquares
+        return data[HEADER_SIZE + signature.index(squares, stm)]
+
+    def probeCode(self, pieces: "list[tuple[int, int, int]]", stm: int) -> "int|None":
+        """Stored byte for (color value, kind, square) pieces, None without a table."""
+        pieces = sorted(pieces, key=lambda piece: KIND_ORDER[piece[1]])
+        letters = ["", ""]
+        squares: "list[list[int]]" = [[], []]
+        for color, kind, sq in pieces:
+            letters[color] += KIND_LETTERS[kind]
+            squares[color].append(sq)
+        return self.probeSquares(letters[1], squares[1], letters[0], squares[0], stm)
+
+    def probe(self, board: "Board") -> "tuple[int, int]|None":
+        """(wdl, plies to mate) for the side to move, None when not covered.
+
+        wdl is 1 for a win, 0 for a draw and -1 for a loss.
+        """
+        if board.castlingRights:
+            return None
+        if popcount(board.occupancy()) > self.maxPieces:
+            return None
+        stm = board.turn.value
+        bitboards = board.bitboards
+        ep = board.epSquare
+        if ep >= 0 and PAWN_ATTACKS[1 - stm][ep] & bitboards[stm * 6 + PAWN]:
+            return None
+        letters = ["", ""]
+        squares: "list[list[int]]" = [[], []]
+        for color in (0, 1):
+            for kind in (KING, QUEEN, ROOK, BISHOP, KNIGHT, PAWN):
+                bb = bitboards[color * 6 + kind]
+                while bb:
+                    low = bb & -bb
+                    bb ^= low
+                    letters[color] += KIND_LETTERS[kind]
+                    squares[color].append(low.bit_length() - 1)
+        code = self.probeSquares(letters[1], squares[1], letters[0], squares[0], stm)
+        return None if code == None else decodeValue(code)
+
+    def bestMove(self, board: "Board") -> int:
+        """The move keeping the best table result, 0 when the position is not covered.
+
+        Wins take the fastest mate, losses the slowest.
+        """
+        if self.probe(board) == None:
+            return 0
+        best, bestScore = 0, None
+        for move in board.generateMoves():
+            board.pushMove(move)
+            result = self.probe(board)
+            board.unmakeMove()
+            if result == None:
+                return 0
+            wdl, plies = result
+            # the child is scored for the opponent
+            score = (-wdl, plies if wdl > 0 else -plies)
+            if bestScore == None or score > bestScore:
+                best, bestScore = move, score
+        return best
+
+
+def _expand(
+    name: str, directory: str, start: int, stop: int
+) -> "tuple[bytearray, array, array]":
+    """Move lists of the positions start..stop of a table.
+
+    Returns statuses, offsets into the successor array and the successors:
+    an index in the same table, or `-(code + 1)` for a capture or promotion
+    scored by the table it lands in.
+    """
+    signature = Signature(name)
+    tablebase = Tablebase(directory)
+    board = Board()
+    pieces = [
+        PIECE_CLASSES[kind](0, 0, Color(color)) for color, kind in signature.pieces
+    ]
+    # table positions have no castling rights
+    for piece in pieces:
+        piece.hasMoved = True
+    kings = [signature.pieces.index((color, KING)) for color in (0, 1)]
+    placed: "list[int]" = [-1] * len(pieces)
+    statuses = bytearray(stop - start)
+    offsets = array("q", [0])
+    successors = array("i")
+    for index in range(start, stop):
+        squares, stm = signature.decode(index)
+        if len(set(squares)) < len(squares) or any(
+            kind == PAWN and squares[i] >> 3 in (0, 7)
+            for i, (_, kind) in enumerate(signature.pieces)
+        ):
+            statuses[index - start] = ILLEGAL
+            offsets.append(len(successors))
+            continue
+        for i, sq in enumerate(placed):
+            if (
+                sq >= 0
+                and sq != squares[i]
+                and board.board[sq >> 3][sq & 7] is pieces[i]
+            ):
+                board.removePiece(SQUARES[sq])
+        for i, sq in enumerate(squares):
+            if placed[i] != sq or board.board[sq >> 3][sq & 7] is not pieces[i]:
+                pieces[i].pos = SQUARES[sq]
+                board.setPiece(pieces[i], SQUARES[sq])
+        placed = squares
+        color = Color(stm)
+        occ = board.occupancy()
+        if board.attackedBy(squares[kings[1 - stm]], color, occ):
+            # the side that just moved is in check
+            statuses[index - start] = ILLEGAL
+            offsets.append(len(successors))
+            continue
+        moves = board.generateMoves(color)
+        if not moves:
+            inCheck = board.attackedBy(squares[kings[stm]], color.GetOpp(), occ)
+            statuses[index - start] = MATED if inCheck else STALEMATE
+        for move in moves:
+            src, dest, promotion = moveSrc(move), moveDest(move), movePromotion(move)
+            mover = squares.index(src)
+            if dest in squares or promotion:
+                after = [
+                    (
+                        c,
+                        promotion if i == mover and promotion else k,
+                        dest if i == mover else squares[i],
+                    )
+                    for i, (c, k) in enumerate(signature.pieces)
+                    if squares[i] != dest
+                ]
+                code = tablebase.probeCode(after, 1 - stm)
+                if code == None or code == INVALID:
+                    raise FileNotFoundError("a table needed by %s is missing" % name)
+                successors.append(-(code + 1))
+            else:
+                after = list(squares)
+                after[mover] = dest
+                successors.append(signature.index(after, 1 - stm))
+        offsets.append(len(successors))
+    tablebase.close()
+    return statuses, offsets, successors
+
+
+def _solve(size: int, chunks: "list[tuple[int, bytearray, array, array]]") -> bytearray:
+    """Retrograde pass: resolve positions in order of their distance to mate."""
+    values = bytearray(size)
+    remaining = array("H", bytes(2 * size))
+    predecessorCounts = array("q", bytes(8 * (size + 1)))
+    levels: "list[list[int]]" = [[] for _ in range(MAX_PLIES + 1)]
+    # results of captures and promotions, (parent, child wins) by child distance
+    outside: "list[list[tuple[int, bool]]]" = [[] for _ in range(MAX_PLIES + 1)]
+    for start, statuses, offsets, successors in chunks:
+        for i, status in enumerate(statuses):
+            index = start + i
+            if status == ILLEGAL:
+                values[index] = INVALID
+            elif status == MATED:
+                values[index] = 1
+                levels[0].append(index)
+            remaining[index] = offsets[i + 1] - offsets[i]
+            for j in range(offsets[i], offsets[i + 1]):
+                child = successors[j]
+                if child >= 0:
+                    predecessorCounts[child + 1] += 1
+                elif child != -1:
+                    plies = -child - 2
+                    outside[plies].append((index, bool(plies & 1)))
+    for index in range(size):
+        predecessorCounts[index + 1] += predecessorCounts[index]
+    predecessors = array("i", bytes(4 * predecessorCounts[size]))
+    filled = array("q", predecessorCounts)
+    for start, statuses, offsets, successors in chunks:
+        for i in range(len(statuses)):
+            for j in range(offsets[i], offsets[i + 1]):
+                child = successors[j]
+                if child >= 0:
+                    predecessors[filled[child]] = start + i
+                    filled[child] += 1
+
+    def resolve(parent: int, childWins: bool, plies: int) -> None:
+        if values[parent]:
+            return
+        if not childWins:
+            values[parent] = plies + 2
+            levels[plies + 1].append(parent)
+            return
+        remaining[parent] -= 1
+        if remaining[parent] == 0:
+            values[parent] = plies + 2
+            levels[plies + 1].append(parent)
+
+    for plies in range(MAX_PLIES):
+        childWins = bool(plies & 1)
+        for parent, wins in outside[plies]:
+            resolve(parent, wins, plies)
+        for child in levels[plies]:
+            for j in range(predecessorCounts[child], predecessorCounts[child + 1]):
+                resolve(predecessors[j], childWins, plies)
+    if levels[MAX_PLIES]:
+        raise ValueError("mate distances do not fit in a byte")
+    return values
+
+
+def generate(
+    name: str,
+    directory: str,
+    workers: int = 1,
+    log: "Callable[[str], None]|None" = None,
+) -> str:
+    """Build the table of a signature and the ones it depends on, returns its path.
+
+    Tables already in `directory` are reused. Move generation is split over
+    `workers` processes, the retrograde pass runs in this one.
+    """
+    white, black = splitName(name)
+    signature = Signature(canonicalName(white, black))
+    tablebase = Tablebase(directory)
+    path = tablebase.path(signature.name)
+    if os.path.exists(path):
+        return path
+    os.makedirs(directory, exist_ok=True)
+    for dependency in signature.successors():
+        generate(dependency, directory, workers, log)
+
+    step = max(1, -(-signature.size // (workers * 8)))
+    bounds = [
+        (start, min(start + step, signature.size))
+        for start in range(0, signature.size, step)
+    ]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_expand, signature.name, directory, start, stop)
+                for start, stop in bounds
+            ]
+            expanded = [future.result() for future in futures]
+    else:
+        expanded = [
+            _expand(signature.name, directory, start, stop) for start, stop in bounds
+        ]
+    chunks = [(start, *result) for (start, _), result in zip(bounds, expanded)]
+    values = _solve(signature.size, chunks)
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as out:
+        out.write(
+            MAGIC + signature.name.encode().ljust(HEADER_SIZE - len(MAGIC), b"\0")
+        )
+        out.write(values)
+    os.replace(tmp, path)
+    if log != None:
+        log("%s: %d positions" % (signature.name, signature.size))
+    return path
@@ -1,5 +1,4 @@
 from enum import Enum
-from dataclasses import dataclass
 
 UNICODE_PIECE_SYMBOLS = {
     "bR": "♖",
@@ -27,15 +26,66 @@ class Color(Enum):
         return Color.BLACK
 
 
-@dataclass
+class GameStatus(Enum):
+    """State of a position for the side to move, see Board.gameStatus."""
+
+    ONGOING = "ongoing"
+    CHECKMATE = "checkmate"
+    STALEMATE = "stalemate"
+    THREEFOLD = "threefold repetition"
+    FIFTY_MOVES = "fifty moves"
+    INSUFFICIENT_MATERIAL = "insufficient material"
+
+
 class Pos:
+    """Immutable board coordinates, X is the file and Y the row from the top.
+
+    The 64 on-board positions are built once, `Pos(x, y)` hands back the
+    shared instance, so positions can be compared with `is`, hashed and
+    created in the move generator without allocating.
+    """
+
+    __slots__ = ("X", "Y")
     X: int
     Y: int
 
+    def __new__(cls, X: int, Y: int) -> "Pos":
+        if 0 <= X < 8 and 0 <= Y < 8:
+            return SQUARES[Y * 8 + X]
+        return _newPos(X, Y)
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError("Pos is immutable")
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Pos):
+            return NotImplemented
+        return self.X == other.X and self.Y == other.Y
+
+    def __hash__(self) -> int:
+        return self.Y * 8 + self.X
+
+    def __repr__(self) -> str:
+        return "Pos(X=%d, Y=%d)" % (self.X, self.Y)
+
+    def __reduce__(self):
+        return Pos, (self.X, self.Y)
+
     def move(self, x, y) -> "Pos":
         return Pos(self.X + x, self.Y + y)
 
 
+def _newPos(X: int, Y: int) -> "Pos":
+    pos = object.__new__(Pos)
+    object.__setattr__(pos, "X", X)
+    object.__setattr__(pos, "Y", Y)
+    return pos
+
+
+# the shared on-board positions, indexed by square `Y * 8 + X`
+SQUARES: "list[Pos]" = [_newPos(sq & 7, sq >> 3) for sq in range(64)]
+
+
 CharToInt = {"a": 0, "b": 1, "c": 2, "d": 3, "e": 4, "f": 5, "g": 6, "h": 7}
 IntToChar = {0: "a", 1: "b", 2: "c", 3: "d", 4: "e", 5: "f", 6: "g", 7: "h"}
 
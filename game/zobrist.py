@@ -0,0 +1,37 @@
+"""Zobrist keys for hashing board positions.
+
+The keys come from a fixed seed so a position hashes to the same value in
+every process, which lets keys be stored on disk or sent between workers.
+"""
+from random import Random
+
+_rng = Random(0x5EED)
+
+
+def _key() -> int:
+    return _rng.getrandbits(64)
+
+
+# PIECE_KEYS[color.value * 6 + kind][square]
+PIECE_KEYS = [[_key() for _ in range(64)] for _ in range(12)]
+# xored in when black is to move
+BLACK_TO_MOVE = _key()
+# indexed by the 4 bit castling rights mask
+CASTLING_KEYS = [_key() for _ in range(16)]
+# indexed by the file of a capturable en passant square
+EP_KEYS = [_key() for _ in range(8)]
+
+# castling rights bits
+WHITE_KINGSIDE = 1
+WHITE_QUEENSIDE = 2
+BLACK_KINGSIDE = 4
+BLACK_QUEENSIDE = 8
+
+# rights that survive a move from or to each square, squares are Y * 8 + X
+CASTLING_MASKS = [15] * 64
+CASTLING_MASKS[0] = 15 & ~BLACK_QUEENSIDE
+CASTLING_MASKS[4] = 15 & ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)
+CASTLING_MASKS[7] = 15 & ~BLACK_KINGSIDE
+CASTLING_MASKS[56] = 15 & ~WHITE_QUEENSIDE
+CASTLING_MASKS[60] = 15 & ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)
+CASTLING_MASKS[63] = 15 & ~WHITE_KINGSIDE
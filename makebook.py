@@ -0,0 +1,48 @@
+"""Build an opening book file from PGN games.
+
+    python3 makebook.py games.pgn more.pgn -o book.bin --max-plies 16
+    python3 selfplay.py search random --book book.bin
+
+Every game adds its first plies to the book, weighted by how often each
+move was played from a position. Games with a move that is not legal SAN
+are counted up to that move and reported as skipped.
+"""
+import argparse
+import sys
+import time
+
+from game.book import BookBuilder
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("pgn", nargs="+", help="PGN files to read")
+    parser.add_argument("-o", "--output", default="book.bin")
+    parser.add_argument("--max-plies", type=int, default=20)
+    parser.add_argument(
+        "--min-count", type=int, default=1, help="drop moves played fewer times"
+    )
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    builder = BookBuilder(args.max_plies)
+    skipped = 0
+    for path in args.pgn:
+        skipped += builder.addPGN(path)[1]
+    entries = builder.write(args.output, args.min_count)
+    print(
+        "%d games (%d skipped), %d entries written to %s in %.2fs"
+        % (
+            builder.games,
+            skipped,
+            entries,
+            args.output,
+            time.perf_counter() - start,
+        ),
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+"""Generate endgame tables by retrograde analysis.
+
+    python3 maketablebase.py KQvK KRvK KPvK -d tables
+    python3 maketablebase.py KRvKP KQvKR -d tables -w 8
+    python3 selfplay.py search random --tablebase tables
+
+Tables a signature reaches through captures and promotions are generated
+first and existing tables are reused. Move generation runs in WORKERS
+processes. A 3 piece table takes seconds; a 4 piece one holds 5 to 17
+million positions, KQvKR takes about ten minutes in a single process and
+under 1 GB of memory.
+"""
+import argparse
+import os
+import sys
+import time
+
+from game.tablebase import generate
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("signatures", nargs="+", help="material such as KRvKP")
+    parser.add_argument("-d", "--directory", default="tables")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+
+    def log(message: str) -> None:
+        print("%7.1fs %s" % (time.perf_counter() - start, message), file=sys.stderr)
+
+    for name in args.signatures:
+        try:
+            generate(name, args.directory, args.workers, log)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""Replay PGN game archives through the move validator.
+
+    python3 pgncheck.py games.pgn
+    python3 pgncheck.py archive.pgn.gz more.pgn --limit 100000 --progress 10000
+
+Games are read and replayed one at a time with Game.applySAN and then
+dropped, so memory stays flat however large the archive. Every game with
+an illegal move is reported with its number and the move, and the totals
+end with the games per second.
+"""
+import argparse
+import sys
+import time
+
+from game.game import replayPGN
+from game.pgn import openPGN, readGames
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("pgn", nargs="+", help="PGN files, optionally gzip compressed")
+    parser.add_argument("--limit", type=int, help="stop after this many games")
+    parser.add_argument(
+        "--progress", type=int, default=0, help="report every N games, 0 for never"
+    )
+    args = parser.parse_args()
+
+    games = moves = bad = 0
+    start = time.perf_counter()
+    for path in args.pgn:
+        if args.limit != None and games >= args.limit:
+            break
+        with openPGN(path) as stream:
+            for pgnGame in readGames(stream):
+                if args.limit != None and games >= args.limit:
+                    break
+                games += 1
+                try:
+                    game, failed = replayPGN(pgnGame)
+                except ValueError as e:
+                    # a FEN tag that does not parse
+                    bad += 1
+                    print("%s game %d: %s" % (path, games, e), file=sys.stderr)
+                    continue
+                moves += len(game.history)
+                if failed != None:
+                    bad += 1
+                    print(
+                        "%s game %d: move %d %s: %s"
+                        % (
+                            path,
+                            games,
+                            len(game.history) + 1,
+                            failed.move,
+                            failed.error,
+                        ),
+                        file=sys.stderr,
+                    )
+                if args.progress and games % args.progress == 0:
+                    elapsed = time.perf_counter() - start
+                    print(
+                        "%d games, %.0f games/s" % (games, games / elapsed),
+                        file=sys.stderr,
+                    )
+    elapsed = time.perf_counter() - start
+    print(
+        "%d games, %d moves, %d with errors in %.2fs: %.1f games/s, %.0f moves/s"
+        % (games, moves, bad, elapsed, games / elapsed, moves / elapsed)
+    )
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
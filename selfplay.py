@@ -0,0 +1,182 @@
+"""Headless bot-vs-bot matches.
+
+    python3 selfplay.py random search -n 20 -o results.jsonl
+    python3 selfplay.py search parallel -n 4 --movetime 0.5 --workers 2
+    python3 selfplay.py search search -n 10 --book book.bin --tablebase tables
+
+Games run in a process pool without rendering or input. Each finished game
+is written as one JSON line with the result, the moves in UCI notation and
+every move's think time. Colours alternate between games. With `--book`
+both bots play from an opening book built by makebook.py while it has the
+position, and with `--tablebase` the search bots play endgames covered by
+the tables from maketablebase.py perfectly.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+from game.board import Board
+from game.book import Book
+from game.tablebase import Tablebase
+from game.moves import moveFromUCI
+from game.utils import Color, GameStatus
+from bots.bot import Bot
+from bots.randomBot import RandomBot
+from bots.searchBot import SearchBot
+from bots.parallelSearchBot import ParallelSearchBot
+
+BOTS = {
+    "random": lambda movetime, book, tablebase: RandomBot(delay=0, book=book),
+    "search": lambda movetime, book, tablebase: SearchBot(
+        timeLimit=movetime, book=book, tablebase=tablebase
+    ),
+    "parallel": lambda movetime, book, tablebase: ParallelSearchBot(
+        workers=2, timeLimit=movetime, book=book, tablebase=tablebase
+    ),
+}
+
+
+def createBot(
+    name: str,
+    movetime: float,
+    book: "Book|None" = None,
+    tablebase: "Tablebase|None" = None,
+) -> "Bot":
+    if name not in BOTS:
+        raise ValueError("unknown bot %r, choose from %s" % (name, ", ".join(BOTS)))
+    return BOTS[name](movetime, book, tablebase)
+
+
+def playGame(
+    game: int,
+    white: str,
+    black: str,
+    movetime: float,
+    maxPlies: int,
+    seed: int,
+    bookPath: "str|None" = None,
+    tablebaseDir: "str|None" = None,
+) -> dict:
+    random.seed(seed + game)
+    # books and tables are mapped, every worker process shares their pages
+    book = Book(bookPath) if bookPath else None
+    tablebase = Tablebase(tablebaseDir) if tablebaseDir else None
+    bots = {
+        Color.WHITE: createBot(white, movetime, book, tablebase),
+        Color.BLACK: createBot(black, movetime, book, tablebase),
+    }
+    board = Board()
+    board.resetBoard()
+    color = Color.WHITE
+    moves: "list[str]" = []
+    thinkTime: "dict[str, list[float]]" = {"white": [], "black": []}
+    result, reason = "1/2-1/2", "move limit"
+
+    while len(moves) < maxPlies:
+        bot = bots[color]
+        start = time.perf_counter()
+        uci = bot.giveUCIMove(board)
+        elapsed = time.perf_counter() - start
+        thinkTime["white" if color == Color.WHITE else "black"].append(
+            round(elapsed, 4)
+        )
+
+        move = moveFromUCI(uci)
+        if move == None or move not in board.generateMoves(color):
+            # a bot that can't produce a legal move forfeits
+            result = "0-1" if color == Color.WHITE else "1-0"
+            reason = "illegal move"
+            break
+        board.pushMove(move)
+        moves.append(uci)
+        status = board.gameStatus()
+        if status != GameStatus.ONGOING:
+            # bots never claim draws, a repetition or fifty moves ends it here
+            if status == GameStatus.CHECKMATE:
+                result = "1-0" if color == Color.WHITE else "0-1"
+            reason = status.value
+            break
+        color = color.GetOpp()
+
+    for bot in bots.values():
+        if isinstance(bot, ParallelSearchBot):
+            bot.close()
+    if book != None:
+        book.close()
+    if tablebase != None:
+        tablebase.close()
+    return {
+        "game": game,
+        "white": white,
+        "black": black,
+        "result": result,
+        "reason": reason,
+        "plies": len(moves),
+        "moves": moves,
+        "thinkTime": thinkTime,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("bot1", choices=list(BOTS))
+    parser.add_argument("bot2", choices=list(BOTS))
+    parser.add_argument("-n", "--games", type=int, default=10)
+    parser.add_argument("-o", "--output", help="JSONL file, stdout by default")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--movetime", type=float, default=0.1, help="seconds per move")
+    parser.add_argument("--max-plies", type=int, default=400)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--book", help="opening book file from makebook.py")
+    parser.add_argument("--tablebase", help="endgame table directory")
+    args = parser.parse_args()
+
+    out = open(args.output, "w") if args.output else sys.stdout
+    # points for bot1: win, draw, loss
+    score = [0, 0, 0]
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = []
+        for game in range(args.games):
+            white, black = (
+                (args.bot1, args.bot2) if game % 2 == 0 else (args.bot2, args.bot1)
+            )
+            futures.append(
+                pool.submit(
+                    playGame,
+                    game,
+                    white,
+                    black,
+                    args.movetime,
+                    args.max_plies,
+                    args.seed,
+                    args.book,
+                    args.tablebase,
+                )
+            )
+        for future in as_completed(futures):
+            record = future.result()
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            # bot1 has white in the even games
+            bot1White = record["game"] % 2 == 0
+            if record["result"] == "1/2-1/2":
+                score[1] += 1
+            elif (record["result"] == "1-0") == bot1White:
+                score[0] += 1
+            else:
+                score[2] += 1
+    if args.output:
+        out.close()
+    print(
+        "%s vs %s: +%d =%d -%d" % (args.bot1, args.bot2, score[0], score[1], score[2]),
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
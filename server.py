@@ -0,0 +1,280 @@
+"""Asyncio game server speaking JSON lines over TCP.
+
+    python3 server.py --port 8765 --bot-workers 4 --book book.bin --tablebase tables
+
+Every request is one JSON object on its own line and gets exactly one JSON
+line back carrying the same "id". Requests are answered as they finish, not
+necessarily in the order they were sent. Many games can be open on one
+connection and games are closed when their connection goes away.
+
+    {"id": 1, "op": "new"}                            new game, both sides played by the client
+    {"id": 2, "op": "new", "bot": "random", "color": "black", "fen": "..."}
+    {"id": 3, "op": "move", "game": 1, "move": "e2e4"}
+    {"id": 4, "op": "legal", "game": 1}
+    {"id": 5, "op": "fen", "game": 1}
+    {"id": 6, "op": "close", "game": 1}
+
+Add "legal": true to "new" or "move" to get the legal moves of the side to
+move in the answer. When a game has a bot opponent its reply is played
+right after the client's move and returned under "reply". Bots think in a
+pool of worker processes, so a search never holds the interpreter the
+event loop serves the other games from. Workers get the position as FEN,
+without the moves that led to it, so bots don't see repetitions, and each
+keeps one bot of every kind for all the games it is sent. All bots
+share one opening book when `--book` is given, and the search bots one set
+of endgame tables with `--tablebase`.
+"""
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import asdict
+from itertools import count
+import argparse
+import asyncio
+import json
+import multiprocessing
+import sys
+
+from game.board import Board
+from game.game import Game, MoveResult
+from game.book import Book
+from game.tablebase import Tablebase
+from game.utils import Color
+from bots.bot import Bot
+from bots.randomBot import RandomBot
+from bots.searchBot import SearchBot
+
+BOTS = {
+    "random": lambda movetime, book, tablebase: RandomBot(delay=0, book=book),
+    "search": lambda movetime, book, tablebase: SearchBot(
+        timeLimit=movetime, book=book, tablebase=tablebase
+    ),
+}
+
+# (movetime, book, tablebase) and the bots made from them in a worker process
+_config: "tuple[float, Book|None, Tablebase|None]" = (0.1, None, None)
+_bots: "dict[str, Bot]" = {}
+
+
+def _initWorker(
+    movetime: float, book: "Book|None", tablebase: "Tablebase|None"
+) -> None:
+    global _config
+    _config = (movetime, book, tablebase)
+    _bots.clear()
+
+
+def _botMove(botName: str, fen: str) -> str:
+    """A bot's move in UCI notation for a position sent as FEN."""
+    bot = _bots.get(botName)
+    if bot == None:
+        bot = _bots[botName] = BOTS[botName](*_config)
+    return bot.giveUCIMove(Board.fromFEN(fen))
+
+
+def createExecutor(
+    workers: int,
+    movetime: float = 0.1,
+    book: "Book|None" = None,
+    tablebase: "Tablebase|None" = None,
+) -> "ProcessPoolExecutor":
+    """Worker processes for the bots of a GameServer."""
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        # workers start on the first bot move, a forked one would inherit the
+        # sockets of the connections open by then and keep them from closing
+        mp_context=multiprocessing.get_context("forkserver"),
+        initializer=_initWorker,
+        initargs=(movetime, book, tablebase),
+    )
+
+
+class ServerGame:
+    def __init__(self, game: "Game", bot: "str|None", botColor: "Color") -> None:
+        self.game = game
+        # name in BOTS of the opponent, None when the client plays both sides
+        self.bot = bot
+        self.botColor = botColor
+        # held while a request works on the game, a bot's move included
+        self.lock = asyncio.Lock()
+
+
+class GameServer:
+    def __init__(self, executor: "Executor") -> None:
+        # runs _botMove, see createExecutor
+        self.executor = executor
+        self.games: "dict[int, ServerGame]" = {}
+        self.ids = count(1)
+        self.moves = 0
+
+    async def handle(
+        self, reader: "asyncio.StreamReader", writer: "asyncio.StreamWriter"
+    ) -> None:
+        owned: "set[int]" = set()
+        # requests run concurrently, so a thinking bot does not hold up the
+        # other games of the connection, and answers may come out of order
+        pending: "set[asyncio.Task]" = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(self.respond(line, owned, writer))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            for task in list(pending):
+                task.cancel()
+            for gameId in owned:
+                self.games.pop(gameId, None)
+            writer.close()
+
+    async def respond(
+        self, line: bytes, owned: "set[int]", writer: "asyncio.StreamWriter"
+    ) -> None:
+        response = await self.request(line, owned)
+        writer.write(json.dumps(response).encode() + b"\n")
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def request(self, line: bytes, owned: "set[int]") -> dict:
+        try:
+            message = json.loads(line)
+        except ValueError:
+            return {"id": None, "ok": False, "error": "invalid json"}
+        if not isinstance(message, dict):
+            return {"id": None, "ok": False, "error": "expected a json object"}
+        requestId = message.get("id")
+        try:
+            response = await self.dispatch(message, owned)
+        except ValueError as e:
+            response = {"ok": False, "error": str(e)}
+        response["id"] = requestId
+        return response
+
+    async def dispatch(self, message: dict, owned: "set[int]") -> dict:
+        op = message.get("op")
+        if op == "new":
+            return await self.newGame(message, owned)
+        gameId = message.get("game")
+        if not isinstance(gameId, int):
+            raise ValueError("game must be an integer")
+        if gameId not in owned:
+            raise ValueError("unknown game")
+        serverGame = self.games[gameId]
+        if op == "move":
+            return await self.move(serverGame, message)
+        if op == "legal":
+            async with serverGame.lock:
+                return {"ok": True, "legal": serverGame.game.legalMoves()}
+        if op == "fen":
+            async with serverGame.lock:
+                return {"ok": True, "fen": serverGame.game.fen()}
+        if op == "close":
+            # not while a bot move of the game is still on its way
+            async with serverGame.lock:
+                owned.discard(gameId)
+                self.games.pop(gameId, None)
+            return {"ok": True}
+        raise ValueError("unknown op %r" % op)
+
+    async def newGame(self, message: dict, owned: "set[int]") -> dict:
+        botName = message.get("bot")
+        if botName != None and not isinstance(botName, str):
+            raise ValueError("bot must be a string")
+        if botName != None and botName not in BOTS:
+            raise ValueError(
+                "unknown bot %r, choose from %s" % (botName, ", ".join(BOTS))
+            )
+        color = message.get("color", "black")
+        if color not in ("white", "black"):
+            raise ValueError("color must be 'white' or 'black'")
+        fen = message.get("fen")
+        if fen != None and not isinstance(fen, str):
+            raise ValueError("fen must be a string")
+        # Board.fromFEN raises ValueError on a bad FEN
+        game = Game(fen)
+        serverGame = ServerGame(
+            game, botName, Color.WHITE if color == "white" else Color.BLACK
+        )
+        gameId = next(self.ids)
+        self.games[gameId] = serverGame
+        owned.add(gameId)
+        response: dict = {"ok": True, "game": gameId}
+        async with serverGame.lock:
+            if botName != None and game.turn == serverGame.botColor:
+                response["reply"] = asdict(await self.playBot(serverGame))
+        return self.finish(serverGame, message, response)
+
+    async def move(self, serverGame: "ServerGame", message: dict) -> dict:
+        uci = message.get("move")
+        if not isinstance(uci, str):
+            raise ValueError("move must be a string")
+        game = serverGame.game
+        async with serverGame.lock:
+            if serverGame.bot != None and game.turn == serverGame.botColor:
+                raise ValueError("not your turn")
+            result = game.applyMove(uci)
+            response: dict = {"ok": result.legal}
+            response.update(asdict(result))
+            if result.legal:
+                self.moves += 1
+                if serverGame.bot != None and not game.over:
+                    response["reply"] = asdict(await self.playBot(serverGame))
+        return self.finish(serverGame, message, response)
+
+    async def playBot(self, serverGame: "ServerGame") -> "MoveResult":
+        loop = asyncio.get_running_loop()
+        uci = await loop.run_in_executor(
+            self.executor, _botMove, serverGame.bot, serverGame.game.fen()
+        )
+        result = serverGame.game.applyMove(uci)
+        if result.legal:
+            self.moves += 1
+        return result
+
+    def finish(self, serverGame: "ServerGame", message: dict, response: dict) -> dict:
+        game = serverGame.game
+        response["turn"] = "white" if game.turn == Color.WHITE else "black"
+        response["over"] = game.over
+        if message.get("legal"):
+            response["legal"] = game.legalMoves()
+        return response
+
+
+async def serve(host: str, port: int, server: "GameServer") -> None:
+    tcp = await asyncio.start_server(server.handle, host, port)
+    print("serving on %s:%d" % (host, port), file=sys.stderr)
+    async with tcp:
+        await tcp.serve_forever()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--bot-workers", type=int, default=4)
+    parser.add_argument(
+        "--movetime", type=float, default=0.1, help="seconds per bot move"
+    )
+    parser.add_argument("--book", help="opening book file from makebook.py")
+    parser.add_argument("--tablebase", help="endgame table directory")
+    args = parser.parse_args()
+
+    book = Book(args.book) if args.book else None
+    tablebase = Tablebase(args.tablebase) if args.tablebase else None
+    with createExecutor(args.bot_workers, args.movetime, book, tablebase) as executor:
+        server = GameServer(executor)
+        try:
+            asyncio.run(serve(args.host, args.port, server))
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
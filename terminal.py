@@ -1,4 +1,6 @@
 from game.board import Board
+from game.instrument import Instrumentation
+from game.render import Screen, BoardView, LogView, moveTo, CLEAR_LINE
 from game.utils import (
     posFromEncoding,
     endcodingFromPos,
@@ -6,6 +8,7 @@ from game.utils import (
     Color,
 )
 from bots.randomBot import RandomBot
+from bots.searchBot import SearchBot
 import sys
 
 HELP_MESSAGE = """Commands to use game
@@ -20,26 +23,19 @@ HELP_MESSAGE = """Commands to use game
   > q             - quit"""
 
 
-class Logs:
-    def __init__(self) -> None:
-        self.logs = []
-        self.limit = 16
-
-    def add(self, msg: "str"):
-        self.logs = self.logs + msg.split("\n")
-        if len(self.logs) > 16:
-            self.logs = self.logs[-16:]
-
-    def lgs(self):
-        return self.logs
-
-
 bot = RandomBot()
 withBot = True
 
 board = Board()
 turn = "w"
-logs = Logs()
+# the board at the top left, the last 16 log lines level with its bottom
+screen = Screen()
+boardView = BoardView(0, 0)
+logs = LogView(2, 48, 16)
+PROMPT_ROW = boardView.height
+# per move call counts and timings, set by -s
+profiler: "Instrumentation|None" = None
+statsShown = 0
 
 
 def log(msg: str):
@@ -47,15 +43,29 @@ def log(msg: str):
     logs.add(msg)
 
 
-def mergeMessages(boardStr: "str", logs: "list[str]"):
-    newMsg = boardStr.split("\n")
-    n = len(newMsg)
-    for i in range(n - 1, -1, -1):
-        try:
-            newMsg[i] += "\t" + logs[i - n]
-        except:
-            break
-    return "\n".join(newMsg)
+def draw(status: str):
+    """Bring the screen up to date and leave the cursor after the prompt."""
+    screen.write(
+        boardView.update(board)
+        + logs.update()
+        + moveTo(PROMPT_ROW, 0)
+        + status
+        + CLEAR_LINE
+        + moveTo(PROMPT_ROW + 2, 0)
+        + CLEAR_LINE
+        + moveTo(PROMPT_ROW + 1, 0)
+        + "> "
+        + CLEAR_LINE
+    )
+
+
+def logStats():
+    global statsShown
+    if profiler == None:
+        return
+    for record in profiler.moves[statsShown:]:
+        log("\033[90m" + profiler.moveSummary(record, 3) + "\033[0m")
+    statsShown = len(profiler.moves)
 
 
 def getInput(message: "str") -> "str":
@@ -92,6 +102,7 @@ def makeMove(inps, inputCallback=getInput):
         + inps[2]
         + "\033[0m"
     )
+    logStats()
     turn = "b" if turn == "w" else "w"
     return kingDied
 
@@ -121,11 +132,9 @@ def help():
 
 def loop():
     while True:
-        print("\033[2J" + "\033[H", end="")
-        print(mergeMessages(str(board), logs.lgs()))
-        print(("White" if turn == "w" else "Black") + "'s turn\n> ", end="")
+        draw(("White" if turn == "w" else "Black") + "'s turn")
         if withBot and turn == "b":
-            print("Bot thinking...")
+            screen.write(moveTo(PROMPT_ROW + 2, 0) + "Bot thinking...")
             Frm, To = bot.giveMove(board, Color.BLACK)
             frm, to = endcodingFromPos(Frm), endcodingFromPos(To)
             inp = "b " + frm + " " + to
@@ -158,13 +167,14 @@ def loop():
         elif inps[0] == "q" or inps[0] == "Q":
             log("\033[93mquiting game" + "\033[0m")
             break
-    print("\033[2J" + "\033[H" + mergeMessages(str(board), logs.lgs()))
+    draw("")
+    screen.write(moveTo(PROMPT_ROW + 1, 0) + CLEAR_LINE + "\n")
 
 
 def main():
     board.resetBoard()
     help()
-    print(chr(27) + "[2J")
+    screen.clear()
     loop()
 
 
@@ -172,4 +182,12 @@ if __name__ == "__main__":
     for arg in sys.argv:
         if arg == "-p":
             withBot = False
+        if arg == "-e":
+            bot = SearchBot()
+        if arg == "-s":
+            profiler = Instrumentation()
+    if profiler != None:
+        profiler.addMoveTarget(type(bot))
+        profiler.addMoveTarget(Board, "movePieceFromTo")
+        profiler.enable()
     main()
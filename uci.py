@@ -0,0 +1,242 @@
+"""UCI front end for the search bot, for chess GUIs and match managers.
+
+    python3 uci.py
+    python3 uci.py --book book.bin --tablebase tables
+    cutechess-cli -engine cmd="python3 uci.py" -engine cmd=other ...
+
+Speaks the commands a GUI needs: uci, isready, ucinewgame, setoption
+(Hash, Book, Tablebase), position startpos|fen ... moves ..., go with depth,
+movetime, wtime/btime/winc/binc/movestogo or infinite, stop and quit.
+The search runs on a worker thread so `stop`, `isready` and `quit` are
+answered while it thinks. Every finished iteration prints an info line
+with depth, score, nodes, nps, time and the principal variation.
+"""
+from time import perf_counter
+from typing import TextIO
+import argparse
+import sys
+import threading
+
+from game.board import Board
+from game.book import Book
+from game.tablebase import Tablebase
+from game.moves import moveFromUCI, moveToUCI
+from game.utils import Color
+from bots.searchBot import SearchBot, MATE, MATE_BOUND, MAX_PLY
+from bots.transposition import TranspositionTable
+
+# moves a game is assumed to still last when the GUI gives no movestogo
+MOVES_TO_GO = 30
+# seconds kept back for the GUI and process overhead on every move
+OVERHEAD = 0.05
+# time limit of searches that only end on `stop` or at their depth
+FOREVER = 1e9
+
+
+def scoreText(score: int) -> str:
+    """UCI score of a search score: centipawns or mate in moves."""
+    if score >= MATE_BOUND:
+        return "mate %d" % ((MATE - score + 1) // 2)
+    if score <= -MATE_BOUND:
+        return "mate -%d" % ((MATE + score + 1) // 2)
+    return "cp %d" % score
+
+
+def timeBudget(options: "dict[str, int]", color: "Color") -> float:
+    """Seconds to think given the arguments of `go`."""
+    if "movetime" in options:
+        return max(options["movetime"] / 1000 - OVERHEAD, 0.01)
+    left = options.get("wtime" if color == Color.WHITE else "btime")
+    if left == None:
+        return FOREVER
+    increment = options.get("winc" if color == Color.WHITE else "binc", 0)
+    movesToGo = options.get("movestogo", MOVES_TO_GO) or MOVES_TO_GO
+    budget = left / 1000 / movesToGo + increment / 1000 * 0.75
+    # never risk more than half of what is left on the clock
+    return max(min(budget, left / 1000 / 2) - OVERHEAD, 0.01)
+
+
+class UCIBot(SearchBot):
+    """SearchBot that prints an info line after every finished iteration."""
+
+    def __init__(self, send, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.send = send
+
+    def search(self, board: "Board", *args, **kwargs) -> int:
+        self.searchBoard = board
+        self.searchStart = perf_counter()
+        return super().search(board, *args, **kwargs)
+
+    def onIteration(self, depth: int, score: int, bestMove: int) -> None:
+        elapsed = perf_counter() - self.searchStart
+        pv = self.principalVariation(self.searchBoard, bestMove, depth)
+        self.send(
+            "info depth %d score %s nodes %d nps %d time %d pv %s"
+            % (
+                depth,
+                scoreText(score),
+                self.nodes,
+                self.nodes / max(elapsed, 1e-6),
+                elapsed * 1000,
+                " ".join(moveToUCI(move) for move in pv),
+            )
+        )
+
+
+class UCIEngine:
+    def __init__(
+        self,
+        output: "TextIO" = sys.stdout,
+        ttSizeMB: int = 16,
+        book: "Book|None" = None,
+        tablebase: "Tablebase|None" = None,
+    ) -> None:
+        self.output = output
+        # the worker thread reports while the main thread answers commands
+        self.outputLock = threading.Lock()
+        self.bot = UCIBot(self.send, ttSizeMB=ttSizeMB, book=book, tablebase=tablebase)
+        self.board = Board()
+        self.board.resetBoard()
+        self.worker: "threading.Thread|None" = None
+        self.stopRequest = threading.Event()
+
+    def send(self, line: str) -> None:
+        with self.outputLock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def handle(self, line: str) -> bool:
+        """Carry out one command line, False once the engine should exit."""
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        if command == "uci":
+            self.send("id name Chess-python")
+            self.send("id author vaibhav11s")
+            self.send("option name Hash type spin default 16 min 1 max 4096")
+            self.send("option name Book type string default <empty>")
+            self.send("option name Tablebase type string default <empty>")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "ucinewgame":
+            self.stopSearch()
+            self.bot.tt.clear()
+        elif command == "setoption":
+            self.stopSearch()
+            self.setOption(args)
+        elif command == "position":
+            self.stopSearch()
+            self.setPosition(args)
+        elif command == "go":
+            self.stopSearch()
+            self.go(args)
+        elif command == "stop":
+            self.stopSearch()
+        elif command == "quit":
+            self.stopSearch()
+            return False
+        # anything else, debug and register included, is ignored as UCI asks
+        return True
+
+    def setOption(self, args: "list[str]") -> None:
+        # setoption name <id> [value <x>], names may contain spaces
+        text = " ".join(args)
+        if not text.startswith("name "):
+            return
+        name, _, value = text[5:].partition(" value ")
+        name, value = name.strip().lower(), value.strip()
+        try:
+            if name == "hash":
+                self.bot.tt = TranspositionTable(max(1, int(value)))
+            elif name == "book":
+                self.bot.book = Book(value) if value and value != "<empty>" else None
+            elif name == "tablebase":
+                usable = value and value != "<empty>"
+                self.bot.tablebase = Tablebase(value) if usable else None
+        except (OSError, ValueError) as e:
+            self.send("info string setoption %s failed: %s" % (name, e))
+
+    def setPosition(self, args: "list[str]") -> None:
+        moves = args.index("moves") if "moves" in args else len(args)
+        if args[:1] == ["startpos"]:
+            board = Board()
+            board.resetBoard()
+        elif args[:1] == ["fen"]:
+            try:
+                board = Board.fromFEN(" ".join(args[1:moves]))
+            except ValueError as e:
+                self.send("info string %s" % e)
+                return
+        else:
+            return
+        for uci in args[moves + 1 :]:
+            move = moveFromUCI(uci)
+            if move == None or move not in board.generateMoves():
+                self.send("info string illegal move %s" % uci)
+                break
+            board.pushMove(move)
+        self.board = board
+
+    def go(self, args: "list[str]") -> None:
+        options: "dict[str, int]" = {}
+        for name, value in zip(args, args[1:]):
+            if value.lstrip("-").isdigit():
+                options[name] = int(value)
+        infinite = "infinite" in args or "ponder" in args
+        timeLimit = FOREVER if infinite else timeBudget(options, self.board.turn)
+        maxDepth = min(options.get("depth", MAX_PLY), MAX_PLY)
+        self.bot.stopped = False
+        self.stopRequest.clear()
+        self.worker = threading.Thread(
+            target=self.think, args=(timeLimit, maxDepth, infinite), daemon=True
+        )
+        self.worker.start()
+
+    def think(self, timeLimit: float, maxDepth: int, infinite: bool) -> None:
+        board, bot = self.board, self.bot
+        move = bot.bookMove(board)
+        if move:
+            self.send("info string book move")
+        else:
+            move = bot.tablebaseMove(board)
+            if move:
+                self.send("info string tablebase move")
+            else:
+                move = bot.search(board, timeLimit, max(maxDepth, 1))
+        if infinite:
+            # `go infinite` must not answer before the GUI says stop
+            self.stopRequest.wait()
+        self.send("bestmove %s" % (moveToUCI(move) if move else "0000"))
+
+    def stopSearch(self) -> None:
+        """End the running search, if any, once its bestmove is out."""
+        if self.worker == None:
+            return
+        self.bot.stop()
+        self.stopRequest.set()
+        self.worker.join()
+        self.worker = None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--hash", type=int, default=16, help="table size in MB")
+    parser.add_argument("--book", help="opening book file from makebook.py")
+    parser.add_argument("--tablebase", help="endgame table directory")
+    args = parser.parse_args()
+
+    book = Book(args.book) if args.book else None
+    tablebase = Tablebase(args.tablebase) if args.tablebase else None
+    engine = UCIEngine(sys.stdout, args.hash, book, tablebase)
+    for line in sys.stdin:
+        if not engine.handle(line):
+            break
+    engine.stopSearch()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Watch many bot-vs-bot games at once in the terminal.
+
+    python3 watch.py -n 12
+    python3 watch.py search random -n 8 --columns 4 --movetime 0.05
+
+The games take turns making one move each and are drawn as a grid of
+compact boards. Only the squares a move changed and its game's title line
+are sent to the terminal, so every move costs a few dozen bytes however
+many games are on screen. The bytes written per move are printed at the end.
+"""
+import argparse
+import random
+import sys
+import time
+
+from game.game import Game
+from game.render import Screen, BoardView, moveTo, CLEAR_LINE
+from game.utils import GameStatus
+from bots.bot import Bot
+from bots.parallelSearchBot import ParallelSearchBot
+from selfplay import BOTS, createBot
+
+# a title row above each board and blank columns between boards
+CELL_HEIGHT = 10
+CELL_WIDTH = 19
+
+
+class WatchedGame:
+    def __init__(self, number: int, bots: "tuple[Bot, Bot]", top: int, left: int):
+        self.number = number
+        self.game = Game()
+        # indexed by Color.value, black first
+        self.bots = bots
+        self.view = BoardView(top + 1, left, compact=True)
+        self.titleRow, self.titleCol = top, left
+        self.title = ""
+        self.result = "*"
+
+    def step(self, maxPlies: int) -> None:
+        game = self.game
+        result = game.applyMove(self.bots[game.turn.value].giveUCIMove(game.board))
+        if not result.legal:
+            # an illegal move loses the game
+            self.result = "0-1" if game.turn.value == 1 else "1-0"
+        elif game.over:
+            self.result = game.result()
+        elif game.status != GameStatus.ONGOING or len(game.history) >= maxPlies:
+            # claimable draws end watched games too
+            self.result = "1/2-1/2"
+
+    def draw(self) -> str:
+        title = "#%-3d %3d %s" % (self.number, len(self.game.history), self.result)
+        out = self.view.update(self.game.board)
+        if title != self.title:
+            self.title = title
+            out += moveTo(self.titleRow, self.titleCol) + title
+        return out
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("white", nargs="?", default="random", choices=list(BOTS))
+    parser.add_argument("black", nargs="?", default="random", choices=list(BOTS))
+    parser.add_argument("-n", "--games", type=int, default=8)
+    parser.add_argument("--columns", type=int, default=4)
+    parser.add_argument("--movetime", type=float, default=0.05, help="seconds per move")
+    parser.add_argument("--max-plies", type=int, default=300)
+    parser.add_argument("--delay", type=float, default=0, help="seconds between moves")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    screen = Screen(sys.stdout)
+    games = []
+    for i in range(args.games):
+        row, col = divmod(i, args.columns)
+        bots = (
+            createBot(args.black, args.movetime),
+            createBot(args.white, args.movetime),
+        )
+        games.append(WatchedGame(i + 1, bots, row * CELL_HEIGHT, col * CELL_WIDTH))
+    rows = (args.games + args.columns - 1) // args.columns
+
+    screen.clear()
+    screen.write("".join(game.draw() for game in games))
+    start = time.perf_counter()
+    moves = 0
+    drawn = screen.bytesWritten
+    playing = list(games)
+    while playing:
+        for game in playing:
+            game.step(args.max_plies)
+            moves += 1
+            screen.write(game.draw())
+            if args.delay:
+                time.sleep(args.delay)
+        playing = [game for game in playing if game.result == "*"]
+
+    elapsed = time.perf_counter() - start
+    for game in games:
+        for bot in game.bots:
+            if isinstance(bot, ParallelSearchBot):
+                bot.close()
+    perMove = (screen.bytesWritten - drawn) / max(moves, 1)
+    screen.write(moveTo(rows * CELL_HEIGHT, 0) + CLEAR_LINE)
+    print(
+        "%d games, %d moves in %.1fs, %.1f bytes per move"
+        % (len(games), moves, elapsed, perMove)
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())